@@ -1,7 +1,9 @@
-from flask import request, redirect
+from flask import request, redirect, abort, flash, json, Response, g, has_app_context
 
 
 from flask.ext.admin import tools
+from flask.ext.admin.babel import gettext
+from flask.ext.admin.helpers import get_redirect_target
 from flask.ext.admin._compat import text_type
 
 
@@ -25,6 +27,18 @@ def action(name, text, confirmation=None):
     return wrap
 
 
+def is_matching_batch():
+    """
+        Return `True` if action handler is called by `apply_action_to_matching`
+        for a batch of records matching search and filters.
+
+        Handler should return number of processed records instead of
+        flashing a success message then, as one summary is flashed for all
+        batches. Errors should still be flashed.
+    """
+    return has_app_context() and getattr(g, '_admin_matching_batch', False)
+
+
 class ActionsMixin(object):
     """
         Actions mixin.
@@ -39,6 +53,39 @@ class ActionsMixin(object):
         4. Import `actions.html` library and add call library macros in your template
     """
 
+    action_job_runner = None
+    """
+        :class:`~flask.ext.admin.jobs.JobRunner` instance. If set, actions
+        from `action_job_list` run in the background and the user is
+        redirected to the page which shows their progress. View should expose
+        `action_job_view` and `action_job_status_view`, which call
+        `handle_action_job` and `handle_action_job_status`.
+    """
+
+    action_job_list = None
+    """
+        List of action names which run in the background when
+        `action_job_runner` is set. Actions which return a response, like
+        a confirmation form or a file download, should not be listed,
+        because the response can not be delivered from the background.
+    """
+
+    action_job_template = 'admin/job.html'
+    """
+        Template which shows progress of the background action.
+    """
+
+    action_select_all = False
+    """
+        Allow to apply actions to all records matching current search and
+        filters instead of the selected ones. View should implement
+        `apply_action_to_matching`.
+
+        Action handler is then called with one batch of primary keys at a
+        time and can return number of processed records, see
+        :func:`is_matching_batch`.
+    """
+
     def __init__(self):
         """
             Default constructor.
@@ -107,15 +154,111 @@ class ActionsMixin(object):
 
         handler = self._actions_data.get(action)
 
-        if handler and self.is_action_allowed(action):
-            response = handler[0](ids)
-
-            if response is not None:
-                return response
-
         if not return_view:
             url = self.get_url('.' + self._default_view)
         else:
             url = self.get_url('.' + return_view)
 
+        if handler and self.is_action_allowed(action):
+            if self.action_select_all and request.form.get('select_all'):
+                fn, args = self.apply_action_to_matching, (action, handler[0])
+            else:
+                fn, args = handler[0], (ids,)
+
+            if self.is_background_action(action):
+                job = self.action_job_runner.submit(self.endpoint, action, fn, *args)
+                return redirect(self.get_url('.action_job_view', job_id=job.id, url=url))
+
+            response = fn(*args)
+
+            if response is not None:
+                return response
+
         return redirect(url)
+
+    def apply_action_to_matching(self, name, handler):
+        """
+            Apply action to all records matching search and filters from
+            the request arguments.
+
+            :param name:
+                Action name
+            :param handler:
+                Action handler
+        """
+        raise NotImplementedError()
+
+    def is_background_action(self, name):
+        """
+            Verify if action with `name` should run in the background.
+
+            :param name:
+                Action name
+        """
+        if self.action_job_runner is None or not self.action_job_list:
+            return False
+
+        return name in self.action_job_list
+
+    def get_action_job(self, job_id):
+        """
+            Return background action job of this view or `None`.
+
+            :param job_id:
+                Job id
+        """
+        if self.action_job_runner is None:
+            return None
+
+        job = self.action_job_runner.get_job(job_id)
+
+        if job is None or job.endpoint != self.endpoint:
+            return None
+
+        return job
+
+    def handle_action_job(self, job_id, return_view=None):
+        """
+            Render page which shows progress of the background action.
+
+            :param job_id:
+                Job id
+            :param return_view:
+                Name of the view to return to when the job is finished.
+                If not provided, will return user to the index view.
+        """
+        job = self.get_action_job(job_id)
+
+        if job is None:
+            abort(404)
+
+        return_url = get_redirect_target() or self.get_url('.' + (return_view or self._default_view))
+
+        return self.render(self.action_job_template,
+                           job=job,
+                           status_url=self.get_url('.action_job_status_view', job_id=job.id),
+                           return_url=return_url)
+
+    def handle_action_job_status(self, job_id):
+        """
+            Return status of the background action as JSON. Messages flashed
+            by the action are delivered once the job is finished.
+
+            :param job_id:
+                Job id
+        """
+        job = self.get_action_job(job_id)
+
+        if job is None:
+            abort(404)
+
+        if job.is_finished and not job.delivered:
+            job.delivered = True
+
+            for category, message in job.messages:
+                flash(message, category)
+
+            if job.error:
+                flash(gettext('Failed to run action. %(error)s', error=job.error), 'error')
+
+        return Response(json.dumps(job.to_dict()), mimetype='application/json')
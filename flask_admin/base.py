@@ -1,9 +1,10 @@
+import time
 import os.path as op
 
 from functools import wraps
 
-from flask import Blueprint, render_template, abort, g, url_for
-from flask.ext.admin import babel
+from flask import Blueprint, render_template, abort, g, url_for, current_app
+from flask.ext.admin import babel, profiler
 from flask.ext.admin._compat import with_metaclass
 from flask.ext.admin import helpers as h
 
@@ -278,7 +279,47 @@ class BaseView(with_metaclass(AdminViewMeta, BaseViewClass)):
         # Contribute extra arguments
         kwargs.update(self._template_args)
 
-        return render_template(template, **kwargs)
+        with profiler.timed(self, 'render'):
+            result = render_template(template, **kwargs)
+
+        if current_app.config.get('FLASK_ADMIN_PROFILER'):
+            active = profiler.get_profiler()
+
+            if active is not None:
+                result = self._inject_profiler_panel(result, active)
+
+        return result
+
+    def _inject_profiler_panel(self, result, active):
+        """
+            Render profiler panel and insert it before closing `body` tag.
+
+            :param result:
+                Rendered page
+            :param active:
+                Profiler
+        """
+        queries = list(active.queries)
+        plans = {}
+
+        with profiler.paused():
+            if current_app.config.get('FLASK_ADMIN_PROFILER_EXPLAIN'):
+                for idx, query in enumerate(queries):
+                    if query.stage in profiler.EXPLAIN_STAGES:
+                        plans[idx] = self._explain_query(query)
+
+            panel = render_template('admin/profiler.html',
+                                    _gettext=babel.gettext,
+                                    queries=queries,
+                                    plans=plans,
+                                    total_duration=sum(q.duration for q in queries))
+
+        idx = result.rfind('</body>')
+
+        if idx == -1:
+            return result + panel
+
+        return result[:idx] + panel + result[idx:]
 
     def _prettify_class_name(self, name):
         """
@@ -338,7 +379,36 @@ class BaseView(with_metaclass(AdminViewMeta, BaseViewClass)):
             :param kwargs:
                 Arguments
         """
-        return fn(self, *args, **kwargs)
+        start = time.time()
+
+        if current_app.config.get('FLASK_ADMIN_PROFILER'):
+            self._install_profiler()
+
+            with profiler.profile():
+                result = fn(self, *args, **kwargs)
+        else:
+            result = fn(self, *args, **kwargs)
+
+        profiler.report_view(self, time.time() - start)
+
+        return result
+
+    def _install_profiler(self):
+        """
+            Install hooks which report executed queries to the profiler.
+            Model backends override this method.
+        """
+        pass
+
+    def _explain_query(self, query):
+        """
+            Return execution plan of the recorded query as a string or `None`
+            if it is not supported. Model backends override this method.
+
+            :param query:
+                :class:`~flask.ext.admin.profiler.QueryRecord` instance
+        """
+        return None
 
     def inaccessible_callback(self, name, **kwargs):
         """
@@ -452,6 +522,7 @@ class Admin(object):
         self.translations_path = translations_path
 
         self._views = []
+        self._timers = []
         self._menu = []
         self._menu_categories = dict()
         self._menu_links = []
@@ -491,6 +562,15 @@ class Admin(object):
 
         self._add_view_to_menu(view)
 
+    def add_timer(self, timer):
+        """
+            Add timer which will receive timings of the views and their stages.
+
+            :param timer:
+                :class:`~flask.ext.admin.profiler.BaseTimer` instance
+        """
+        self._timers.append(timer)
+
     def add_link(self, link):
         """
             Add link to menu links collection.
@@ -735,6 +735,14 @@ class FileAdmin(BaseView, ActionsMixin):
     def action_view(self):
         return self.handle_action()
 
+    @expose('/action/job/<job_id>/')
+    def action_job_view(self, job_id):
+        return self.handle_action_job(job_id)
+
+    @expose('/action/job/<job_id>/status/')
+    def action_job_status_view(self, job_id):
+        return self.handle_action_job_status(job_id)
+
     # Actions
     @action('delete',
             lazy_gettext('Delete'),
@@ -47,20 +47,28 @@ class QueryAjaxModelLoader(AjaxModelLoader):
     def get_one(self, pk):
         return self.model.objects.filter(id=pk).first()
 
+    def get_many(self, pks):
+        models = self.model.objects.filter(id__in=pks)
+
+        found = dict((as_unicode(m.id), m) for m in models)
+        return [found[as_unicode(pk)] for pk in pks if as_unicode(pk) in found]
+
     def get_list(self, term, offset=0, limit=DEFAULT_PAGE_SIZE):
         query = self.model.objects
 
         criteria = None
 
+        operator = 'istartswith' if self.match == 'prefix' else 'icontains'
+
         for field in self._cached_fields:
-            flt = {u'%s__icontains' % field.name: term}
+            flt = {u'%s__%s' % (field.name, operator): term}
 
             if not criteria:
                 criteria = mongoengine.Q(**flt)
             else:
                 criteria |= mongoengine.Q(**flt)
 
-        query = query.filter(criteria)
+        query = query.filter(criteria).order_by(*(self.order_by + ('id',)))
 
         if offset:
             query = query.skip(offset)
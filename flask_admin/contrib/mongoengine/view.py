@@ -2,17 +2,18 @@ import logging
 
 from flask import request, flash, abort, Response
 
-from flask.ext.admin import expose
+from flask.ext.admin import expose, jobs, profiler
 from flask.ext.admin.babel import gettext, ngettext, lazy_gettext
 from flask.ext.admin.model import BaseModelView
-from flask.ext.admin._compat import iteritems, string_types
+from flask.ext.admin._compat import iteritems, itervalues, string_types, as_unicode
+from flask.ext.admin.contrib.pymongo.tools import get_index_report
 
 import mongoengine
 import gridfs
 from mongoengine.connection import get_db
 from bson.objectid import ObjectId
 
-from flask.ext.admin.actions import action
+from flask.ext.admin.actions import action, is_matching_batch
 from .filters import FilterConverter, BaseMongoEngineFilter
 from .form import get_form, CustomModelConverter
 from .typefmt import DEFAULT_FORMATTERS
@@ -409,23 +410,58 @@ class ModelView(BaseModelView):
         """
         return self.model.objects
 
-    def get_list(self, page, sort_column, sort_desc, search, filters,
-                 execute=True):
+    def _get_count_estimate(self, query):
         """
-            Get list of objects from MongoEngine
+            Return estimated number of documents from the collection
+            metadata or `None` if estimate is not available.
+
+            :param query:
+                QuerySet with search and filters applied
+        """
+        # Metadata only describes the whole collection
+        if query._query:
+            return None
+
+        coll = self.model._get_collection()
+
+        if hasattr(coll, 'estimated_document_count'):
+            return coll.estimated_document_count()
+
+        return coll.count()
+
+    def _get_db_field(self, field):
+        """
+            Return database name of the document field.
+        """
+        if isinstance(field, string_types):
+            field = self.model._fields.get(field, field)
+
+        return getattr(field, 'db_field', field)
+
+    def get_index_report(self):
+        """
+            Inspect indexes of the document collection.
+        """
+        columns = [('sort', c) for c in itervalues(self._sortable_columns)]
+        columns.extend(('search', c) for c in self._search_fields)
+        columns.extend(('filter', getattr(f, 'column', None)) for f in self._filters or ())
+
+        return get_index_report(self.model._get_collection(),
+                                [(operation, self._get_db_field(c))
+                                 for operation, c in columns if c is not None])
+
+    def _install_profiler(self):
+        # Listener has to be registered before the client is created
+        profiler.check_pymongo()
+
+    def _get_list_queryset(self, search, filters):
+        """
+            Return queryset with search and filters applied.
 
-            :param page:
-                Page number
-            :param sort_column:
-                Sort column
-            :param sort_desc:
-                Sort descending
             :param search:
                 Search criteria
             :param filters:
                 List of applied filters
-            :param execute:
-                Run query immediately or not
         """
         query = self.get_query()
 
@@ -456,29 +492,92 @@ class ModelView(BaseModelView):
 
             query = query.filter(criteria)
 
-        # Get count
-        count = query.count()
+        return query
 
-        # Sorting
+    def _apply_sorting(self, query, sort_column, sort_desc):
+        """
+            Order queryset by the sort column or by the default sort order.
+        """
         if sort_column:
-            query = query.order_by('%s%s' % ('-' if sort_desc else '', sort_column))
-        else:
-            order = self._get_default_order()
+            return query.order_by('%s%s' % ('-' if sort_desc else '', sort_column))
+
+        order = self._get_default_order()
 
-            if order:
-                query = query.order_by('%s%s' % ('-' if order[1] else '', order[0]))
+        if order:
+            return query.order_by('%s%s' % ('-' if order[1] else '', order[0]))
+
+        return query
+
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True):
+        """
+            Get list of objects from MongoEngine
+
+            :param page:
+                Page number
+            :param sort_column:
+                Sort column
+            :param sort_desc:
+                Sort descending
+            :param search:
+                Search criteria
+            :param filters:
+                List of applied filters
+            :param execute:
+                Run query immediately or not
+        """
+        query = self._get_list_queryset(search, filters)
+
+        # Get count
+        count = self.get_list_count(query.count,
+                                    lambda: self._get_count_estimate(query),
+                                    search, filters)
+
+        # Load only displayed fields
+        if self._list_load_columns is not None:
+            fields = [name for name in self._list_load_columns
+                      if isinstance(name, string_types) and name.split('.')[0] in self.model._fields]
+
+            query = query.only(*fields)
+
+        # Sorting
+        query = self._apply_sorting(query, sort_column, sort_desc)
 
         # Pagination
         if page is not None:
             query = query.skip(page * self.page_size)
 
-        query = query.limit(self.page_size)
+        # Fetch one extra row to find out if there is next page
+        if self.simple_list_pager:
+            query = query.limit(self.page_size + 1)
+        else:
+            query = query.limit(self.page_size)
 
         if execute:
             query = query.all()
 
         return count, query
 
+    def get_export_list(self, sort_column, sort_desc, search, filters):
+        """
+            Return queryset over all documents matching search and filters,
+            which fetches documents in batches of `export_batch_size` and
+            does not cache them.
+
+            :param sort_column:
+                Sort column
+            :param sort_desc:
+                Sort descending
+            :param search:
+                Search criteria
+            :param filters:
+                List of applied filters
+        """
+        query = self._get_list_queryset(search, filters)
+        query = self._apply_sorting(query, sort_column, sort_desc)
+
+        return query.no_cache().batch_size(self.export_batch_size)
+
     def get_one(self, id):
         """
             Return a single model instance by its ID
@@ -545,6 +644,59 @@ class ModelView(BaseModelView):
 
         return True
 
+    def get_matching_pk_batches(self, search, filters, batch_size):
+        """
+            Yield lists of ids of documents matching search and filters.
+            Only ids are loaded and every batch is a separate query positioned
+            after the last id of the previous batch.
+        """
+        queryset = self._get_list_queryset(search, filters).order_by('id')
+
+        last = None
+
+        while True:
+            batch_queryset = queryset
+
+            if last is not None:
+                batch_queryset = batch_queryset.filter(id__gt=last)
+
+            ids = list(batch_queryset.limit(batch_size).scalar('id'))
+
+            if not ids:
+                return
+
+            yield [as_unicode(pk) for pk in ids]
+
+            if len(ids) < batch_size:
+                return
+
+            last = ids[-1]
+
+    def is_valid_bulk_update_field(self, name):
+        return name in self.model._fields
+
+    def get_models_by_ids(self, ids):
+        all_ids = [self.object_id_converter(pk) for pk in ids]
+        return list(self.get_query().in_bulk(all_ids).values())
+
+    def _get_update_args(self, values):
+        return dict(('set__%s' % name, value) for name, value in iteritems(values))
+
+    def update_models(self, ids, values):
+        """
+            Update documents with a single `QuerySet.update` call.
+        """
+        all_ids = [self.object_id_converter(pk) for pk in ids]
+        return self.get_query().filter(pk__in=all_ids).update(**self._get_update_args(values))
+
+    def update_matching_models(self, search, filters, values):
+        """
+            Update all documents matching search and filters with a single
+            `QuerySet.update` call.
+        """
+        query = self._get_list_queryset(search, filters)
+        return query.update(**self._get_update_args(values))
+
     def delete_model(self, model):
         """
             Delete model helper
@@ -603,9 +755,14 @@ class ModelView(BaseModelView):
             count = 0
 
             all_ids = [self.object_id_converter(pk) for pk in ids]
-            for obj in self.get_query().in_bulk(all_ids).values():
+            for idx, obj in enumerate(self.get_query().in_bulk(all_ids).values()):
                 count += self.delete_model(obj)
 
+                jobs.report_progress(idx + 1, len(all_ids))
+
+            if is_matching_batch():
+                return count
+
             flash(ngettext('Model was successfully deleted.',
                            '%(count)s models were successfully deleted.',
                            count,
@@ -614,3 +771,6 @@ class ModelView(BaseModelView):
             if not self.handle_view_exception(ex):
                 flash(gettext('Failed to delete models. %(error)s', error=str(ex)),
                       'error')
+
+            if is_matching_batch():
+                return 0
@@ -24,10 +24,16 @@ class QueryAjaxModelLoader(AjaxModelLoader):
 
         self.pk = get_primary_key(model)
 
-    def _process_fields(self):
+        self._order_fields = self._process_fields(self.order_by)
+        self._order_fields.append(getattr(model, self.pk))
+
+    def _process_fields(self, fields=None):
         remote_fields = []
 
-        for field in self.fields:
+        if fields is None:
+            fields = self.fields
+
+        for field in fields:
             if isinstance(field, string_types):
                 attr = getattr(self.model, field, None)
 
@@ -49,19 +55,28 @@ class QueryAjaxModelLoader(AjaxModelLoader):
     def get_one(self, pk):
         return self.model.get(**{self.pk: pk})
 
+    def get_many(self, pks):
+        model_pk = getattr(self.model, self.pk)
+        models = self.model.select().where(model_pk << pks)
+
+        found = dict((as_unicode(getattr(m, self.pk)), m) for m in models)
+        return [found[as_unicode(pk)] for pk in pks if as_unicode(pk) in found]
+
     def get_list(self, term, offset=0, limit=DEFAULT_PAGE_SIZE):
         query = self.model.select()
 
+        pattern = self.get_pattern(term)
+
         stmt = None
         for field in self._cached_fields:
-            q = field ** (u'%%%s%%' % term)
+            q = field ** pattern
 
             if stmt is None:
                 stmt = q
             else:
                 stmt |= q
 
-        query = query.where(stmt)
+        query = query.where(stmt).order_by(*self._order_fields)
 
         if offset:
             query = query.offset(offset)
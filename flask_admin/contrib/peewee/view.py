@@ -1,14 +1,17 @@
 import logging
+import re
 
 from flask import flash
 
-from flask.ext.admin._compat import string_types
+from flask.ext.admin._compat import string_types, as_unicode
+from flask.ext.admin import jobs, profiler
 from flask.ext.admin.babel import gettext, ngettext, lazy_gettext
 from flask.ext.admin.model import BaseModelView
 
-from peewee import PrimaryKeyField, ForeignKeyField, Field, CharField, TextField
+from peewee import (PrimaryKeyField, ForeignKeyField, Field, CharField, TextField,
+                    PostgresqlDatabase, MySQLDatabase, SqliteDatabase, SQL)
 
-from flask.ext.admin.actions import action
+from flask.ext.admin.actions import action, is_matching_batch
 from flask.ext.admin.contrib.peewee import filters
 
 from .form import get_form, CustomModelConverter, InlineModelConverter, save_inline
@@ -18,6 +21,9 @@ from .ajax import create_ajax_loader
 # Set up logger
 log = logging.getLogger("flask-admin.peewee")
 
+# Used to extract row estimate from the PostgreSQL query plan
+explain_rows_re = re.compile(r'rows=(\d+)')
+
 
 class ModelView(BaseModelView):
     column_filters = None
@@ -278,8 +284,58 @@ class ModelView(BaseModelView):
     def get_query(self):
         return self.model.select()
 
-    def get_list(self, page, sort_column, sort_desc, search, filters,
-                 execute=True):
+    def _get_count_estimate(self, query):
+        """
+            Return estimated number of rows for the query using PostgreSQL
+            planner statistics or `None` if estimate is not available.
+
+            :param query:
+                Query with search and filters applied
+        """
+        database = self.model._meta.database
+
+        if not isinstance(database, PostgresqlDatabase):
+            return None
+
+        sql, params = query.sql()
+        plan = database.execute_sql('EXPLAIN ' + sql, params).fetchone()
+
+        match = explain_rows_re.search(plan[0])
+        if match:
+            return int(match.group(1))
+
+        return None
+
+    def _install_profiler(self):
+        profiler.install_peewee(self.model._meta.database)
+
+    def _explain_query(self, query):
+        database = self.model._meta.database
+
+        if isinstance(database, SqliteDatabase):
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif isinstance(database, (PostgresqlDatabase, MySQLDatabase)):
+            prefix = 'EXPLAIN '
+        else:
+            return None
+
+        try:
+            cursor = database.execute_sql(prefix + query.statement, query.params)
+            return '\n'.join(' '.join(as_unicode(v) for v in row) for row in cursor.fetchall())
+        except Exception as ex:
+            log.exception('Failed to explain query')
+            return as_unicode(ex)
+
+    def _get_list_query(self, search, filters):
+        """
+            Return query with search and filters applied and a set of
+            joined models.
+
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+        """
         query = self.get_query()
 
         joins = set()
@@ -315,31 +371,62 @@ class ModelView(BaseModelView):
                 query = self._handle_join(query, f.column, joins)
                 query = f.apply(query, value)
 
-        # Get count
-        count = query.count()
+        return query, joins
 
-        # Apply sorting
+    def _apply_sorting(self, query, joins, sort_column, sort_desc):
+        """
+            Order query by the sort column or by the default sort order.
+        """
         if sort_column is not None:
             sort_field = self._sortable_columns[sort_column]
 
-            query, joins = self._order_by(query, joins, sort_field, sort_desc)
-        else:
-            order = self._get_default_order()
+            return self._order_by(query, joins, sort_field, sort_desc)
+
+        order = self._get_default_order()
+
+        if order:
+            return self._order_by(query, joins, order[0], order[1])
+
+        return query, joins
+
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True):
+        query, joins = self._get_list_query(search, filters)
 
-            if order:
-                query, joins = self._order_by(query, joins, order[0], order[1])
+        # Get count
+        count = self.get_list_count(query.count,
+                                    lambda: self._get_count_estimate(query),
+                                    search, filters)
+
+        # Apply sorting
+        query, joins = self._apply_sorting(query, joins, sort_column, sort_desc)
 
         # Pagination
         if page is not None:
             query = query.offset(page * self.page_size)
 
-        query = query.limit(self.page_size)
+        # Fetch one extra row to find out if there is next page
+        if self.simple_list_pager:
+            query = query.limit(self.page_size + 1)
+        else:
+            query = query.limit(self.page_size)
 
         if execute:
             query = list(query.execute())
 
         return count, query
 
+    def get_export_list(self, sort_column, sort_desc, search, filters):
+        """
+            Return iterator over all models matching search and filters.
+            Rows are not cached by the query, so memory use is constant
+            when database driver uses server-side cursor.
+        """
+        query, joins = self._get_list_query(search, filters)
+        query, joins = self._apply_sorting(query, joins, sort_column, sort_desc)
+
+        return query.iterator()
+
     def get_one(self, id):
         return self.model.get(**{self._primary_key: id})
 
@@ -382,6 +469,82 @@ class ModelView(BaseModelView):
 
         return True
 
+    def get_matching_pk_batches(self, search, filters, batch_size):
+        """
+            Yield lists of primary keys of models matching search and filters.
+            Only primary key is selected and every batch is a separate query
+            positioned after the last key of the previous batch.
+        """
+        model_pk = getattr(self.model, self._primary_key)
+
+        query, joins = self._get_list_query(search, filters)
+        query = query.select(model_pk).order_by(model_pk)
+
+        last = None
+
+        while True:
+            batch_query = query
+
+            if last is not None:
+                batch_query = batch_query.where(model_pk > last)
+
+            rows = list(batch_query.limit(batch_size).tuples())
+
+            if not rows:
+                return
+
+            yield [as_unicode(row[0]) for row in rows]
+
+            if len(rows) < batch_size:
+                return
+
+            last = rows[-1][0]
+
+    def is_valid_bulk_update_field(self, name):
+        return name in self.model._meta.fields
+
+    def get_models_by_ids(self, ids):
+        model_pk = getattr(self.model, self._primary_key)
+        return list(self.model.select().where(model_pk << ids))
+
+    def update_models(self, ids, values):
+        """
+            Update models with a single `UPDATE ... WHERE pk IN (...)`.
+        """
+        model_pk = getattr(self.model, self._primary_key)
+        return self.model.update(**values).where(model_pk << ids).execute()
+
+    def update_matching_models(self, search, filters, values):
+        """
+            Update all models matching search and filters with a single
+            `UPDATE` statement.
+
+            Criteria are applied to the statement directly. If the query
+            joins other models, models are matched by primary key with a
+            subquery instead, wrapped into a derived table on MySQL, which
+            does not allow to select from the updated table otherwise.
+        """
+        model_pk = getattr(self.model, self._primary_key)
+
+        query, joins = self._get_list_query(search, filters)
+
+        update = self.model.update(**values)
+
+        # Peewee has no public accessors for the query criteria and joins
+        if not joins and not query._joins:
+            if query._where is not None:
+                update = update.where(query._where)
+
+            return update.execute()
+
+        pk_query = query.select(model_pk)
+
+        if isinstance(self.model._meta.database, MySQLDatabase):
+            matched = pk_query.alias('matched')
+            pk_query = self.model.select(SQL('matched.%s' % model_pk.db_column)).from_(matched)
+
+        return update.where(model_pk << pk_query).execute()
+
     def delete_model(self, model):
         try:
             self.on_model_delete(model)
@@ -420,6 +583,11 @@ class ModelView(BaseModelView):
                     m.delete_instance(recursive=True)
                     count += 1
 
+                    jobs.report_progress(count, len(ids))
+
+            if is_matching_batch():
+                return count
+
             flash(ngettext('Model was successfully deleted.',
                            '%(count)s models were successfully deleted.',
                            count,
@@ -427,3 +595,6 @@ class ModelView(BaseModelView):
         except Exception as ex:
             if not self.handle_view_exception(ex):
                 flash(gettext('Failed to delete models. %(error)s', error=str(ex)), 'error')
+
+            if is_matching_batch():
+                return 0
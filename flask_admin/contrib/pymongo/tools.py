@@ -1,5 +1,8 @@
 import re
 
+from flask.ext.admin._compat import itervalues
+
+
 def parse_like_term(term):
     """
         Parse search term into (operation, term) tuple
@@ -13,3 +16,42 @@ def parse_like_term(term):
         return '^{}$'.format(re.escape(term[1:]))
 
     return re.escape(term)
+
+
+def get_index_report(coll, columns):
+    """
+        Return list of `(operation, field, suggestion)` tuples for the fields
+        which are not leading fields of the collection indexes.
+
+        Search uses regular expressions which can not use indexes, so
+        searchable fields are always reported.
+
+        :param coll:
+            MongoDB collection object
+        :param columns:
+            List of `(operation, field name)` tuples
+    """
+    indexed = set()
+
+    for info in itervalues(coll.index_information()):
+        key = info.get('key')
+
+        if key:
+            indexed.add(key[0][0])
+
+    seen = set()
+    report = []
+
+    for operation, name in columns:
+        if name is None or (operation, name) in seen:
+            continue
+
+        seen.add((operation, name))
+
+        if operation == 'search':
+            report.append((operation, name, None))
+        elif name not in indexed:
+            report.append((operation, name,
+                           'db.%s.createIndex({"%s": 1})' % (coll.name, name)))
+
+    return report
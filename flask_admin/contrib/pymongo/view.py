@@ -6,14 +6,15 @@ from bson.errors import InvalidId
 
 from flask import flash
 
-from flask.ext.admin._compat import string_types
+from flask.ext.admin._compat import string_types, itervalues, as_unicode
+from flask.ext.admin import jobs, profiler
 from flask.ext.admin.babel import gettext, ngettext, lazy_gettext
 from flask.ext.admin.model import BaseModelView
-from flask.ext.admin.actions import action
+from flask.ext.admin.actions import action, is_matching_batch
 from flask.ext.admin.helpers import get_form_data
 
 from .filters import BasePyMongoFilter
-from .tools import parse_like_term
+from .tools import parse_like_term, get_index_report
 
 # Set up logger
 log = logging.getLogger("flask-admin.pymongo")
@@ -146,23 +147,45 @@ class ModelView(BaseModelView):
         """
         return model.get(name)
 
-    def get_list(self, page, sort_column, sort_desc, search, filters,
-                 execute=True):
+    def _get_count_estimate(self, query):
         """
-            Get list of objects from MongoEngine
+            Return estimated number of documents from the collection
+            metadata or `None` if estimate is not available.
+
+            :param query:
+                Query document with search and filters applied
+        """
+        # Metadata only describes the whole collection
+        if query:
+            return None
+
+        if hasattr(self.coll, 'estimated_document_count'):
+            return self.coll.estimated_document_count()
+
+        return self.coll.count()
+
+    def get_index_report(self):
+        """
+            Inspect indexes of the collection.
+        """
+        columns = [('sort', c) for c in itervalues(self._sortable_columns)]
+        columns.extend(('search', c) for c in self._search_fields)
+        columns.extend(('filter', getattr(f, 'column', None)) for f in self._filters or ())
+
+        return get_index_report(self.coll, columns)
+
+    def _install_profiler(self):
+        # Listener has to be registered before the client is created
+        profiler.check_pymongo()
+
+    def _get_list_query(self, search, filters):
+        """
+            Return query document with search and filters applied.
 
-            :param page:
-                Page number
-            :param sort_column:
-                Sort column
-            :param sort_desc:
-                Sort descending
             :param search:
                 Search criteria
             :param filters:
-                List of applied fiters
-            :param execute:
-                Run query immediately or not
+                List of applied filters
         """
         query = {}
 
@@ -215,19 +238,50 @@ class ModelView(BaseModelView):
                 else:
                     query = final
 
-        # Get count
-        count = self.coll.find(query).count()
-
-        # Sorting
-        sort_by = None
+        return query
 
+    def _get_list_sort(self, sort_column, sort_desc):
+        """
+            Return sort specification for the sort column or the default
+            sort order.
+        """
         if sort_column:
-            sort_by = [(sort_column, pymongo.DESCENDING if sort_desc else pymongo.ASCENDING)]
-        else:
-            order = self._get_default_order()
+            return [(sort_column, pymongo.DESCENDING if sort_desc else pymongo.ASCENDING)]
+
+        order = self._get_default_order()
+
+        if order:
+            return [(order[0], pymongo.DESCENDING if order[1] else pymongo.ASCENDING)]
+
+        return None
+
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True):
+        """
+            Get list of objects from MongoEngine
+
+            :param page:
+                Page number
+            :param sort_column:
+                Sort column
+            :param sort_desc:
+                Sort descending
+            :param search:
+                Search criteria
+            :param filters:
+                List of applied fiters
+            :param execute:
+                Run query immediately or not
+        """
+        query = self._get_list_query(search, filters)
+
+        # Get count
+        count = self.get_list_count(lambda: self.coll.find(query).count(),
+                                    lambda: self._get_count_estimate(query),
+                                    search, filters)
 
-            if order:
-                sort_by = [(order[0], pymongo.DESCENDING if order[1] else pymongo.ASCENDING)]
+        # Sorting
+        sort_by = self._get_list_sort(sort_column, sort_desc)
 
         # Pagination
         skip = None
@@ -235,13 +289,43 @@ class ModelView(BaseModelView):
         if page is not None:
             skip = page * self.page_size
 
-        results = self.coll.find(query, sort=sort_by, skip=skip, limit=self.page_size)
+        # Fetch one extra document to find out if there is next page
+        limit = self.page_size
+
+        if self.simple_list_pager:
+            limit += 1
+
+        # Load only displayed fields
+        projection = None
+
+        if self._list_load_columns is not None:
+            projection = dict((name, 1) for name in self._list_load_columns)
+
+        results = self.coll.find(query, projection, sort=sort_by, skip=skip, limit=limit)
 
         if execute:
             results = list(results)
 
         return count, results
 
+    def get_export_list(self, sort_column, sort_desc, search, filters):
+        """
+            Return cursor over all documents matching search and filters,
+            which fetches documents in batches of `export_batch_size`.
+
+            :param sort_column:
+                Sort column
+            :param sort_desc:
+                Sort descending
+            :param search:
+                Search criteria
+            :param filters:
+                List of applied filters
+        """
+        return self.coll.find(self._get_list_query(search, filters),
+                              sort=self._get_list_sort(sort_column, sort_desc),
+                              batch_size=self.export_batch_size)
+
     def _get_valid_id(self, id):
         try:
             return ObjectId(id)
@@ -309,6 +393,59 @@ class ModelView(BaseModelView):
 
         return True
 
+    def get_matching_pk_batches(self, search, filters, batch_size):
+        """
+            Yield lists of `_id` values of documents matching search and
+            filters. Only `_id` is loaded and every batch is a separate query
+            positioned after the last `_id` of the previous batch.
+        """
+        query = self._get_list_query(search, filters)
+
+        last = None
+
+        while True:
+            batch_query = query
+
+            if last is not None:
+                batch_query = {'$and': [query, {'_id': {'$gt': last}}]}
+
+            docs = list(self.coll.find(batch_query, {'_id': 1},
+                                       sort=[('_id', pymongo.ASCENDING)],
+                                       limit=batch_size))
+
+            if not docs:
+                return
+
+            yield [as_unicode(doc['_id']) for doc in docs]
+
+            if len(docs) < batch_size:
+                return
+
+            last = docs[-1]['_id']
+
+    def get_models_by_ids(self, ids):
+        return list(self.coll.find({'_id': {'$in': [self._get_valid_id(pk) for pk in ids]}}))
+
+    def _update_many(self, query, values):
+        if hasattr(self.coll, 'update_many'):
+            return self.coll.update_many(query, {'$set': values}).matched_count
+
+        return self.coll.update(query, {'$set': values}, multi=True).get('n', 0)
+
+    def update_models(self, ids, values):
+        """
+            Update documents with a single `update_many` call.
+        """
+        return self._update_many({'_id': {'$in': [self._get_valid_id(pk) for pk in ids]}},
+                                 values)
+
+    def update_matching_models(self, search, filters, values):
+        """
+            Update all documents matching search and filters with a single
+            `update_many` call.
+        """
+        return self._update_many(self._get_list_query(search, filters), values)
+
     def delete_model(self, model):
         """
             Delete model helper
@@ -347,13 +484,21 @@ class ModelView(BaseModelView):
             count = 0
 
             # TODO: Optimize me
-            for pk in ids:
+            for idx, pk in enumerate(ids):
                 if self.delete_model(self.get_one(pk)):
                     count += 1
 
+                jobs.report_progress(idx + 1, len(ids))
+
+            if is_matching_batch():
+                return count
+
             flash(ngettext('Model was successfully deleted.',
                            '%(count)s models were successfully deleted.',
                            count,
                            count=count))
         except Exception as ex:
             flash(gettext('Failed to delete models. %(error)s', error=str(ex)), 'error')
+
+            if is_matching_batch():
+                return 0
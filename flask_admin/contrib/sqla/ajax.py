@@ -3,8 +3,12 @@ from sqlalchemy import or_
 from flask.ext.admin._compat import as_unicode, string_types
 from flask.ext.admin.model.ajax import AjaxModelLoader, DEFAULT_PAGE_SIZE
 
+from .tools import get_keyset_filter, get_null_order_key
+
 
 class QueryAjaxModelLoader(AjaxModelLoader):
+    supports_keyset = True
+
     def __init__(self, name, session, model, **options):
         """
             Constructor.
@@ -29,10 +33,23 @@ class QueryAjaxModelLoader(AjaxModelLoader):
 
         self.pk = primary_keys[0].name
 
-    def _process_fields(self):
+        self._order_fields = self._process_fields(self.order_by)
+
+        # NULL values are sorted last, primary key is a tiebreaker
+        self._order_keys = []
+
+        for field in self._order_fields:
+            self._order_keys.extend((get_null_order_key(field), field))
+
+        self._order_keys.append(getattr(model, self.pk))
+
+    def _process_fields(self, fields=None):
         remote_fields = []
 
-        for field in self.fields:
+        if fields is None:
+            fields = self.fields
+
+        for field in fields:
             if isinstance(field, string_types):
                 attr = getattr(self.model, field, None)
 
@@ -55,13 +72,47 @@ class QueryAjaxModelLoader(AjaxModelLoader):
     def get_one(self, pk):
         return self.session.query(self.model).get(pk)
 
-    def get_list(self, term, offset=0, limit=DEFAULT_PAGE_SIZE):
+    def get_many(self, pks):
+        model_pk = getattr(self.model, self.pk)
+        models = self.session.query(self.model).filter(model_pk.in_(pks))
+
+        found = dict((as_unicode(getattr(m, self.pk)), m) for m in models)
+        return [found[as_unicode(pk)] for pk in pks if as_unicode(pk) in found]
+
+    def _get_query(self, term):
         query = self.session.query(self.model)
 
-        filters = (field.like(u'%%%s%%' % term) for field in self._cached_fields)
+        pattern = self.get_pattern(term)
+
+        filters = (field.like(pattern) for field in self._cached_fields)
         query = query.filter(or_(*filters))
 
-        return query.offset(offset).limit(limit).all()
+        return query.order_by(*self._order_keys)
+
+    def get_list(self, term, offset=0, limit=DEFAULT_PAGE_SIZE):
+        return self._get_query(term).offset(offset).limit(limit).all()
+
+    def get_keyset_list(self, term, after, limit=DEFAULT_PAGE_SIZE):
+        """
+            Return models positioned after the model with `after` primary
+            key.
+        """
+        anchor = self.get_one(after)
+
+        if anchor is None:
+            return []
+
+        values = []
+
+        for field in self._order_fields:
+            value = getattr(anchor, field.key)
+            values.extend((1 if value is None else 0, value))
+
+        values.append(getattr(anchor, self.pk))
+
+        query = self._get_query(term).filter(get_keyset_filter(self._order_keys, values))
+
+        return query.limit(limit).all()
 
 
 def create_ajax_loader(model, session, name, field_name, options):
@@ -1,13 +1,15 @@
 """
     Useful form fields for use with SQLAlchemy ORM.
 """
+import time
 import operator
+import threading
 
 from wtforms import widgets
 from wtforms.fields import SelectFieldBase
 from wtforms.validators import ValidationError
 
-from .tools import get_primary_key
+from .tools import get_primary_key, get_query_for_ids, has_multiple_pks
 from flask.ext.admin._compat import text_type, string_types
 from flask.ext.admin.form import FormOpts
 from flask.ext.admin.model.fields import InlineFieldList, InlineModelFormField
@@ -21,6 +23,60 @@ except ImportError:
     has_identity_key = False
 
 
+class ChoiceCache(object):
+    """
+        Choice lists of the select fields shared by all form instances,
+        stored per related model so they can be invalidated when the model
+        changes.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, model, key, timeout, load):
+        """
+            Return cached choices or load them with `load` callable.
+
+            :param model:
+                Model class of the choices
+            :param key:
+                Cache key
+            :param timeout:
+                Number of seconds to keep loaded choices
+            :param load:
+                Callable which returns list of choices
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get((model, key))
+
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        value = load()
+
+        with self._lock:
+            self._entries[(model, key)] = (value, now + timeout)
+
+        return value
+
+    def invalidate(self, model):
+        """
+            Discard cached choices of the model.
+
+            :param model:
+                Model class
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] is model:
+                    del self._entries[key]
+
+
+choice_cache = ChoiceCache()
+
+
 class QuerySelectField(SelectFieldBase):
     """
     Will display a select drop-down field to choose between ORM results in a
@@ -50,12 +106,22 @@ class QuerySelectField(SelectFieldBase):
     top of the list. Selecting this choice will result in the `data` property
     being `None`. The label for this blank choice can be set by specifying the
     `blank_text` parameter.
+
+    If `lazy_lookup` is set to `True`, submitted primary keys are resolved
+    with a single `IN` query instead of loading all choices, so the query
+    result is only loaded when the field is rendered. Lookup is only used if
+    primary keys are auto-detected and the model has one primary key column.
+
+    If `choices_cache_key` and `choices_cache_timeout` are set, rendered
+    (pk, label) choices are kept in the shared :class:`ChoiceCache` for
+    `choices_cache_timeout` seconds.
     """
     widget = widgets.Select()
 
     def __init__(self, label=None, validators=None, query_factory=None,
                  get_pk=None, get_label=None, allow_blank=False,
-                 blank_text=u'', **kwargs):
+                 blank_text=u'', lazy_lookup=False, choices_cache_key=None,
+                 choices_cache_timeout=None, **kwargs):
         super(QuerySelectField, self).__init__(label, validators, **kwargs)
         self.query_factory = query_factory
 
@@ -75,15 +141,20 @@ class QuerySelectField(SelectFieldBase):
 
         self.allow_blank = allow_blank
         self.blank_text = blank_text
+        self.lazy_lookup = lazy_lookup
+        self.choices_cache_key = choices_cache_key
+        self.choices_cache_timeout = choices_cache_timeout
         self.query = None
         self._object_list = None
+        self._object_dict = None
+        self._lookup_cache = {}
 
     def _get_data(self):
         if self._formdata is not None:
-            for pk, obj in self._get_object_list():
-                if pk == self._formdata:
-                    self._set_data(obj)
-                    break
+            obj = self._lookup_objects([self._formdata]).get(self._formdata)
+
+            if obj is not None:
+                self._set_data(obj)
         return self._data
 
     def _set_data(self, data):
@@ -99,12 +170,75 @@ class QuerySelectField(SelectFieldBase):
             self._object_list = [(text_type(get_pk(obj)), obj) for obj in query]
         return self._object_list
 
+    def _get_object_dict(self):
+        if self._object_dict is None:
+            self._object_dict = dict(self._get_object_list())
+        return self._object_dict
+
+    def _lookup_objects(self, pks):
+        """
+            Return dictionary of objects by their primary keys. Keys which
+            are not found in the query are skipped.
+        """
+        query = None
+
+        if self.lazy_lookup and self._object_list is None and self.get_pk is get_pk_from_identity:
+            query = self.query or self.query_factory()
+            model = get_query_model(query)
+
+            if model is None or has_multiple_pks(model):
+                query = None
+
+        if query is None:
+            objects = self._get_object_dict()
+        else:
+            missing = [pk for pk in pks if pk not in self._lookup_cache]
+
+            if missing:
+                for obj in get_query_for_ids(query, model, missing):
+                    self._lookup_cache[text_type(self.get_pk(obj))] = obj
+
+            objects = self._lookup_cache
+
+        return dict((pk, objects[pk]) for pk in pks if pk in objects)
+
+    def _get_choices(self):
+        """
+            Return list of (pk, label) choices, from the cache if it is
+            enabled.
+        """
+        def load():
+            return [(pk, self.get_label(obj)) for pk, obj in self._get_object_list()]
+
+        if self.choices_cache_key is None or self.choices_cache_timeout is None:
+            return load()
+
+        model = get_query_model(self.query or self.query_factory())
+
+        if model is None:
+            return load()
+
+        # Cached labels must not reference session bound objects
+        def load_text():
+            return [(pk, text_type(label)) for pk, label in load()]
+
+        return choice_cache.get(model, self.choices_cache_key,
+                                self.choices_cache_timeout, load_text)
+
+    def _get_selected_pks(self):
+        if self.data is None:
+            return set()
+
+        return set([text_type(self.get_pk(self.data))])
+
     def iter_choices(self):
         if self.allow_blank:
             yield (u'__None', self.blank_text, self.data is None)
 
-        for pk, obj in self._get_object_list():
-            yield (pk, self.get_label(obj), obj == self.data)
+        selected = self._get_selected_pks()
+
+        for pk, label in self._get_choices():
+            yield (pk, label, pk in selected)
 
     def process_formdata(self, valuelist):
         if valuelist:
@@ -116,11 +250,15 @@ class QuerySelectField(SelectFieldBase):
 
     def pre_validate(self, form):
         if not self.allow_blank or self.data is not None:
-            for pk, obj in self._get_object_list():
-                if self.data == obj:
-                    break
-            else:
-                raise ValidationError(self.gettext(u'Not a valid choice'))
+            data = self.data
+
+            if data is not None:
+                pk = text_type(self.get_pk(data))
+
+                if self._lookup_objects([pk]).get(pk) == data:
+                    return
+
+            raise ValidationError(self.gettext(u'Not a valid choice'))
 
 
 class QuerySelectMultipleField(QuerySelectField):
@@ -143,14 +281,9 @@ class QuerySelectMultipleField(QuerySelectField):
     def _get_data(self):
         formdata = self._formdata
         if formdata is not None:
-            data = []
-            for pk, obj in self._get_object_list():
-                if not formdata:
-                    break
-                elif pk in formdata:
-                    formdata.remove(pk)
-                    data.append(obj)
-            if formdata:
+            objects = self._lookup_objects(formdata)
+            data = [objects[pk] for pk in formdata if pk in objects]
+            if len(data) != len(formdata):
                 self._invalid_formdata = True
             self._set_data(data)
         return self._data
@@ -161,20 +294,30 @@ class QuerySelectMultipleField(QuerySelectField):
 
     data = property(_get_data, _set_data)
 
+    def _get_selected_pks(self):
+        return set(text_type(self.get_pk(v)) for v in self.data or ())
+
     def iter_choices(self):
-        for pk, obj in self._get_object_list():
-            yield (pk, self.get_label(obj), obj in self.data)
+        selected = self._get_selected_pks()
+
+        for pk, label in self._get_choices():
+            yield (pk, label, pk in selected)
 
     def process_formdata(self, valuelist):
-        self._formdata = set(valuelist)
+        self._formdata = []
+
+        for pk in valuelist:
+            if pk not in self._formdata:
+                self._formdata.append(pk)
 
     def pre_validate(self, form):
         if self._invalid_formdata:
             raise ValidationError(self.gettext(u'Not a valid choice'))
         elif self.data:
-            obj_list = list(x[1] for x in self._get_object_list())
-            for v in self.data:
-                if v not in obj_list:
+            pks = [text_type(self.get_pk(v)) for v in self.data]
+            objects = self._lookup_objects(pks)
+            for pk, v in zip(pks, self.data):
+                if objects.get(pk) != v:
                     raise ValidationError(self.gettext(u'Not a valid choice'))
 
 
@@ -250,7 +393,23 @@ class InlineModelFormList(InlineFieldList):
             self.inline_view.on_model_change(field, model)
 
 
+def get_query_model(query):
+    """
+        Return mapped model class of the query or `None`.
+    """
+    if not hasattr(query, 'column_descriptions'):
+        return None
+
+    model = query.column_descriptions[0]['type']
+
+    if not hasattr(model, '_sa_class_manager'):
+        return None
+
+    return model
+
+
 def get_pk_from_identity(obj):
     # TODO: Remove me
-    cls, key = identity_key(instance=obj)
+    # Newer SQLAlchemy versions also return identity token
+    key = identity_key(instance=obj)[1]
     return u':'.join(text_type(x) for x in key)
@@ -1,5 +1,7 @@
+import logging
+
 from wtforms import fields, validators
-from sqlalchemy import Boolean, Column
+from sqlalchemy import Boolean, Column, select, func, literal_column
 
 from flask.ext.admin import form
 from flask.ext.admin.model.form import (converts, ModelConverterBase,
@@ -12,7 +14,7 @@ from flask.ext.admin._compat import iteritems
 from .validators import Unique
 from .fields import QuerySelectField, QuerySelectMultipleField, InlineModelFormList
 from .tools import has_multiple_pks, filter_foreign_columns
-from .ajax import create_ajax_loader
+from .ajax import create_ajax_loader, QueryAjaxModelLoader
 
 try:
     # Field has better input parsing capabilities.
@@ -21,6 +23,10 @@ except ImportError:
     from wtforms.fields import DateTimeField
 
 
+# Set up logger
+log = logging.getLogger("flask-admin.sqla")
+
+
 class AdminModelConverter(ModelConverterBase):
     """
         SQLAlchemy model to form converter
@@ -70,9 +76,65 @@ class AdminModelConverter(ModelConverterBase):
 
         return None
 
+    def _get_threshold_ajax_loader(self, prop, remote_model):
+        """
+            Create AJAX loader for the relation if the remote table has more
+            rows than `form_ajax_threshold`. Only fields listed for the
+            relation in `form_ajax_threshold_fields` are searched.
+        """
+        threshold = getattr(self.view, 'form_ajax_threshold', None)
+        fields = (getattr(self.view, 'form_ajax_threshold_fields', None) or {}).get(prop.key)
+
+        if threshold is None or not fields or has_multiple_pks(remote_model):
+            return None
+
+        if not self._has_more_rows(remote_model, threshold):
+            return None
+
+        name = prop.key
+
+        if prop.parent.class_ is not self.view.model:
+            name = '%s-%s' % (prop.parent.class_.__name__.lower(), prop.key)
+
+        loader = QueryAjaxModelLoader(name, self.session, remote_model,
+                                      fields=fields, match='prefix')
+        self.view._form_ajax_refs[name] = loader
+
+        return loader
+
+    def _has_more_rows(self, remote_model, threshold):
+        """
+            Check if the table of the remote model has more rows than
+            `threshold`. At most `threshold + 1` rows are counted, on a
+            separate connection, so the session is not affected if the
+            query fails. Result is cached by the view.
+        """
+        cache = getattr(self.view, '_form_ajax_threshold_cache', {})
+        key = (remote_model, threshold)
+
+        if key not in cache:
+            table = remote_model.__table__
+            rows = select([literal_column('1')]).select_from(table).limit(threshold + 1).alias()
+            stmt = select([func.count()]).select_from(rows)
+
+            try:
+                bind = self.session.get_bind(remote_model.__mapper__)
+
+                with bind.connect() as conn:
+                    cache[key] = conn.execute(stmt).scalar() > threshold
+            except Exception as ex:
+                log.warning('Failed to count rows of %s, using select field: %s',
+                            remote_model.__name__, ex)
+                return False
+
+        return cache[key]
+
     def _model_select_field(self, prop, multiple, remote_model, **kwargs):
         loader = getattr(self.view, '_form_ajax_refs', {}).get(prop.key)
 
+        if loader is None and 'query_factory' not in kwargs:
+            loader = self._get_threshold_ajax_loader(prop, remote_model)
+
         if loader:
             if multiple:
                 return AjaxSelectMultipleField(loader, **kwargs)
@@ -82,6 +144,15 @@ class AdminModelConverter(ModelConverterBase):
         if 'query_factory' not in kwargs:
             kwargs['query_factory'] = lambda: self.session.query(remote_model)
 
+        if 'lazy_lookup' not in kwargs:
+            kwargs['lazy_lookup'] = prop.key in (getattr(self.view, 'form_lazy_lookup', None) or ())
+
+        cache_timeout = (getattr(self.view, 'form_choices_cache', None) or {}).get(prop.key)
+
+        if cache_timeout is not None and 'choices_cache_timeout' not in kwargs:
+            kwargs['choices_cache_key'] = (self.view.endpoint, prop.key)
+            kwargs['choices_cache_timeout'] = cache_timeout
+
         if 'widget' not in kwargs:
             if multiple:
                 kwargs['widget'] = form.Select2Widget(multiple=True)
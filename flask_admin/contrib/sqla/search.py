@@ -0,0 +1,325 @@
+from sqlalchemy import func, or_, literal, literal_column, select, cast, Text
+from sqlalchemy.sql import table, column
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.types import Boolean
+
+from flask.ext.admin.model import search
+from flask.ext.admin.contrib.sqla import tools
+
+
+class BaseSQLASearch(search.BaseSearch):
+    """
+        Base SQLAlchemy search engine.
+    """
+    related_criteria = False
+    """
+        Engine builds separate criterion for every column, so criteria
+        on the related tables can be wrapped into `EXISTS` subqueries.
+    """
+
+    def __init__(self, columns=None):
+        """
+            Constructor.
+
+            :param columns:
+                List of column expressions to search in. If not provided,
+                columns from `column_searchable_list` of the view are used.
+        """
+        self.columns = columns
+
+    def get_criterion(self, view, column, criterion):
+        """
+            Return criterion for the column, wrapped into `EXISTS` subquery
+            if column belongs to the related table and view is configured
+            to do so.
+
+            :param view:
+                Associated administrative view
+            :param column:
+                Column
+            :param criterion:
+                Criterion for the column
+        """
+        if getattr(column, 'table', None) is None or not self.related_criteria:
+            return criterion
+
+        return view._get_search_criterion(column, criterion)
+
+    def get_columns(self, view):
+        """
+            Return list of column expressions to search in.
+
+            :param view:
+                Associated administrative view
+        """
+        if self.columns is not None:
+            return self.columns
+
+        return view._search_fields or []
+
+    def init(self, view):
+        if not self.get_columns(view):
+            raise Exception('%s requires columns or column_searchable_list '
+                            'to be set' % self.__class__.__name__)
+
+
+class LikeSearch(BaseSQLASearch):
+    """
+        Default search engine. Every word of the search string should
+        be contained in at least one of the columns.
+
+        Uses `ILIKE` operator, so it can not use regular indexes.
+    """
+    related_criteria = True
+
+    def apply(self, query, search, view):
+        columns = self.get_columns(view)
+
+        for term in search.split(' '):
+            if not term:
+                continue
+
+            stmt = tools.parse_like_term(term)
+            query = query.filter(or_(*[self.get_criterion(view, c, c.ilike(stmt))
+                                       for c in columns]))
+
+        return query
+
+
+class PostgresFullTextSearch(BaseSQLASearch):
+    """
+        PostgreSQL full text search.
+
+        Matches `tsvector` expression against `tsquery` built from the search
+        string. For example, to use stored `tsvector` column with GIN index::
+
+            class PostView(ModelView):
+                search_engine = PostgresFullTextSearch(vector=Post.search_vector)
+
+        If `vector` is not provided, `to_tsvector` of the searchable columns is
+        used, so functional index should be created for the same expression::
+
+            CREATE INDEX post_fts_idx ON post
+            USING gin(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(text, '')));
+    """
+    def __init__(self, vector=None, columns=None, config='english',
+                 query_func='plainto_tsquery'):
+        """
+            Constructor.
+
+            :param vector:
+                `tsvector` expression. Built from `columns` if not provided.
+            :param columns:
+                List of column expressions to search in.
+            :param config:
+                Text search configuration name
+            :param query_func:
+                Function used to convert search string into `tsquery`:
+                `plainto_tsquery`, `phraseto_tsquery` or `websearch_to_tsquery`
+        """
+        super(PostgresFullTextSearch, self).__init__(columns)
+
+        self.vector = vector
+        self.config = config
+        self.query_func = query_func
+
+    def init(self, view):
+        if self.vector is None:
+            super(PostgresFullTextSearch, self).init(view)
+
+    def get_vector(self, view):
+        """
+            Return `tsvector` expression.
+
+            :param view:
+                Associated administrative view
+        """
+        if self.vector is not None:
+            return self.vector
+
+        document = None
+
+        for c in self.get_columns(view):
+            value = func.coalesce(cast(c, Text), '')
+
+            if document is None:
+                document = value
+            else:
+                document = document.op('||')(' ').op('||')(value)
+
+        return func.to_tsvector(self.config, document)
+
+    def apply(self, query, search, view):
+        tsquery = getattr(func, self.query_func)(self.config, search)
+        return query.filter(self.get_vector(view).op('@@')(tsquery))
+
+
+class PostgresTrigramSearch(BaseSQLASearch):
+    """
+        PostgreSQL trigram search, requires `pg_trgm` extension.
+
+        Every word of the search string should be similar to at least
+        one of the columns. Columns should have trigram index, for example::
+
+            CREATE INDEX post_title_trgm_idx ON post USING gin(title gin_trgm_ops);
+    """
+    related_criteria = True
+
+    def __init__(self, columns=None, operator='<%'):
+        """
+            Constructor.
+
+            :param columns:
+                List of column expressions to search in.
+            :param operator:
+                Similarity operator, `<%` (word similarity) by default or `%`
+                to compare with whole column value.
+        """
+        super(PostgresTrigramSearch, self).__init__(columns)
+
+        self.operator = operator
+
+    def apply(self, query, search, view):
+        columns = self.get_columns(view)
+
+        for term in search.split(' '):
+            if not term:
+                continue
+
+            value = literal(term)
+
+            # Word similarity operator expects search term on the left side
+            if self.operator == '<%':
+                criteria = [value.op(self.operator)(c) for c in columns]
+            else:
+                criteria = [c.op(self.operator)(value) for c in columns]
+
+            criteria = [self.get_criterion(view, c, criterion)
+                        for c, criterion in zip(columns, criteria)]
+
+            query = query.filter(or_(*criteria))
+
+        return query
+
+
+class SQLiteFTSSearch(BaseSQLASearch):
+    """
+        SQLite FTS5 full text search.
+
+        Searches in the external FTS5 table, where `rowid` matches primary
+        key of the model::
+
+            CREATE VIRTUAL TABLE post_fts USING fts5(title, text, content='post', content_rowid='id');
+
+            class PostView(ModelView):
+                search_engine = SQLiteFTSSearch('post_fts')
+    """
+    def __init__(self, table_name, prefix=True):
+        """
+            Constructor.
+
+            :param table_name:
+                FTS5 table name
+            :param prefix:
+                Match words starting with the search terms
+        """
+        super(SQLiteFTSSearch, self).__init__(None)
+
+        self.table_name = table_name
+        self.prefix = prefix
+
+    def init(self, view):
+        if tools.has_multiple_pks(view.model):
+            raise Exception('SQLiteFTSSearch does not support models with multiple primary keys')
+
+    def get_match_query(self, search):
+        """
+            Convert search string into FTS5 query. Every word is quoted, so
+            FTS5 syntax in the search string is ignored.
+
+            :param search:
+                Search string
+        """
+        terms = []
+
+        for term in search.split(' '):
+            if not term:
+                continue
+
+            term = '"%s"' % term.replace('"', '""')
+
+            if self.prefix:
+                term += ' *'
+
+            terms.append(term)
+
+        return ' '.join(terms)
+
+    def apply(self, query, search, view):
+        match = self.get_match_query(search)
+
+        if not match:
+            return query
+
+        fts = table(self.table_name, column('rowid'))
+        rowids = select([fts.c.rowid]).where(literal_column(self.table_name).op('MATCH')(match))
+
+        pk = getattr(view.model, tools.get_primary_key(view.model))
+        return query.filter(pk.in_(rowids))
+
+
+class match_against(ColumnElement):
+    """
+        MySQL `MATCH (...) AGAINST (...)` expression.
+    """
+    type = Boolean()
+
+    def __init__(self, columns, value, modifier):
+        self.columns = columns
+        self.value = value
+        self.modifier = modifier
+
+
+@compiles(match_against)
+def _compile_match_against(element, compiler, **kw):
+    return 'MATCH (%s) AGAINST (%s%s)' % (
+        ', '.join(compiler.process(c, **kw) for c in element.columns),
+        compiler.process(element.value, **kw),
+        ' ' + element.modifier if element.modifier else '')
+
+
+class MySQLFullTextSearch(BaseSQLASearch):
+    """
+        MySQL full text search. Columns should match `FULLTEXT` index
+        definition exactly::
+
+            CREATE FULLTEXT INDEX post_fts_idx ON post (title, text);
+
+            class PostView(ModelView):
+                search_engine = MySQLFullTextSearch([Post.title, Post.text])
+    """
+    def __init__(self, columns=None, modifier='IN BOOLEAN MODE'):
+        """
+            Constructor.
+
+            :param columns:
+                List of columns of the `FULLTEXT` index.
+            :param modifier:
+                Search modifier, for example `IN NATURAL LANGUAGE MODE`.
+        """
+        super(MySQLFullTextSearch, self).__init__(columns)
+
+        self.modifier = modifier
+
+    def apply(self, query, search, view):
+        if self.modifier == 'IN BOOLEAN MODE':
+            # Require all words, ignore boolean operators
+            terms = ['+"%s"' % t.replace('"', '') for t in search.split(' ') if t]
+
+            if not terms:
+                return query
+
+            search = ' '.join(terms)
+
+        return query.filter(match_against(self.get_columns(view), literal(search), self.modifier))
@@ -1,4 +1,7 @@
-from sqlalchemy import tuple_, or_, and_
+import weakref
+
+from sqlalchemy import tuple_, or_, and_, select, literal, case
+from sqlalchemy.sql.expression import ClauseElement
 from sqlalchemy.sql.operators import eq
 from sqlalchemy.exc import DBAPIError
 from ast import literal_eval
@@ -82,12 +85,161 @@ def tuple_operator_in(model_pk, ids):
         return None
 
 
+def null_safe_eq(column, value):
+    """
+        Return comparison which is also true if both column and value
+        are `NULL`.
+
+        :param column:
+            Column or expression
+        :param value:
+            Python value or SQL expression
+    """
+    if value is None:
+        return column.is_(None)
+
+    if isinstance(value, ClauseElement):
+        return or_(column == value, and_(column.is_(None), value.is_(None)))
+
+    return column == value
+
+
+def get_null_order_key(column):
+    """
+        Return expression which is 1 for `NULL` column values and 0 otherwise.
+        Used as a sort key before the nullable column, so `NULL` values are
+        positioned after other values regardless of the database.
+
+        :param column:
+            Column or expression
+    """
+    return case([(column.is_(None), 1)], else_=0)
+
+
+def get_keyset_filter(columns, values, reverse=False):
+    """
+        Return filter that selects rows positioned after the anchor row when
+        sorted by `columns`.
+
+        Example::
+
+          columns = [ColumnA, ColumnB]
+          values = (1, 2)
+
+          get_keyset_filter(columns, values) -> or_( ColumnA > 1, and_( ColumnA == 1, ColumnB > 2 ) )
+
+        :param columns:
+            Sort columns, most significant first
+        :param values:
+            Column values of the anchor row
+        :param reverse:
+            If set to `True`, will select rows positioned before the anchor row
+
+        Equality of the preceding columns is `NULL` safe, but rows can not be
+        positioned relative to a `NULL` value, so nullable columns should be
+        preceded by :func:`get_null_order_key`.
+    """
+    clauses = []
+
+    for i, column in enumerate(columns):
+        criteria = [null_safe_eq(columns[j], values[j]) for j in range(i)]
+
+        if reverse:
+            criteria.append(column < values[i])
+        else:
+            criteria.append(column > values[i])
+
+        clauses.append(and_(*criteria))
+
+    return or_(*clauses)
+
+
+class ListRow(object):
+    """
+        Lightweight read-only row used by the list view instead of a model instance.
+
+        Values of dotted names are available as attributes of nested rows, so
+        `row.user.name` works for the `user.name` value.
+    """
+    def __init__(self, names, values):
+        nested = {}
+
+        for name, value in zip(names, values):
+            head, _, tail = name.partition('.')
+
+            if tail:
+                nested.setdefault(head, ([], []))
+                nested[head][0].append(tail)
+                nested[head][1].append(value)
+            else:
+                self.__dict__[name] = value
+
+        for name, (names, values) in nested.items():
+            self.__dict__[name] = ListRow(names, values)
+
+    def __repr__(self):
+        return 'ListRow(%r)' % self.__dict__
+
+
+class RelationSummary(object):
+    """
+        Summary of the to-many relation displayed in the list view.
+    """
+    def __init__(self, count, items=None):
+        """
+            Constructor.
+
+            :param count:
+                Number of related models
+            :param items:
+                List of the first related models or `None`
+        """
+        self.count = count
+        self.items = items
+
+
+# Database capabilities, per engine
+_engine_capabilities = weakref.WeakKeyDictionary()
+
+
+def supports_tuple_in(bind):
+    """
+        Return `True` if the database supports `tuple_(...).in_(...)`.
+
+        Support is checked once per engine by running a trivial query and
+        the result is cached.
+
+        :param bind:
+            Engine or connection
+    """
+    engine = getattr(bind, 'engine', bind)
+
+    capabilities = _engine_capabilities.get(engine)
+
+    if capabilities is None:
+        capabilities = _engine_capabilities[engine] = {}
+
+    if 'tuple_in' not in capabilities:
+        stmt = select([literal(1)]).where(tuple_(literal(1), literal(2)).in_([(1, 2)]))
+
+        try:
+            with engine.connect() as conn:
+                conn.execute(stmt).fetchall()
+
+            capabilities['tuple_in'] = True
+        except DBAPIError:
+            capabilities['tuple_in'] = False
+
+    return capabilities['tuple_in']
+
+
 def get_query_for_ids(modelquery, model, ids):
     """
         Return a query object filtered by primary key values passed in `ids` argument.
 
-        Unfortunately, it is not possible to use `in_` filter if model has more than one
-        primary key.
+        If model has more than one primary key, `tuple_` operator is used when
+        the database supports it, see :func:`supports_tuple_in`. Otherwise keys
+        are compared with :func:`tuple_operator_in`.
     """
     if has_multiple_pks(model):
         # Decode keys to tuples
@@ -96,12 +248,11 @@ def get_query_for_ids(modelquery, model, ids):
         # Get model primary key property references
         model_pk = [getattr(model, name) for name in get_primary_key(model)]
 
-        try:
+        bind = modelquery.session.get_bind(model._sa_class_manager.mapper)
+
+        if supports_tuple_in(bind):
             query = modelquery.filter(tuple_(*model_pk).in_(decoded_ids))
-            # Only the execution of the query will tell us, if the tuple_
-            # operator really works
-            query.all()
-        except DBAPIError:
+        else:
             query = modelquery.filter(tuple_operator_in(model_pk, decoded_ids))
     else:
         model_pk = getattr(model, get_primary_key(model))
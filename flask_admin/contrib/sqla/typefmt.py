@@ -1,8 +1,33 @@
+from flask.ext.admin.babel import gettext
 from flask.ext.admin.model.typefmt import BASE_FORMATTERS, list_formatter
 from sqlalchemy.orm.collections import InstrumentedList
 
+from .tools import RelationSummary
+
+
+def relation_summary_formatter(view, value):
+    """
+        Return first related models followed by the number of remaining
+        ones or just the number of related models.
+
+        :param value:
+            :class:`~flask.ext.admin.contrib.sqla.tools.RelationSummary` instance
+    """
+    if value.items is None:
+        return str(value.count)
+
+    result = list_formatter(view, value.items)
+
+    more = value.count - len(value.items)
+
+    if more > 0:
+        result = gettext('%(items)s and %(count)s more', items=result, count=more)
+
+    return result
+
 
 DEFAULT_FORMATTERS = BASE_FORMATTERS.copy()
 DEFAULT_FORMATTERS.update({
-    InstrumentedList: list_formatter
+    InstrumentedList: list_formatter,
+    RelationSummary: relation_summary_formatter
 })
@@ -1,28 +1,62 @@
 import logging
+import re
 
 from sqlalchemy.orm.attributes import InstrumentedAttribute
-from sqlalchemy.orm import joinedload
-from sqlalchemy.sql.expression import desc
-from sqlalchemy import Column, Boolean, func, or_
+from sqlalchemy.orm import joinedload, subqueryload, lazyload, load_only, ColumnProperty
+from sqlalchemy.sql.expression import desc, ClauseElement
+from sqlalchemy import Column, Boolean, Table, func, and_, or_, text, inspect
 from sqlalchemy.exc import IntegrityError
 
 from flask import flash
 
-from flask.ext.admin._compat import string_types
+from flask.ext.admin._compat import string_types, iteritems, itervalues, as_unicode
+from flask.ext.admin import jobs, profiler
 from flask.ext.admin.babel import gettext, ngettext, lazy_gettext
 from flask.ext.admin.model import BaseModelView
-from flask.ext.admin.actions import action
+from flask.ext.admin.actions import action, is_matching_batch
 from flask.ext.admin._backwards import ObsoleteAttr
 
-from flask.ext.admin.contrib.sqla import form, filters, tools
+from flask.ext.admin.contrib.sqla import form, filters, tools, search as search_engines
 from .typefmt import DEFAULT_FORMATTERS
 from .tools import get_query_for_ids
+from .fields import choice_cache
 from .ajax import create_ajax_loader
 
 
+try:
+    from sqlalchemy.orm import selectinload
+except ImportError:
+    # SQLAlchemy < 1.2
+    selectinload = subqueryload
+
+try:
+    from sqlalchemy.orm import raiseload
+except ImportError:
+    # SQLAlchemy < 1.1
+    raiseload = None
+
 # Set up logger
 log = logging.getLogger("flask-admin.sqla")
 
+# Relationship loading strategies
+RELATION_LOADERS = {
+    'joined': joinedload,
+    'selectin': selectinload,
+    'subquery': subqueryload,
+    'select': lazyload,
+    'raise': raiseload,
+}
+
+# Used to extract row estimate from the PostgreSQL query plan
+explain_rows_re = re.compile(r'rows=(\d+)')
+
+# Statement prefixes used by the profiler to get query plans
+explain_prefixes = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
 
 class ModelView(BaseModelView):
     """
@@ -38,10 +72,19 @@ class ModelView(BaseModelView):
                                               'auto_select_related',
                                               True)
     """
-        Enable automatic detection of displayed foreign keys in this view
-        and perform automatic joined loading for related models to improve
+        Enable automatic detection of displayed relations in this view
+        and perform eager loading for related models to improve
         query performance.
 
+        Many-to-one relations are loaded with `joinedload` and to-many
+        relations are loaded with `selectinload`, so the list page costs a
+        fixed number of queries. Loading strategy can be changed per relation
+        by passing a dictionary of relation names and strategy names
+        (`'joined'`, `'selectin'`, `'subquery'`, `'select'` or `'raise'`)::
+
+            class PostAdmin(ModelView):
+                column_auto_select_related = dict(tags='subquery')
+
         Please note that detection is not recursive: if `__unicode__` method
         of related model uses another model to generate string representation, it
         will still make separate database call.
@@ -51,7 +94,7 @@ class ModelView(BaseModelView):
                                              'list_select_related',
                                               None)
     """
-        List of parameters for SQLAlchemy `subqueryload`. Overrides `column_auto_select_related`
+        List of relations to load eagerly. Overrides `column_auto_select_related`
         property.
 
         For example::
@@ -64,7 +107,31 @@ class ModelView(BaseModelView):
             class PostAdmin(ModelView):
                 column_select_related_list = (Post.user, Post.city)
 
-        Please refer to the `subqueryload` on list of possible values.
+        Loading strategy is selected by relation direction, same as with
+        `column_auto_select_related`. Use tuples to choose strategy explicitly::
+
+            class PostAdmin(ModelView):
+                column_select_related_list = (('user', 'joined'), ('tags', 'raise'))
+
+        Please refer to the SQLAlchemy relationship loading documentation on
+        list of possible values.
+    """
+
+    column_relation_summary = None
+    """
+        Dictionary of to-many relations which are displayed in the list view as
+        a summary instead of the complete collection.
+
+        Value is the number of related models to display, followed by the
+        number of remaining ones. If set to `0`, only the number of related
+        models is displayed. Summary is loaded for the whole page at once,
+        collections themselves are not loaded.
+
+        For example::
+
+            class UserAdmin(ModelView):
+                column_list = ('name', 'orders', 'tags')
+                column_relation_summary = dict(orders=0, tags=3)
     """
 
     column_display_all_relations = ObsoleteAttr('column_display_all_relations',
@@ -108,6 +175,23 @@ class ModelView(BaseModelView):
           For example, if you entered *=ZZZ*, the statement *ILIKE 'ZZZ'* will be used.
     """
 
+    search_engine = None
+    """
+        Search engine used instead of the default `ILIKE` search. Should be an
+        instance of :class:`~flask.ext.admin.contrib.sqla.search.BaseSQLASearch`
+        subclass.
+
+        Engines use columns from `column_searchable_list` unless columns or
+        expression are passed to the engine itself. For example, to use
+        PostgreSQL full text search::
+
+            from flask.ext.admin.contrib.sqla.search import PostgresFullTextSearch
+
+            class MyModelView(ModelView):
+                column_searchable_list = ('name', 'email')
+                search_engine = PostgresFullTextSearch(config='simple')
+    """
+
     column_filters = None
     """
         Collection of the column filters.
@@ -160,6 +244,19 @@ class ModelView(BaseModelView):
         Override this attribute to use non-default converter.
     """
 
+    use_exists_for_related = False
+    """
+        If set to `True`, filters and search on the related model columns will
+        use correlated `EXISTS` subqueries instead of joining related tables.
+
+        Joining one-to-many relations multiplies rows, so list view might
+        display duplicates and inflated row count. `EXISTS` subqueries do not
+        have this problem.
+
+        Only `LikeSearch` and `PostgresTrigramSearch` search engines support
+        this option, other engines still join related tables.
+    """
+
     fast_mass_delete = False
     """
         If set to `False` and user deletes more than one model using built in action,
@@ -172,6 +269,37 @@ class ModelView(BaseModelView):
         CASCADE` for your model.
     """
 
+    mass_delete_batch_size = None
+    """
+        If set and `fast_mass_delete` is `False`, built in delete action will
+        load and delete models in batches of this size and commit once per
+        batch instead of once per model. `on_model_delete` is still called
+        for every model and ORM cascades are still applied, but overridden
+        `delete_model` is not used.
+
+        For example::
+
+            class MyModelView(ModelView):
+                mass_delete_batch_size = 100
+    """
+
+    list_load_rows = False
+    """
+        If set to `True`, list view will select only required columns and will
+        display lightweight read-only rows instead of model instances.
+
+        Rows contain primary key, list columns and `column_formatters_depends`
+        attributes, so formatters should not access anything else. Columns
+        of related models should be referenced by dotted names (for example
+        `user.name`), as relations themselves can not be loaded this way.
+
+        Example::
+
+            class MyModelView(ModelView):
+                list_load_rows = True
+                column_list = ('name', 'user.name')
+    """
+
     inline_models = None
     """
         Inline related-model editing for models with parent-child relations.
@@ -231,6 +359,55 @@ class ModelView(BaseModelView):
                 ]
     """
 
+    form_ajax_threshold = None
+    """
+        If set, relation fields listed in `form_ajax_threshold_fields` use
+        AJAX model loading when the related table has more rows than this
+        threshold. When the form is scaffolded, at most `threshold + 1`
+        rows are counted once for every related table, on a separate
+        connection. Select field is used if they can not be counted.
+        Relations listed in `form_ajax_refs` are not affected.
+
+        For example::
+
+            class MyModelView(ModelView):
+                form_ajax_threshold = 1000
+                form_ajax_threshold_fields = {'user': ('email',)}
+    """
+
+    form_ajax_threshold_fields = None
+    """
+        Dictionary of relation names and fields of the related model to
+        search when the relation switches to AJAX model loading because of
+        `form_ajax_threshold`. Fields are matched by prefix, so they should
+        be indexed.
+    """
+
+    form_choices_cache = None
+    """
+        Dictionary of relation names and number of seconds to cache choices
+        of their select fields. Choices are shared by all form instances and
+        are discarded when models of the related table are changed through
+        their model view.
+
+        For example::
+
+            class MyModelView(ModelView):
+                form_choices_cache = {'country': 3600}
+    """
+
+    form_lazy_lookup = None
+    """
+        List of relation names whose select fields resolve submitted primary
+        keys with a single `IN` query instead of loading all choices. Choices
+        are then only loaded when the form is rendered.
+
+        For example::
+
+            class MyModelView(ModelView):
+                form_lazy_lookup = ('country',)
+    """
+
     form_optional_types = (Boolean,)
     """
         List of field types that should be optional if column is not nullable.
@@ -277,8 +454,16 @@ class ModelView(BaseModelView):
 
         self._filter_joins = dict()
 
+        # Relation paths to the related columns, by filter object and by
+        # search column. Several relations can lead to the same table.
+        self._filter_relation_paths = dict()
+        self._search_relation_paths = dict()
+
         self._sortable_joins = dict()
 
+        # Results of the form_ajax_threshold checks
+        self._form_ajax_threshold_cache = dict()
+
         if self.form_choices is None:
             self.form_choices = {}
 
@@ -295,9 +480,9 @@ class ModelView(BaseModelView):
 
         # Configuration
         if not self.column_select_related_list:
-            self._auto_joins = self.scaffold_auto_joins()
+            self._auto_joins = self.get_relation_loaders(self.scaffold_auto_joins())
         else:
-            self._auto_joins = self.column_select_related_list
+            self._auto_joins = self.get_relation_loaders(self.column_select_related_list)
 
     # Internal API
     def _get_model_iterator(self, model=None):
@@ -341,6 +526,89 @@ class ModelView(BaseModelView):
 
         return join_tables, attr
 
+    def _get_relation_path(self, name, table):
+        """
+            Return list of relation attributes leading from the model to the
+            `table` or `None` if path can not be found.
+
+            :param name:
+                Field name or attribute
+            :param table:
+                Related table
+        """
+        path = []
+
+        if isinstance(name, string_types):
+            model = self.model
+
+            for attribute in name.split('.'):
+                value = getattr(model, attribute)
+
+                if (hasattr(value, 'property') and
+                    hasattr(value.property, 'direction')):
+                    path.append(value)
+                    model = value.property.mapper.class_
+        else:
+            # Attribute of the other model, look for direct relation
+            for p in self._get_model_iterator():
+                if hasattr(p, 'direction') and table in p.mapper.tables:
+                    path.append(getattr(self.model, p.key))
+
+            if len(path) > 1:
+                return None
+
+        return path or None
+
+    def _get_search_criterion(self, column, criterion):
+        """
+            Wrap search criterion for the related column into `EXISTS`
+            subqueries if `use_exists_for_related` is enabled. If several
+            searchable fields reach the column through different relations,
+            criterion matches through any of them.
+
+            :param column:
+                Column referenced by the criterion
+            :param criterion:
+                Criterion
+        """
+        if not self.use_exists_for_related:
+            return criterion
+
+        paths = self._search_relation_paths.get(column)
+
+        if paths is None:
+            # Column which is not in `column_searchable_list`, use relations
+            # to its table
+            table = getattr(column, 'table', None)
+
+            paths = [path
+                     for c, column_paths in iteritems(self._search_relation_paths)
+                     if c.table is table
+                     for path in column_paths]
+
+        if not paths:
+            return criterion
+
+        return or_(*[self._get_related_criterion(path, criterion) for path in paths])
+
+    def _get_related_criterion(self, path, criterion):
+        """
+            Wrap criterion into `EXISTS` subqueries along the relation path.
+
+            :param path:
+                List of relation attributes leading from the model to the
+                column referenced by the criterion
+            :param criterion:
+                Criterion
+        """
+        for attr in reversed(path):
+            if attr.property.uselist:
+                criterion = attr.any(criterion)
+            else:
+                criterion = attr.has(criterion)
+
+        return criterion
+
     def _need_join(self, table):
         return table not in self.model._sa_class_manager.mapper.tables
 
@@ -459,6 +727,8 @@ class ModelView(BaseModelView):
             For SQLAlchemy, this will initialize internal fields: list of
             column objects used for filtering, etc.
         """
+        self._search_relation_paths = dict()
+
         if self.column_searchable_list:
             self._search_fields = []
             self._search_joins = []
@@ -480,13 +750,28 @@ class ModelView(BaseModelView):
 
                     self._search_fields.append(column)
 
+                    if join_tables or self._need_join(column.table):
+                        path = self._get_relation_path(p, column.table)
+
+                        if path:
+                            self._search_relation_paths.setdefault(column, []).append(path)
+
                     # Store joins, avoid duplicates
                     for table in join_tables:
                         if table.name not in joins:
                             self._search_joins.append(table)
                             joins.add(table.name)
 
-        return bool(self.column_searchable_list)
+        if self.search_engine is not None:
+            self._search_engine = self.search_engine
+        else:
+            self._search_engine = search_engines.LikeSearch()
+
+        if self.column_searchable_list or self.search_engine is not None:
+            self._search_engine.init(self)
+            return True
+
+        return False
 
     def is_text_column_type(self, name):
         """
@@ -537,6 +822,13 @@ class ModelView(BaseModelView):
                             self._filter_joins[table.name] = join_tables
                         elif self._need_join(table.name):
                             self._filter_joins[table.name] = [table.name]
+
+                        path = self._get_relation_path(name, table)
+
+                        if path:
+                            for f in flt:
+                                self._filter_relation_paths[f] = path
+
                         filters.extend(flt)
 
             return filters
@@ -574,6 +866,13 @@ class ModelView(BaseModelView):
             if flt and not join_tables and self._need_join(column.table):
                 self._filter_joins[column.table.name] = [column.table]
 
+            if flt and (join_tables or self._need_join(column.table)):
+                path = self._get_relation_path(name, column.table)
+
+                if path:
+                    for f in flt:
+                        self._filter_relation_paths[f] = path
+
             return flt
 
     def is_valid_filter(self, filter):
@@ -627,6 +926,11 @@ class ModelView(BaseModelView):
         if not self.column_auto_select_related:
             return []
 
+        strategies = self.column_auto_select_related
+
+        if not isinstance(strategies, dict):
+            strategies = {}
+
         relations = set()
 
         for p in self._get_model_iterator():
@@ -635,17 +939,90 @@ class ModelView(BaseModelView):
                 if p.mapper.class_ == self.model:
                     continue
 
-                if p.direction.name in ['MANYTOONE', 'MANYTOMANY']:
-                    relations.add(p.key)
+                relations.add(p.key)
 
         joined = []
 
+        # Summary relations are loaded separately
+        if self.column_relation_summary:
+            relations.difference_update(self.column_relation_summary)
+
         for prop, name in self._list_columns:
             if prop in relations:
-                joined.append(getattr(self.model, prop))
+                strategy = strategies.get(prop)
+
+                if strategy is None:
+                    joined.append(getattr(self.model, prop))
+                elif strategy:
+                    joined.append((getattr(self.model, prop), strategy))
 
         return joined
 
+    def get_relation_loaders(self, relations):
+        """
+            Return list of SQLAlchemy loader options for the relations.
+
+            :param relations:
+                List of relation names or attributes, optionally paired with
+                the loading strategy name or loader function
+        """
+        loaders = []
+
+        for relation in relations:
+            if isinstance(relation, tuple):
+                relation, strategy = relation
+            else:
+                strategy = self._get_default_loading_strategy(relation)
+
+            if not callable(strategy):
+                loader = RELATION_LOADERS.get(strategy)
+
+                if loader is None:
+                    raise Exception('Unsupported loading strategy %s for %s' % (strategy, relation))
+
+                strategy = loader
+
+            loaders.append(strategy(relation))
+
+        return loaders
+
+    def _get_default_loading_strategy(self, relation):
+        """
+            Return `'selectin'` for to-many relations and `'joined'` otherwise.
+        """
+        if isinstance(relation, string_types):
+            if '.' in relation or not hasattr(self.model, relation):
+                return 'joined'
+
+            relation = getattr(self.model, relation)
+
+        prop = getattr(relation, 'property', None)
+
+        if getattr(prop, 'uselist', False):
+            return 'selectin'
+
+        return 'joined'
+
+    def _install_profiler(self):
+        profiler.install_sqlalchemy()
+
+    def _explain_query(self, query):
+        mapper = self.model._sa_class_manager.mapper
+        dialect = self.session.get_bind(mapper).dialect.name
+
+        prefix = explain_prefixes.get(dialect)
+
+        if prefix is None:
+            return None
+
+        try:
+            rows = self.session.connection(mapper=mapper).execute(prefix + query.statement,
+                                                                  query.params)
+            return '\n'.join(' '.join(as_unicode(v) for v in row) for row in rows)
+        except Exception as ex:
+            log.exception('Failed to explain query')
+            return as_unicode(ex)
+
     # AJAX foreignkey support
     def _create_ajax_loader(self, name, options):
         return create_ajax_loader(self.model, self.session, name, name, options)
@@ -712,24 +1089,24 @@ class ModelView(BaseModelView):
 
         return None
 
-    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True):
+    def _use_search_exists(self):
         """
-            Return models from the database.
+            Return `True` if search criteria on the related tables are
+            wrapped into `EXISTS` subqueries instead of joins.
+        """
+        return (self.use_exists_for_related and
+                getattr(self._search_engine, 'related_criteria', False))
+
+    def _get_list_queries(self, search, filters):
+        """
+            Return data query, count query and a set of joined table names
+            with search and filters applied.
 
-            :param page:
-                Page number
-            :param sort_column:
-                Sort column name
-            :param sort_desc:
-                Descending or ascending sort
             :param search:
                 Search query
-            :param execute:
-                Execute query immediately? Default is `True`
             :param filters:
                 List of filter tuples
         """
-
         # Will contain names of joined tables to avoid duplicate joins
         joins = set()
 
@@ -746,7 +1123,7 @@ class ModelView(BaseModelView):
         # Apply search criteria
         if self._search_supported and search:
             # Apply search-related joins
-            if self._search_joins:
+            if self._search_joins and not self._use_search_exists():
                 for table in self._search_joins:
                     if table.name not in joins:
                         query = query.outerjoin(table)
@@ -755,16 +1132,8 @@ class ModelView(BaseModelView):
                         joins.add(table.name)
 
             # Apply terms
-            terms = search.split(' ')
-
-            for term in terms:
-                if not term:
-                    continue
-
-                stmt = tools.parse_like_term(term)
-                filter_stmt = [c.ilike(stmt) for c in self._search_fields]
-                query = query.filter(or_(*filter_stmt))
-                count_query = count_query.filter(or_(*filter_stmt))
+            query = self._search_engine.apply(query, search, self)
+            count_query = self._search_engine.apply(count_query, search, self)
 
         # Apply filters
         if filters and self._filters:
@@ -774,6 +1143,17 @@ class ModelView(BaseModelView):
                 # Figure out joins
                 tbl = flt.column.table.name
 
+                path = self._filter_relation_paths.get(flt)
+
+                if self.use_exists_for_related and path:
+                    # Extract filter criterion and wrap it into EXISTS
+                    flt_query = flt.apply(self.session.query(self.model), flt.clean(value))
+                    criterion = self._get_related_criterion(path, flt_query.whereclause)
+
+                    query = query.filter(criterion)
+                    count_query = count_query.filter(criterion)
+                    continue
+
                 join_tables = self._filter_joins.get(tbl, [])
 
                 for table in join_tables:
@@ -786,14 +1166,254 @@ class ModelView(BaseModelView):
                 query = flt.apply(query, flt.clean(value))
                 count_query = flt.apply(count_query, flt.clean(value))
 
-        # Calculate number of rows
-        count = count_query.scalar()
+        return query, count_query, joins
 
-        # Auto join
-        for j in self._auto_joins:
-            query = query.options(joinedload(j))
+    def _get_count_estimate(self, query):
+        """
+            Return estimated number of rows for the query using PostgreSQL
+            planner statistics or `None` if estimate is not available.
 
-        # Sorting
+            :param query:
+                Query with search and filters applied
+        """
+        mapper = self.model._sa_class_manager.mapper
+        bind = self.session.get_bind(mapper)
+
+        if bind.dialect.name != 'postgresql':
+            return None
+
+        if query.whereclause is None:
+            # Table statistics are enough if nothing is filtered
+            stmt = text('SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)')
+            value = self.session.execute(stmt, {'name': self.model.__table__.fullname},
+                                         mapper=mapper).scalar()
+
+            if value is not None and value >= 0:
+                return int(value)
+
+            return None
+
+        # Ask planner for the number of rows
+        compiled = query.statement.compile(dialect=bind.dialect)
+        plan = self.session.connection(mapper).execute('EXPLAIN ' + str(compiled),
+                                                       compiled.params).fetchone()
+
+        match = explain_rows_re.search(plan[0])
+        if match:
+            return int(match.group(1))
+
+        return None
+
+    # Index check
+    def _get_index_column(self, column):
+        """
+            Return table column for the sort, search or filter column or
+            `None` if it is an expression.
+        """
+        prop = getattr(column, 'property', None)
+
+        if prop is not None:
+            columns = getattr(prop, 'columns', None)
+
+            if not columns or len(columns) > 1:
+                return None
+
+            column = columns[0]
+
+        if not isinstance(column, Column) or not isinstance(column.table, Table):
+            return None
+
+        return column
+
+    def _get_indexed_columns(self, inspector, table):
+        """
+            Return names of the columns which are leading columns of the
+            table indexes, primary key or unique constraints.
+        """
+        result = set()
+
+        for index in inspector.get_indexes(table.name, schema=table.schema):
+            if index['column_names']:
+                result.add(index['column_names'][0])
+
+        pk = inspector.get_pk_constraint(table.name, schema=table.schema)
+        if pk and pk.get('constrained_columns'):
+            result.add(pk['constrained_columns'][0])
+
+        try:
+            for constraint in inspector.get_unique_constraints(table.name, schema=table.schema):
+                if constraint['column_names']:
+                    result.add(constraint['column_names'][0])
+        except NotImplementedError:
+            pass
+
+        return result
+
+    def _get_index_suggestion(self, dialect, column, operation):
+        """
+            Return `CREATE INDEX` statement for the column.
+        """
+        preparer = dialect.identifier_preparer
+
+        table = column.table
+        name = preparer.quote('ix_%s_%s' % (table.name, column.name))
+
+        if operation == 'search':
+            # Only trigram index can serve ILIKE with leading wildcard
+            if dialect.name != 'postgresql':
+                return None
+
+            return 'CREATE INDEX %s ON %s USING gin (%s gin_trgm_ops)' % (
+                preparer.quote('ix_%s_%s_trgm' % (table.name, column.name)),
+                preparer.format_table(table),
+                preparer.quote(column.name))
+
+        return 'CREATE INDEX %s ON %s (%s)' % (name,
+                                               preparer.format_table(table),
+                                               preparer.quote(column.name))
+
+    def get_index_report(self):
+        """
+            Inspect database indexes of the sortable and filterable columns.
+
+            Searchable columns are reported if search uses default
+            :class:`~flask.ext.admin.contrib.sqla.search.LikeSearch` engine,
+            because `ILIKE` with leading wildcard can not use regular indexes.
+        """
+        bind = self.session.get_bind(self.model._sa_class_manager.mapper)
+        inspector = inspect(bind)
+
+        columns = []
+
+        for column in itervalues(self._sortable_columns):
+            columns.append(('sort', column))
+
+        if isinstance(self._search_engine, search_engines.LikeSearch):
+            for column in self._search_fields or ():
+                columns.append(('search', column))
+
+        for flt in self._filters or ():
+            columns.append(('filter', getattr(flt, 'column', None)))
+
+        indexes = {}
+        seen = set()
+        report = []
+
+        for operation, column in columns:
+            column = self._get_index_column(column)
+
+            if column is None:
+                continue
+
+            table = column.table
+            key = (operation, table.fullname, column.name)
+
+            if key in seen:
+                continue
+
+            seen.add(key)
+
+            if operation != 'search':
+                if table not in indexes:
+                    indexes[table] = self._get_indexed_columns(inspector, table)
+
+                if column.name in indexes[table]:
+                    continue
+
+            report.append((operation,
+                           '%s.%s' % (table.name, column.name),
+                           self._get_index_suggestion(bind.dialect, column, operation)))
+
+        return report
+
+    def _get_load_only_columns(self):
+        """
+            Return names of the column attributes to load for the list view
+            or `None` if all columns should be loaded.
+        """
+        if self._list_load_columns is None:
+            return None
+
+        mapper = self.model._sa_class_manager.mapper
+
+        # Primary key is always required
+        names = set(mapper.get_property_by_column(c).key for c in mapper.primary_key)
+
+        for name in self._list_load_columns:
+            if not isinstance(name, string_types):
+                name = getattr(name, 'key', None)
+
+                if name is None:
+                    continue
+
+            # Related model columns are loaded by the relation itself
+            key = name.split('.')[0]
+
+            if not mapper.has_property(key):
+                continue
+
+            prop = mapper.get_property(key)
+
+            if hasattr(prop, 'direction'):
+                # Foreign keys are needed to load related models
+                for column in prop.local_columns:
+                    if column.table in mapper.tables:
+                        names.add(mapper.get_property_by_column(column).key)
+            elif hasattr(prop, 'columns'):
+                names.add(prop.key)
+
+        return list(names)
+
+    def _get_list_row_query(self, query, joins):
+        """
+            Return query selecting list row columns and the list of column names.
+
+            :param query:
+                Query
+            :param joins:
+                Joins set
+        """
+        names = []
+        columns = []
+
+        for field in self._get_pk_fields():
+            names.append(field.key)
+            columns.append(field)
+
+        load_columns = self._list_load_columns
+
+        if load_columns is None:
+            load_columns = [name for name, _ in self._list_columns]
+
+            if self.column_formatters_depends:
+                for name, _ in self._list_columns:
+                    load_columns.extend(self.column_formatters_depends.get(name, ()))
+
+        for name in load_columns:
+            if not isinstance(name, string_types) or name in names:
+                continue
+
+            join_tables, attr = self._get_field_with_path(name)
+
+            # Skip relations and non-SQL properties
+            if ((hasattr(attr, 'property') and hasattr(attr.property, 'direction')) or
+                    not (hasattr(attr, '__clause_element__') or isinstance(attr, ClauseElement))):
+                continue
+
+            for table in join_tables:
+                if table.name not in joins:
+                    query = query.outerjoin(table)
+                    joins.add(table.name)
+
+            names.append(name)
+            columns.append(attr)
+
+        return query.with_entities(*columns), names
+
+    def _apply_sorting(self, query, joins, sort_column, sort_desc):
+        """
+            Order query by the sort column or by the default sort order.
+        """
         if sort_column is not None:
             if sort_column in self._sortable_columns:
                 sort_field = self._sortable_columns[sort_column]
@@ -808,18 +1428,398 @@ class ModelView(BaseModelView):
 
                 query, joins = self._order_by(query, joins, sort_joins, sort_field, sort_desc)
 
+        return query, joins
+
+    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True):
+        """
+            Return models from the database.
+
+            :param page:
+                Page number
+            :param sort_column:
+                Sort column name
+            :param sort_desc:
+                Descending or ascending sort
+            :param search:
+                Search query
+            :param execute:
+                Execute query immediately? Default is `True`
+            :param filters:
+                List of filter tuples
+        """
+        query, count_query, joins = self._get_list_queries(search, filters)
+
+        # Calculate number of rows
+        count = self.get_list_count(count_query.scalar,
+                                    lambda: self._get_count_estimate(query),
+                                    search, filters)
+
+        if self.list_load_rows:
+            # Select only columns required for list rows
+            query, row_names = self._get_list_row_query(query, joins)
+        else:
+            # Auto join
+            if self._auto_joins:
+                query = query.options(*self._auto_joins)
+
+            # Load only displayed columns
+            load_columns = self._get_load_only_columns()
+
+            if load_columns is not None:
+                query = query.options(load_only(*load_columns))
+
+        # Sorting
+        query, joins = self._apply_sorting(query, joins, sort_column, sort_desc)
+
         # Pagination
         if page is not None:
             query = query.offset(page * self.page_size)
 
-        query = query.limit(self.page_size)
+        # Fetch one extra row to find out if there is next page
+        if self.simple_list_pager:
+            query = query.limit(self.page_size + 1)
+        else:
+            query = query.limit(self.page_size)
 
         # Execute if needed
         if execute:
             query = query.all()
 
+            if self.list_load_rows:
+                query = [tools.ListRow(row_names, row) for row in query]
+
+            self._load_relation_summary(query)
+
         return count, query
 
+    def get_matching_pk_batches(self, search, filters, batch_size):
+        """
+            Yield lists of primary keys of models matching search and filters.
+            Only primary key columns are selected and every batch is a separate
+            query positioned after the last key of the previous batch, so
+            handler can change or delete models between batches.
+
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+            :param batch_size:
+                Number of keys in a batch
+        """
+        query, count_query, joins = self._get_list_queries(search, filters)
+
+        pk_fields = self._get_pk_fields()
+        query = query.with_entities(*pk_fields).order_by(None).order_by(*pk_fields)
+
+        last = None
+
+        while True:
+            batch_query = query
+
+            if last is not None:
+                batch_query = batch_query.filter(tools.get_keyset_filter(pk_fields, last))
+
+            rows = batch_query.limit(batch_size).all()
+
+            if not rows:
+                return
+
+            if len(pk_fields) > 1:
+                yield [tools.iterencode(row) for row in rows]
+            else:
+                yield [as_unicode(row[0]) for row in rows]
+
+            if len(rows) < batch_size:
+                return
+
+            last = list(rows[-1])
+
+    def _get_matching_query(self, search, filters):
+        """
+            Return query matching search and filters, which can be used for
+            bulk `UPDATE` or `DELETE`, or `None` if it is not possible.
+        """
+        query, count_query, joins = self._get_list_queries(search, filters)
+
+        if not joins:
+            return query
+
+        # UPDATE and DELETE can not have joins, so filter by primary key
+        if tools.has_multiple_pks(self.model):
+            return None
+
+        pk = getattr(self.model, self._primary_key)
+        return self.get_query().filter(pk.in_(query.with_entities(pk).subquery()))
+
+    def get_export_list(self, sort_column, sort_desc, search, filters):
+        """
+            Return query over all models matching search and filters, which
+            fetches rows in batches of `export_batch_size` with `yield_per`.
+
+            Eager loading options of the list view are not applied, because
+            they can not be combined with `yield_per`.
+
+            :param sort_column:
+                Sort column name
+            :param sort_desc:
+                Descending or ascending sort
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+        """
+        query, count_query, joins = self._get_list_queries(search, filters)
+
+        query, joins = self._apply_sorting(query, joins, sort_column, sort_desc)
+
+        return query.yield_per(self.export_batch_size)
+
+    # Relation summary
+    def _load_relation_summary(self, models):
+        """
+            Load `column_relation_summary` values for the models and store
+            them in the model instances.
+
+            :param models:
+                List of models displayed on the page
+        """
+        if not self.column_relation_summary or not models:
+            return
+
+        pk = self._get_pk_fields()
+
+        if len(pk) > 1:
+            raise Exception('column_relation_summary requires model with single primary key')
+
+        pk = pk[0]
+        ids = [getattr(m, pk.key) for m in models]
+
+        summaries = dict((i, {}) for i in ids)
+
+        for name, limit in iteritems(self.column_relation_summary):
+            relation = getattr(self.model, name)
+
+            # Count related models with one grouped query
+            query = (self.session.query(pk, func.count('*'))
+                     .select_from(self.model)
+                     .join(relation)
+                     .filter(pk.in_(ids))
+                     .group_by(pk))
+
+            counts = dict(query)
+
+            items = dict((i, []) for i in ids)
+
+            if limit:
+                for parent_id, item in self._get_relation_summary_items(pk, ids, relation, limit):
+                    items[parent_id].append(item)
+
+            for i in ids:
+                summaries[i][name] = tools.RelationSummary(counts.get(i, 0),
+                                                           items[i] if limit else None)
+
+        for m in models:
+            m._relation_summary = summaries[getattr(m, pk.key)]
+
+    def _get_relation_summary_items(self, pk, ids, relation, limit):
+        """
+            Return first `limit` related models for every parent model as
+            `(parent_id, model)` tuples.
+
+            Uses `row_number()` window function, so database has to support it.
+        """
+        mapper = relation.property.mapper
+        related_pks = list(mapper.primary_key)
+
+        order_by = relation.property.order_by or related_pks
+
+        row_number = func.row_number().over(partition_by=pk, order_by=order_by)
+
+        columns = [pk.label('parent_id'), row_number.label('row_number')]
+        columns.extend(c.label('related_%d' % i) for i, c in enumerate(related_pks))
+
+        subquery = (self.session.query(*columns)
+                    .select_from(self.model)
+                    .join(relation)
+                    .filter(pk.in_(ids))
+                    .subquery())
+
+        onclause = and_(*[c == subquery.c['related_%d' % i] for i, c in enumerate(related_pks)])
+
+        query = (self.session.query(mapper.class_, subquery.c.parent_id)
+                 .join(subquery, onclause)
+                 .filter(subquery.c.row_number <= limit)
+                 .order_by(subquery.c.parent_id, subquery.c.row_number))
+
+        return [(parent_id, item) for item, parent_id in query]
+
+    def _get_field_value(self, model, name):
+        """
+            Get unformatted field value from the model
+        """
+        if self.column_relation_summary and name in self.column_relation_summary:
+            summary = getattr(model, '_relation_summary', None)
+
+            if summary is not None:
+                return summary[name]
+
+        return super(ModelView, self)._get_field_value(model, name)
+
+    # Keyset pagination
+    def _get_pk_fields(self):
+        """
+            Return list of primary key attributes of the model.
+        """
+        if isinstance(self._primary_key, tuple):
+            return [getattr(self.model, name) for name in self._primary_key]
+        else:
+            return [getattr(self.model, self._primary_key)]
+
+    def _get_keyset_sort(self, sort_column, sort_desc):
+        """
+            Return sort field, sort joins and sort direction for keyset pagination.
+        """
+        if sort_column is not None:
+            if sort_column in self._sortable_columns:
+                return (self._sortable_columns[sort_column],
+                        self._sortable_joins.get(sort_column),
+                        sort_desc)
+        else:
+            order = self._get_default_order()
+
+            if order:
+                sort_joins, field, sort_desc = order
+                join_tables, attr = self._get_field_with_path(field)
+                return attr, sort_joins, sort_desc
+
+        return None, None, False
+
+    def _get_keyset_cursor(self, direction, model):
+        """
+            Encode cursor pointing to the `model` row.
+
+            :param direction:
+                Either 'next' or 'prev'
+            :param model:
+                Model instance
+        """
+        values = [direction]
+        values.extend(getattr(model, f.key) for f in self._get_pk_fields())
+        return tools.iterencode(values)
+
+    def get_keyset_list(self, cursor, sort_column, sort_desc, search, filters):
+        """
+            Return models from the database using keyset pagination.
+
+            Rows are sorted by the sort column with primary key as a tiebreaker
+            and page is positioned relative to the row referenced by the cursor,
+            so database does not have to skip rows like with `OFFSET`. Rows
+            with `NULL` sort value are displayed after all other rows in
+            ascending order and before them in descending order.
+
+            :param cursor:
+                Cursor returned by the previous call or None for the first page
+            :param sort_column:
+                Sort column name
+            :param sort_desc:
+                Descending or ascending sort
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+        """
+        query, count_query, joins = self._get_list_queries(search, filters)
+
+        # Calculate number of rows
+        count = self.get_list_count(count_query.scalar,
+                                    lambda: self._get_count_estimate(query),
+                                    search, filters)
+
+        if self.list_load_rows:
+            # Select only columns required for list rows
+            query, row_names = self._get_list_row_query(query, joins)
+        else:
+            # Auto join
+            if self._auto_joins:
+                query = query.options(*self._auto_joins)
+
+            # Load only displayed columns
+            load_columns = self._get_load_only_columns()
+
+            if load_columns is not None:
+                query = query.options(load_only(*load_columns))
+
+        sort_field, sort_joins, sort_desc = self._get_keyset_sort(sort_column, sort_desc)
+
+        # Primary key is used as a tiebreaker
+        pk_fields = self._get_pk_fields()
+        keys = list(pk_fields)
+
+        if sort_field is not None:
+            query, joins = self._order_by(query, joins, sort_joins, None, False)
+            keys.insert(0, sort_field)
+            keys.insert(0, tools.get_null_order_key(sort_field))
+
+        # Decode cursor
+        backward = False
+        anchored = False
+
+        if cursor:
+            values = tools.iterdecode(cursor)
+
+            if len(values) == len(pk_fields) + 1 and values[0] in ('next', 'prev'):
+                backward = values[0] == 'prev'
+                anchored = True
+
+                pk_values = values[1:]
+                anchor = list(pk_values)
+
+                # Sort value of the anchor row is looked up by its primary key
+                if sort_field is not None:
+                    subquery = self.session.query(sort_field).select_from(self.model)
+
+                    for table in sort_joins or ():
+                        subquery = subquery.outerjoin(table)
+
+                    subquery = subquery.filter(and_(*[f == v for f, v in zip(pk_fields, pk_values)]))
+                    anchor_value = subquery.correlate(None).as_scalar()
+
+                    anchor.insert(0, anchor_value)
+                    anchor.insert(0, tools.get_null_order_key(anchor_value))
+
+                query = query.filter(tools.get_keyset_filter(keys, anchor, sort_desc != backward))
+
+        for key in keys:
+            if sort_desc != backward:
+                query = query.order_by(desc(key))
+            else:
+                query = query.order_by(key)
+
+        # Fetch one extra row to find out if there are more rows
+        data = query.limit(self.page_size + 1).all()
+
+        if self.list_load_rows:
+            data = [tools.ListRow(row_names, row) for row in data]
+
+        has_more = len(data) > self.page_size
+        data = data[:self.page_size]
+
+        self._load_relation_summary(data)
+
+        if backward:
+            data.reverse()
+
+        prev_cursor = next_cursor = None
+
+        if data:
+            if (backward and has_more) or (not backward and anchored):
+                prev_cursor = self._get_keyset_cursor('prev', data[0])
+
+            if backward or has_more:
+                next_cursor = self._get_keyset_cursor('next', data[-1])
+
+        return count, data, prev_cursor, next_cursor
+
     def get_one(self, id):
         """
             Return a single model by its id.
@@ -851,6 +1851,7 @@ class ModelView(BaseModelView):
             self.session.add(model)
             self._on_model_change(form, model, True)
             self.session.commit()
+            self.invalidate_choices()
         except Exception as ex:
             if not self.handle_view_exception(ex):
                 flash(gettext('Failed to create model. %(error)s', error=str(ex)), 'error')
@@ -877,6 +1878,7 @@ class ModelView(BaseModelView):
             form.populate_obj(model)
             self._on_model_change(form, model, False)
             self.session.commit()
+            self.invalidate_choices()
         except Exception as ex:
             if not self.handle_view_exception(ex):
                 flash(gettext('Failed to update model. %(error)s', error=str(ex)), 'error')
@@ -890,6 +1892,73 @@ class ModelView(BaseModelView):
 
         return True
 
+    def invalidate_choices(self):
+        """
+            Discard cached choices of the relation fields which point to the
+            view model. Called after models are changed by the view, call it
+            if models are changed elsewhere.
+        """
+        choice_cache.invalidate(self.model)
+
+    def is_valid_bulk_update_field(self, name):
+        """
+            Only column attributes which map to a single table column can
+            be updated with a single statement.
+
+            :param name:
+                Field name
+        """
+        prop = getattr(getattr(self.model, name, None), 'property', None)
+
+        if not isinstance(prop, ColumnProperty) or len(prop.columns) != 1:
+            return False
+
+        return isinstance(prop.columns[0], Column)
+
+    def get_models_by_ids(self, ids):
+        return get_query_for_ids(self.get_query(), self.model, ids).all()
+
+    def _update_query(self, query, values):
+        try:
+            count = query.update(values, synchronize_session=False)
+            self.session.commit()
+            self.invalidate_choices()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        return count
+
+    def update_models(self, ids, values):
+        """
+            Update models with a single `UPDATE ... WHERE pk IN (...)`.
+
+            :param ids:
+                List of model ids
+            :param values:
+                Dictionary of attribute names and values
+        """
+        return self._update_query(get_query_for_ids(self.get_query(), self.model, ids), values)
+
+    def update_matching_models(self, search, filters, values):
+        """
+            Update all models matching search and filters with a single
+            `UPDATE` statement.
+
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+            :param values:
+                Dictionary of attribute names and values
+        """
+        query = self._get_matching_query(search, filters)
+
+        if query is None:
+            raise Exception('Can not update models with multiple primary keys filtered by related tables')
+
+        return self._update_query(query, values)
+
     def delete_model(self, model):
         """
             Delete model.
@@ -902,6 +1971,7 @@ class ModelView(BaseModelView):
             self.session.flush()
             self.session.delete(model)
             self.session.commit()
+            self.invalidate_choices()
             return True
         except Exception as ex:
             if not self.handle_view_exception(ex):
@@ -929,14 +1999,100 @@ class ModelView(BaseModelView):
 
             if self.fast_mass_delete:
                 count = query.delete(synchronize_session=False)
+            elif self.mass_delete_batch_size:
+                count, failed = self._delete_in_batches(ids)
+
+                # Error is already flashed, earlier batches are committed
+                if failed:
+                    if is_matching_batch():
+                        return count
+
+                    flash(gettext('Deleted %(count)s of %(total)s models before an error.',
+                                  count=count, total=len(ids)), 'error')
+                    return
             else:
                 count = 0
 
-                for m in query.all():
+                models = query.all()
+
+                for idx, m in enumerate(models):
                     if self.delete_model(m):
                         count += 1
 
+                    jobs.report_progress(idx + 1, len(models))
+
+            self.session.commit()
+            self.invalidate_choices()
+
+            if is_matching_batch():
+                return count
+
+            flash(ngettext('Model was successfully deleted.',
+                           '%(count)s models were successfully deleted.',
+                           count,
+                           count=count))
+        except Exception as ex:
+            if not self.handle_view_exception(ex):
+                raise
+
+            flash(gettext('Failed to delete models. %(error)s', error=str(ex)), 'error')
+
+            if is_matching_batch():
+                return 0
+
+    def _delete_in_batches(self, ids):
+        """
+            Delete models in batches of `mass_delete_batch_size`, with
+            one transaction per batch. Stops at the first failed batch.
+
+            Return tuple of the number of deleted models and `True` if
+            a batch failed.
+        """
+        count = 0
+
+        for offset in range(0, len(ids), self.mass_delete_batch_size):
+            batch = ids[offset:offset + self.mass_delete_batch_size]
+
+            try:
+                models = get_query_for_ids(self.get_query(), self.model, batch).all()
+
+                for m in models:
+                    self.on_model_delete(m)
+                    self.session.delete(m)
+
+                self.session.commit()
+                self.invalidate_choices()
+            except Exception as ex:
+                if not self.handle_view_exception(ex):
+                    flash(gettext('Failed to delete models. %(error)s', error=str(ex)), 'error')
+                    log.exception('Failed to delete models')
+
+                self.session.rollback()
+                return count, True
+
+            count += len(models)
+            jobs.report_progress(min(offset + len(batch), len(ids)), len(ids))
+
+        return count, False
+
+    def action_delete_matching(self, search, filters):
+        """
+            Delete all models matching search and filters with a single
+            `DELETE` statement if `fast_mass_delete` is enabled.
+        """
+        if not self.fast_mass_delete:
+            return NotImplemented
+
+        query = self._get_matching_query(search, filters)
+
+        if query is None:
+            return NotImplemented
+
+        try:
+            count = query.delete(synchronize_session=False)
+
             self.session.commit()
+            self.invalidate_choices()
 
             flash(ngettext('Model was successfully deleted.',
                            '%(count)s models were successfully deleted.',
@@ -0,0 +1,238 @@
+"""
+    Background execution of the mass actions.
+
+    Set `action_job_runner` and `action_job_list` of the view to run
+    actions in the background::
+
+        runner = JobRunner(max_workers=4)
+
+        class UserView(ModelView):
+            action_job_runner = runner
+            action_job_list = ('delete',)
+
+    Action request returns immediately and the user is redirected to the page
+    which polls the job status. Messages flashed by the action are delivered
+    when the job is finished. Actions can report progress with
+    :func:`report_progress`.
+
+    Default :class:`JobRunner` keeps jobs in the memory of the process which
+    started them. When the application runs in several worker processes,
+    status request can reach a worker which does not know the job, so
+    `store_job` and `get_job` must be overridden to keep jobs in a shared
+    store, like a database or Redis.
+"""
+import time
+import uuid
+import logging
+import threading
+
+from flask import g, request, session, current_app, has_app_context
+
+from flask.ext.admin._compat import as_unicode
+
+
+# Set up logger
+log = logging.getLogger("flask-admin.jobs")
+
+
+class Job(object):
+    """
+        Background action job.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+    def __init__(self, endpoint, name):
+        """
+            Constructor.
+
+            :param endpoint:
+                Endpoint of the view which started the job
+            :param name:
+                Action name
+        """
+        self.id = uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.name = name
+        self.status = self.PENDING
+        self.done = 0
+        self.total = None
+        self.error = None
+        self.messages = []
+        self.delivered = False
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def is_finished(self):
+        return self.status in (self.FINISHED, self.FAILED)
+
+    def to_dict(self):
+        return dict(id=self.id,
+                    name=self.name,
+                    status=self.status,
+                    done=self.done,
+                    total=self.total,
+                    error=self.error)
+
+
+class ThreadExecutor(object):
+    """
+        Executor which starts a new thread for every job. Used when
+        `concurrent.futures` is not available.
+    """
+    def submit(self, fn, *args, **kwargs):
+        thread = threading.Thread(target=fn, args=args, kwargs=kwargs)
+        thread.daemon = True
+        thread.start()
+
+
+class JobRunner(object):
+    """
+        Runs actions in the background and keeps their status in memory,
+        so status is only available in the process which started the job.
+        Override `store_job` and `get_job` to keep jobs in a store shared
+        by all worker processes.
+    """
+    def __init__(self, executor=None, max_workers=4, max_jobs=100):
+        """
+            Constructor.
+
+            :param executor:
+                Object with `submit(fn, *args)` method, like
+                `concurrent.futures.Executor`. Thread pool with `max_workers`
+                threads is used by default.
+            :param max_workers:
+                Number of threads in the default thread pool
+            :param max_jobs:
+                Number of jobs to keep. Oldest finished jobs are discarded.
+        """
+        if executor is None:
+            try:
+                from concurrent.futures import ThreadPoolExecutor
+                executor = ThreadPoolExecutor(max_workers)
+            except ImportError:
+                executor = ThreadExecutor()
+
+        self.executor = executor
+        self.max_jobs = max_jobs
+
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def store_job(self, job):
+        """
+            Store the job. Called when the job is submitted, job attributes
+            are updated while it runs, so shared store should save the job
+            again when it is finished.
+
+            :param job:
+                Job instance
+        """
+        with self._lock:
+            self._jobs[job.id] = job
+
+            finished = sorted((j for j in self._jobs.values() if j.is_finished),
+                              key=lambda j: j.created)
+
+            while len(self._jobs) > self.max_jobs and finished:
+                del self._jobs[finished.pop(0).id]
+
+    def get_job(self, job_id):
+        """
+            Return job by its id or `None`.
+
+            :param job_id:
+                Job id
+        """
+        return self._jobs.get(job_id)
+
+    def submit(self, endpoint, name, fn, *args):
+        """
+            Start the job and return it. Must be called while handling a
+            request: the job runs in a new request context built from the
+            WSGI environment of the request. Request body is already
+            consumed, so handlers should get form data from the arguments.
+
+            :param endpoint:
+                Endpoint of the view
+            :param name:
+                Action name
+            :param fn:
+                Action handler
+            :param args:
+                Handler arguments
+        """
+        job = Job(endpoint, name)
+        self.store_job(job)
+
+        app = current_app._get_current_object()
+        environ = dict(request.environ)
+
+        self.executor.submit(self.run, job, app, environ, fn, args)
+
+        return job
+
+    def run(self, job, app, environ, fn, args):
+        """
+            Run the job inside a new request context.
+        """
+        with app.request_context(environ):
+            # Session of this context is loaded separately and never saved,
+            # so the job can not change the session of the original request.
+            # Flashed messages are kept in the job and delivered by the
+            # status view.
+            flashes = len(session.get('_flashes', ()))
+
+            g._admin_job = job
+            job.status = Job.RUNNING
+
+            try:
+                if fn(*args) is not None:
+                    raise ValueError('Action returned a response, which can not be '
+                                     'delivered from the background job')
+
+                job.status = Job.FINISHED
+            except Exception as ex:
+                log.exception('Job %s failed', job.name)
+
+                job.error = as_unicode(ex)
+                job.status = Job.FAILED
+            finally:
+                job.messages = list(session.get('_flashes', ())[flashes:])
+                job.finished = time.time()
+
+                g._admin_job = None
+
+                self.store_job(job)
+
+
+def get_current_job():
+    """
+        Return job which is being executed or `None`.
+    """
+    if not has_app_context():
+        return None
+
+    return getattr(g, '_admin_job', None)
+
+
+def report_progress(done, total=None):
+    """
+        Report progress of the current job. Does nothing if action is not
+        running in the background.
+
+        :param done:
+            Number of processed items
+        :param total:
+            Total number of items, if known
+    """
+    job = get_current_job()
+
+    if job is not None:
+        job.done = done
+
+        if total is not None:
+            job.total = total
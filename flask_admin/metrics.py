@@ -0,0 +1,226 @@
+"""
+    Metrics of the administrative views in Prometheus text format.
+
+    Add :class:`MetricsView` to the admin to collect request counts and
+    latencies, list row counts and stage latencies of all views::
+
+        admin.add_view(MetricsView())
+
+    Metrics are kept in the process memory, so every worker process
+    exposes its own values.
+"""
+import threading
+
+from flask import Response
+
+from flask.ext.admin import profiler
+from flask.ext.admin._compat import iteritems
+from flask.ext.admin.base import BaseView, expose
+
+
+#: Default latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#: Default list row count histogram buckets
+ROW_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram(object):
+    """
+        Cumulative histogram.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\')
+                 .replace('\n', '\\n')
+                 .replace('"', '\\"'))
+
+
+def _format_labels(labels):
+    return '{%s}' % ','.join('%s="%s"' % (k, _escape(str(v))) for k, v in labels)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+
+    return str(value)
+
+
+class MetricsRegistry(profiler.BaseTimer):
+    """
+        Collects metrics of the administrative views, per view endpoint.
+
+        Registry receives timings as a timer, so it should be registered
+        with :meth:`~flask.ext.admin.base.Admin.add_timer`. It is done
+        automatically by the :class:`MetricsView`.
+    """
+    prefix = 'flask_admin'
+    """
+        Metric name prefix.
+    """
+
+    stages = None
+    """
+        List of view stages to collect latency of. Collects all stages
+        if not set. For example::
+
+            class MyRegistry(MetricsRegistry):
+                stages = ('count', 'get_list', 'ajax_lookup')
+    """
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, row_buckets=ROW_BUCKETS):
+        """
+            Constructor.
+
+            :param latency_buckets:
+                Upper bounds of the latency histogram buckets, in seconds
+            :param row_buckets:
+                Upper bounds of the list row count histogram buckets
+        """
+        self.latency_buckets = latency_buckets
+        self.row_buckets = row_buckets
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+            Discard all collected values.
+        """
+        with self._lock:
+            self._requests = {}
+            self._latency = {}
+            self._stages = {}
+            self._rows = {}
+
+    def _observe(self, histograms, key, value, buckets):
+        with self._lock:
+            histogram = histograms.get(key)
+
+            if histogram is None:
+                histogram = histograms[key] = Histogram(buckets)
+
+            histogram.observe(value)
+
+    # Timer
+    def view_finished(self, view, endpoint, elapsed):
+        with self._lock:
+            self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+
+        self._observe(self._latency, endpoint, elapsed, self.latency_buckets)
+
+    def stage_finished(self, view, endpoint, stage, elapsed):
+        if self.stages is not None and stage not in self.stages:
+            return
+
+        self._observe(self._stages, (endpoint, stage), elapsed, self.latency_buckets)
+
+    def list_loaded(self, view, endpoint, rows):
+        self._observe(self._rows, endpoint, rows, self.row_buckets)
+
+    # Rendering
+    def _render_histograms(self, lines, name, help, histograms, label_names):
+        lines.append('# HELP %s %s' % (name, help))
+        lines.append('# TYPE %s histogram' % name)
+
+        for key, histogram in sorted(iteritems(histograms), key=lambda i: str(i[0])):
+            if not isinstance(key, tuple):
+                key = (key,)
+
+            labels = list(zip(label_names, key))
+
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append('%s_bucket%s %d' % (name,
+                                                 _format_labels(labels + [('le', _format_value(bound))]),
+                                                 count))
+
+            lines.append('%s_bucket%s %d' % (name, _format_labels(labels + [('le', '+Inf')]),
+                                             histogram.count))
+            lines.append('%s_sum%s %s' % (name, _format_labels(labels),
+                                          _format_value(histogram.sum)))
+            lines.append('%s_count%s %d' % (name, _format_labels(labels), histogram.count))
+
+    def render(self):
+        """
+            Return collected metrics in Prometheus text exposition format.
+        """
+        lines = []
+
+        with self._lock:
+            name = '%s_requests_total' % self.prefix
+            lines.append('# HELP %s Number of requests served by the view.' % name)
+            lines.append('# TYPE %s counter' % name)
+
+            for endpoint, count in sorted(iteritems(self._requests), key=lambda i: str(i[0])):
+                lines.append('%s%s %d' % (name, _format_labels([('endpoint', endpoint)]), count))
+
+            self._render_histograms(lines,
+                                    '%s_request_duration_seconds' % self.prefix,
+                                    'Time spent in the view.',
+                                    self._latency,
+                                    ('endpoint',))
+            self._render_histograms(lines,
+                                    '%s_stage_duration_seconds' % self.prefix,
+                                    'Time spent in the view stage.',
+                                    self._stages,
+                                    ('endpoint', 'stage'))
+            self._render_histograms(lines,
+                                    '%s_list_rows' % self.prefix,
+                                    'Number of models loaded by the list view.',
+                                    self._rows,
+                                    ('endpoint',))
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsView(BaseView):
+    """
+        Exposes metrics collected by the :class:`MetricsRegistry` in
+        Prometheus text format. View is not displayed in the menu.
+
+        Override `is_accessible` to restrict access to the metrics.
+    """
+    def __init__(self, registry=None, name='Metrics', category=None,
+                 endpoint='metrics', url=None, **kwargs):
+        """
+            Constructor.
+
+            :param registry:
+                :class:`MetricsRegistry` instance. New registry is created if
+                not provided.
+        """
+        super(MetricsView, self).__init__(name, category, endpoint, url, **kwargs)
+
+        if registry is None:
+            registry = MetricsRegistry()
+
+        self.registry = registry
+
+    def create_blueprint(self, admin):
+        if self.registry not in admin._timers:
+            admin.add_timer(self.registry)
+
+        return super(MetricsView, self).create_blueprint(admin)
+
+    def is_visible(self):
+        return False
+
+    @expose('/')
+    def index(self):
+        return Response(self.registry.render(),
+                        mimetype='text/plain; version=0.0.4')
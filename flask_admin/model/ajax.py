@@ -1,10 +1,32 @@
+from flask.ext.admin._compat import string_types
+
+
 DEFAULT_PAGE_SIZE = 10
 
 
 class AjaxModelLoader(object):
     """
         Ajax related model loader. Override this to implement custom loading behavior.
+
+        Common options:
+
+        - `match` - `'contains'` (default) to find models which contain the term
+          or `'prefix'` to find models which start with it, which can use an index
+        - `order_by` - field name or list of field names to sort models by,
+          primary key is always used as a tiebreaker
+        - `minimum_input_length` - do not search for shorter terms
+    """
+    supports_keyset = False
     """
+        If `True`, loader implements :meth:`get_keyset_list` and the
+        `ajax_lookup` view continues pages after the last loaded model
+        instead of using offset.
+    """
+
+    match = 'contains'
+    order_by = ()
+    minimum_input_length = 0
+
     def __init__(self, name, options):
         """
             Constructor.
@@ -15,6 +37,31 @@ class AjaxModelLoader(object):
         self.name = name
         self.options = options
 
+        self.match = options.get('match', 'contains')
+
+        if self.match not in ('contains', 'prefix'):
+            raise ValueError('Unknown match mode %s for %s' % (self.match, self.name))
+
+        order_by = options.get('order_by') or ()
+
+        if isinstance(order_by, string_types) or not isinstance(order_by, (list, tuple)):
+            order_by = (order_by,)
+
+        self.order_by = tuple(order_by)
+        self.minimum_input_length = options.get('minimum_input_length', 0)
+
+    def get_pattern(self, term):
+        """
+            Return `LIKE` pattern for the term according to the `match` option.
+
+            :param term:
+                Search term
+        """
+        if self.match == 'prefix':
+            return u'%s%%' % term
+
+        return u'%%%s%%' % term
+
     def format(self, model):
         """
             Return (id, name) tuple from the model.
@@ -30,6 +77,27 @@ class AjaxModelLoader(object):
         """
         raise NotImplementedError()
 
+    def get_many(self, pks):
+        """
+            Find models by their primary keys. Returns models in the order
+            of `pks`, missing models are skipped.
+
+            Default implementation calls :meth:`get_one` for every key,
+            override it to load all models with a single query.
+
+            :param pks:
+                List of primary key values
+        """
+        result = []
+
+        for pk in pks:
+            model = self.get_one(pk)
+
+            if model is not None:
+                result.append(model)
+
+        return result
+
     def get_list(self, query, offset=0, limit=DEFAULT_PAGE_SIZE):
         """
             Return models that match `query`.
@@ -44,3 +112,17 @@ class AjaxModelLoader(object):
                 Limit
         """
         raise NotImplementedError()
+
+    def get_keyset_list(self, query, after, limit=DEFAULT_PAGE_SIZE):
+        """
+            Return models that match `query` and are sorted after the model
+            with `after` primary key. Only called if `supports_keyset` is set.
+
+            :param query:
+                Query string
+            :param after:
+                Primary key of the last model of the previous page
+            :param limit:
+                Limit
+        """
+        raise NotImplementedError()
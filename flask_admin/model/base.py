@@ -1,24 +1,35 @@
 import warnings
 import re
+import csv
+import time
+import logging
+import threading
 
-from flask import request, redirect, flash, abort, json, Response
+from io import BytesIO, StringIO
+
+from flask import g, request, redirect, flash, abort, json, Response, stream_with_context
 from jinja2 import contextfunction
 from wtforms.validators import ValidationError
 
-from flask.ext.admin.babel import gettext
+from flask.ext.admin.babel import gettext, ngettext, lazy_gettext
 
+from flask.ext.admin import jobs, profiler
 from flask.ext.admin.base import BaseView, expose
 from flask.ext.admin.form import BaseForm, FormOpts, rules
 from flask.ext.admin.model import filters, typefmt
-from flask.ext.admin.actions import ActionsMixin
+from flask.ext.admin.actions import action, ActionsMixin
 from flask.ext.admin.helpers import get_form_data, validate_form_on_submit, get_redirect_target
 from flask.ext.admin.tools import rec_getattr
 from flask.ext.admin._backwards import ObsoleteAttr
-from flask.ext.admin._compat import iteritems, OrderedDict
+from flask.ext.admin._compat import iteritems, as_unicode, OrderedDict, PY2
 from .helpers import prettify_name, get_mdict_item_or_list
 from .ajax import AjaxModelLoader
 
 
+# Set up logger
+log = logging.getLogger("flask-admin.model")
+
+
 # Used to generate filter query string name
 filter_char_re = re.compile('[^a-z0-9 ]')
 filter_compact_re = re.compile(' +')
@@ -28,12 +39,14 @@ class ViewArgs(object):
     """
         List view arguments.
     """
-    def __init__(self, page=None, sort=None, sort_desc=None, search=None, filters=None, extra_args=None):
+    def __init__(self, page=None, sort=None, sort_desc=None, search=None, filters=None, extra_args=None,
+                 cursor=None):
         self.page = page
         self.sort = sort
         self.sort_desc = bool(sort_desc)
         self.search = search
         self.filters = filters
+        self.cursor = cursor
 
         if not self.search:
             self.search = None
@@ -52,10 +65,19 @@ class ViewArgs(object):
         kwargs.setdefault('search', self.search)
         kwargs.setdefault('filters', flt)
         kwargs.setdefault('extra_args', dict(self.extra_args))
+        kwargs.setdefault('cursor', self.cursor)
 
         return ViewArgs(**kwargs)
 
 
+class ApproximateCount(int):
+    """
+        Row count which is not exact, like an estimate from the database
+        statistics or a previously cached value.
+    """
+    pass
+
+
 class BaseModelView(BaseView, ActionsMixin):
     """
         Base model view.
@@ -84,6 +106,9 @@ class BaseModelView(BaseView, ActionsMixin):
     can_delete = True
     """Is model deletion allowed"""
 
+    can_export = False
+    """Is model list export allowed"""
+
     # Templates
     list_template = 'admin/model/list.html'
     """Default list view template"""
@@ -94,6 +119,9 @@ class BaseModelView(BaseView, ActionsMixin):
     create_template = 'admin/model/create.html'
     """Default create template"""
 
+    bulk_update_template = 'admin/model/bulk_update.html'
+    """Default bulk update template"""
+
     # Customizations
     column_list = ObsoleteAttr('column_list', 'list_columns', None)
     """
@@ -149,6 +177,20 @@ class BaseModelView(BaseView, ActionsMixin):
                 pass
     """
 
+    column_formatters_depends = None
+    """
+        Dictionary of additional model attributes used by list column formatters.
+
+        Used by the list view to decide which attributes to load if
+        `column_list_load_only` is enabled. For example, if price formatter
+        also displays currency::
+
+            class MyModelView(BaseModelView):
+                column_list_load_only = True
+                column_formatters = dict(price=lambda v, c, m, p: '%s %s' % (m.price, m.currency))
+                column_formatters_depends = dict(price=('currency',))
+    """
+
     column_type_formatters = ObsoleteAttr('column_type_formatters', 'list_type_formatters', None)
     """
         Dictionary of value type formatters to be used in the list view.
@@ -278,6 +320,21 @@ class BaseModelView(BaseView, ActionsMixin):
                 }
     """
 
+    column_list_load_only = False
+    """
+        Load only model attributes displayed in the list view.
+
+        If enabled, list view will only fetch list columns, attributes listed
+        in `column_formatters_depends` and the primary key from the database
+        instead of complete models. Useful if model contains large columns which
+        are not displayed in the list. Supported by SQLAlchemy, MongoEngine
+        and PyMongo backends.
+
+        Please note that formatters and templates accessing other attributes
+        will either trigger additional queries or will see empty values,
+        depending on the model backend.
+    """
+
     column_filters = None
     """
         Collection of the column filters.
@@ -451,6 +508,19 @@ class BaseModelView(BaseView, ActionsMixin):
                     }
                 }
 
+        Lookups on large tables can use an index if models are matched by
+        prefix and sorted by the searched field::
+
+            class MyModelView(BaseModelView):
+                form_ajax_refs = {
+                    'user': {
+                        'fields': ('email',),
+                        'match': 'prefix',
+                        'order_by': 'email',
+                        'minimum_input_length': 3
+                    }
+                }
+
         Or with SQLAlchemy backend like this::
 
             class MyModelView(BaseModelView):
@@ -518,6 +588,175 @@ class BaseModelView(BaseView, ActionsMixin):
         Default page size for pagination.
     """
 
+    list_count_mode = 'exact'
+    """
+        Controls how the list view counts rows matching current search and filters.
+
+        Possible values:
+
+        - `'exact'` - run count query on every request
+        - `'estimate'` - use row estimate from database statistics if model backend
+          supports it and fall back to the exact count otherwise
+        - `'cache'` - exact count, which is cached for `list_count_cache_timeout`
+          seconds for each search and filter combination
+        - `None` - do not count rows
+
+        Estimated and cached counts are displayed as approximate in the list view.
+        Please note that pager relies on the count, so it might point to empty
+        pages or miss some pages if the count is not exact.
+
+        Example::
+
+            class MyModelView(BaseModelView):
+                list_count_mode = 'cache'
+                list_count_cache_timeout = 300
+    """
+
+    list_count_cache_timeout = 60
+    """
+        Number of seconds to keep cached row counts if `list_count_mode` is set to `'cache'`.
+    """
+
+    simple_list_pager = False
+    """
+        Enable or disable simple list pager.
+
+        If enabled, list view will not count rows and will only display
+        previous and next page links. `get_list` will fetch one extra row
+        to find out if there is a next page and will return `None` as a count.
+    """
+
+    keyset_pagination = False
+    """
+        Use keyset (seek) pagination in the list view.
+
+        Instead of skipping `page * page_size` rows, list view will remember
+        position of the last displayed row and will continue from it, so deep
+        pages are as cheap to display as the first one. Only previous and next
+        page links are displayed.
+
+        Rows with `NULL` value in the sort column are displayed after all
+        other rows in ascending order and before them in descending order.
+        Sort columns should be indexed for keyset pagination to be fast.
+
+        Model backend has to implement `get_keyset_list` for this to work.
+
+        Example::
+
+            class MyModelView(BaseModelView):
+                keyset_pagination = True
+    """
+
+    repeated_query_threshold = None
+    """
+        Enable detection of repeated queries (N+1 problem) if set.
+
+        All queries executed while serving the view are grouped by their
+        normalized statement and if the same statement was executed more than
+        `repeated_query_threshold` times, the view will log a warning or raise
+        an exception, depending on `repeated_query_action`. Report includes the
+        stage which issued the queries, for example name of the column or
+        formatter.
+
+        Example::
+
+            class MyModelView(BaseModelView):
+                repeated_query_threshold = 5
+                repeated_query_action = 'raise'
+    """
+
+    repeated_query_action = 'warn'
+    """
+        What to do when repeated queries are detected: `'warn'` to log a
+        warning or `'raise'` to raise
+        :class:`~flask.ext.admin.profiler.RepeatedQueryError`.
+    """
+
+    slow_query_threshold = None
+    """
+        Log queries which took longer than `slow_query_threshold` seconds.
+
+        Applies to the count and data queries issued by `get_list` and the
+        lookup issued by `get_one`. Record is logged as a warning to the
+        `flask-admin.slow_query` logger and includes the statement, its
+        parameters and duration and the active sort, search and filters of
+        the list view. Structured record is available in the `slow_query`
+        attribute of the log record.
+
+        Example::
+
+            class MyModelView(BaseModelView):
+                slow_query_threshold = 0.5
+    """
+
+    export_types = ('csv', 'jsonl')
+    """
+        List of allowed export formats: `'csv'` and `'jsonl'` (JSON Lines).
+    """
+
+    export_columns = None
+    """
+        List of columns to export. If not set, list view columns are
+        exported.
+
+        For example::
+
+            class MyModelView(BaseModelView):
+                can_export = True
+                export_columns = ('id', 'name', 'email', 'created_at')
+    """
+
+    export_batch_size = 1000
+    """
+        Number of rows fetched from the database at once while exporting.
+        Export uses server-side cursors where backend supports them, so the
+        memory use does not depend on the number of exported rows.
+    """
+
+    column_bulk_update_list = None
+    """
+        List of form fields which can be changed for all selected models
+        at once with the `Update` action.
+
+        Every field of the form has an `Apply` checkbox and only checked
+        fields are written, other fields keep their values.
+
+        Models are updated with a single statement, so `on_model_change`
+        and `after_model_change` are not called. Only fields which map to
+        the model columns directly are supported, view raises an exception
+        on initialization if the list contains a relation or other field,
+        unless `bulk_update_fire_events` is enabled.
+
+        For example::
+
+            class MyModelView(BaseModelView):
+                column_bulk_update_list = ('status', 'is_active')
+    """
+
+    bulk_update_fire_events = False
+    """
+        Load and save every model with `update_model` instead of running
+        a single statement, so model change events are called. Models are
+        loaded in batches of `export_batch_size`.
+    """
+
+    index_check = False
+    """
+        Check if sortable, searchable and filterable columns are indexed
+        when the view is created and log a warning for every list operation
+        which will run as a full scan.
+
+        Set to `'suggest'` to include suggested index definitions into the
+        warnings. Report is also available from the `check_indexes` method.
+        Database should be reachable when the view is created, otherwise the
+        check is skipped with a warning.
+
+        Example::
+
+            class MyModelView(BaseModelView):
+                index_check = 'suggest'
+    """
+
     def __init__(self, model,
                  name=None, category=None, endpoint=None, url=None, static_folder=None,
                  menu_class_name=None, menu_icon_type=None, menu_icon_value=None):
@@ -631,6 +870,7 @@ class BaseModelView(BaseView, ActionsMixin):
         # List view
         self._list_columns = self.get_list_columns()
         self._sortable_columns = self.get_sortable_columns()
+        self._list_load_columns = self.get_list_load_columns()
 
         # Labels
         if self.column_labels is None:
@@ -661,9 +901,70 @@ class BaseModelView(BaseView, ActionsMixin):
         # Filters
         self._refresh_filters_cache()
 
+        # Bulk update with a single statement can only set plain columns
+        if self.column_bulk_update_list and not self.bulk_update_fire_events:
+            for name in self.column_bulk_update_list:
+                if not self.is_valid_bulk_update_field(name):
+                    raise Exception('Can not update "%s" in bulk, only model columns are supported. '
+                                    'Enable bulk_update_fire_events to update it with update_model.' % name)
+
         # Form rendering rules
         self._refresh_form_rules_cache()
 
+        # Row counts
+        self._count_cache = {}
+        self._count_cache_lock = threading.Lock()
+
+        # Indexes
+        if self.index_check:
+            try:
+                self.check_indexes()
+            except Exception as ex:
+                log.warning('Failed to check indexes of %s: %s', self.endpoint, ex)
+
+    # Profiling
+    def _run_view(self, fn, *args, **kwargs):
+        if self.repeated_query_threshold is None and self.slow_query_threshold is None:
+            return super(BaseModelView, self)._run_view(fn, *args, **kwargs)
+
+        self._install_profiler()
+
+        with profiler.profile() as active:
+            result = super(BaseModelView, self)._run_view(fn, *args, **kwargs)
+
+        name = '%s.%s' % (self.endpoint, fn.__name__)
+
+        if self.slow_query_threshold is not None:
+            profiler.check_slow_queries(active,
+                                        self.slow_query_threshold,
+                                        name,
+                                        self._get_slow_query_context)
+
+        if self.repeated_query_threshold is not None:
+            profiler.check_repeated_queries(active,
+                                            self.repeated_query_threshold,
+                                            self.repeated_query_action,
+                                            name)
+
+        return result
+
+    def _get_slow_query_context(self):
+        """
+            Return active sort, search and filters of the list view to
+            include into the slow query record.
+        """
+        view_args = self._get_list_extra_args()
+
+        sort_column = self._get_column_by_idx(view_args.sort)
+        if sort_column is not None:
+            sort_column = sort_column[0]
+
+        return dict(sort=sort_column,
+                    sort_desc=view_args.sort_desc,
+                    search=view_args.search,
+                    filters=[(flt_name, value)
+                             for idx, flt_name, value in view_args.filters or ()])
+
     # Primary key
     def get_pk_value(self, model):
         """
@@ -713,6 +1014,27 @@ class BaseModelView(BaseView, ActionsMixin):
 
         return [(c, self.get_column_name(c)) for c in columns]
 
+    def get_list_load_columns(self):
+        """
+            Returns a list of the model field names which should be loaded
+            for the list view or `None` if complete models should be loaded.
+
+            By default, contains list columns and their `column_formatters_depends`
+            if `column_list_load_only` is enabled.
+        """
+        if not self.column_list_load_only:
+            return None
+
+        depends = self.column_formatters_depends or {}
+
+        columns = []
+
+        for name, _ in self._list_columns:
+            columns.append(name)
+            columns.extend(depends.get(name, ()))
+
+        return columns
+
     def scaffold_sortable_columns(self):
         """
             Returns dictionary of sortable columns. Must be implemented in
@@ -744,6 +1066,35 @@ class BaseModelView(BaseView, ActionsMixin):
 
             return result
 
+    def get_index_report(self):
+        """
+            Return list of `(operation, column, suggestion)` tuples for the
+            list operations which can not use an index, where `operation` is
+            `'sort'`, `'search'` or `'filter'` and `suggestion` is index
+            definition or `None`.
+
+            Must be implemented in the child class to support `index_check`.
+        """
+        return []
+
+    def check_indexes(self):
+        """
+            Log a warning for every sortable, searchable and filterable
+            column which is not indexed and return the report from
+            `get_index_report`.
+        """
+        report = self.get_index_report()
+
+        for operation, column, suggestion in report:
+            if self.index_check == 'suggest' and suggestion:
+                log.warning('%s: %s by %s will run as a full scan, suggested index: %s',
+                            self.endpoint, operation, column, suggestion)
+            else:
+                log.warning('%s: %s by %s will run as a full scan',
+                            self.endpoint, operation, column)
+
+        return report
+
     def init_search(self):
         """
             Initialize search. If data provider does not support search,
@@ -931,6 +1282,121 @@ class BaseModelView(BaseView, ActionsMixin):
         """
         raise NotImplementedError('Please implement get_list method')
 
+    def get_export_list(self, sort_field, sort_desc, search, filters):
+        """
+            Return iterable over all models matching search and filters for
+            the export. Should fetch models in batches of `export_batch_size`
+            instead of loading all of them into memory.
+
+            Must be implemented in the child class to support export.
+
+            :param sort_field:
+                Sort column name or None.
+            :param sort_desc:
+                If set to True, sorting is in descending order.
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+        """
+        raise NotImplementedError('Please implement get_export_list method')
+
+    def get_list_count(self, count, estimate, search, filters):
+        """
+            Count rows for the list view according to the `list_count_mode`.
+
+            Returns `None` if rows should not be counted and an instance of
+            `ApproximateCount` if the count is not exact.
+
+            Called by model backends from `get_list`.
+
+            :param count:
+                Callable which returns exact number of rows
+            :param estimate:
+                Callable which returns estimated number of rows or `None` if
+                estimate is not available
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+        """
+        mode = self.list_count_mode
+
+        if mode is None or self.simple_list_pager:
+            return None
+
+        with profiler.timed(self, 'count'):
+            if mode == 'estimate':
+                value = estimate()
+
+                if value is not None:
+                    return ApproximateCount(value)
+            elif mode == 'cache':
+                return self._get_cached_count(count, search, filters)
+
+            return count()
+
+    def get_count_cache_key(self, search, filters):
+        """
+            Return key for the cached row count.
+
+            Override if `get_query` depends on the request (current user, etc),
+            so counts are not shared between different queries.
+
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+        """
+        return search, tuple(tuple(flt) for flt in filters or ())
+
+    def _get_cached_count(self, count, search, filters):
+        key = self.get_count_cache_key(search, filters)
+        now = time.time()
+
+        with self._count_cache_lock:
+            cached = self._count_cache.get(key)
+
+        if cached is not None and cached[1] > now:
+            return ApproximateCount(cached[0])
+
+        value = count()
+
+        with self._count_cache_lock:
+            # Drop expired entries
+            for k, v in list(self._count_cache.items()):
+                if v[1] <= now:
+                    del self._count_cache[k]
+
+            self._count_cache[key] = (value, now + self.list_count_cache_timeout)
+
+        return value
+
+    def get_keyset_list(self, cursor, sort_field, sort_desc, search, filters):
+        """
+            Return a sorted list of models positioned by the `cursor`. Used
+            instead of `get_list` if `keyset_pagination` is enabled.
+
+            Must be implemented in the child class.
+
+            Returns a tuple of `(count, data, prev_cursor, next_cursor)`, where
+            cursors are opaque strings pointing to the previous and next pages
+            or `None` if there is no such page.
+
+            :param cursor:
+                Cursor returned by the previous call or None for the first page.
+            :param sort_field:
+                Sort column name or None.
+            :param sort_desc:
+                If set to True, sorting is in descending order.
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples. First value in a tuple is a search
+                index, second value is a search value.
+        """
+        raise NotImplementedError('Please implement get_keyset_list method')
+
     def get_one(self, id):
         """
             Return one model by its id.
@@ -1078,6 +1544,60 @@ class BaseModelView(BaseView, ActionsMixin):
         """
         raise NotImplementedError()
 
+    def update_models(self, ids, values):
+        """
+            Set `values` on all models with given ids with a single
+            statement and return number of updated models.
+
+            Must be implemented in the child class to support bulk update.
+
+            :param ids:
+                List of model ids
+            :param values:
+                Dictionary of field names and values
+        """
+        raise NotImplementedError()
+
+    def update_matching_models(self, search, filters, values):
+        """
+            Set `values` on all models matching search and filters with a
+            single statement and return number of updated models.
+
+            Must be implemented in the child class to support bulk update
+            of all matching models.
+
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+            :param values:
+                Dictionary of field names and values
+        """
+        raise NotImplementedError()
+
+    def is_valid_bulk_update_field(self, name):
+        """
+            Verify that the field from `column_bulk_update_list` can be
+            written by `update_models` and `update_matching_models`.
+
+            Override in model backend implementation to reject relations
+            and fields which are not model columns.
+
+            :param name:
+                Field name
+        """
+        return True
+
+    def get_models_by_ids(self, ids):
+        """
+            Return models with given ids. Calls `get_one` for every id by
+            default, child classes load them with a single query.
+
+            :param ids:
+                List of model ids
+        """
+        return [m for m in (self.get_one(id) for id in ids) if m is not None]
+
     # Various helpers
     def _prettify_name(self, name):
         """
@@ -1130,23 +1650,27 @@ class BaseModelView(BaseView, ActionsMixin):
                         sort=request.args.get('sort', None, type=int),
                         sort_desc=request.args.get('desc', None, type=int),
                         search=request.args.get('search', None),
-                        filters=self._get_list_filter_args())
+                        filters=self._get_list_filter_args(),
+                        cursor=request.args.get('cursor', None))
 
     # URL generation helpers
-    def _get_list_url(self, view_args):
+    def _get_list_url(self, view_args, view='.index_view', **kwargs):
         """
             Generate page URL with current page, sort column and
             other parameters.
 
-            :param view:
-                View name
             :param view_args:
                 ViewArgs object with page number, filters, etc.
+            :param view:
+                View name
+            :param kwargs:
+                Additional view arguments
         """
         page = view_args.page or None
         desc = 1 if view_args.sort_desc else None
 
-        kwargs = dict(page=page, sort=view_args.sort, desc=desc, search=view_args.search)
+        kwargs.update(page=page, sort=view_args.sort, desc=desc, search=view_args.search,
+                      cursor=view_args.cursor)
         kwargs.update(view_args.extra_args)
 
         if view_args.filters:
@@ -1156,7 +1680,7 @@ class BaseModelView(BaseView, ActionsMixin):
                 key = 'flt%d_%s' % (i, self.get_filter_arg(idx, self._filters[idx]))
                 kwargs[key] = value
 
-        return self.get_url('.index_view', **kwargs)
+        return self.get_url(view, **kwargs)
 
     # Actions
     def is_action_allowed(self, name):
@@ -1167,6 +1691,9 @@ class BaseModelView(BaseView, ActionsMixin):
             The default implementation only checks if the particular action
             is not in `action_disallowed_list`.
         """
+        if name == 'bulk_update' and (not self.can_edit or not self.column_bulk_update_list):
+            return False
+
         return name not in self.action_disallowed_list
 
     def _get_field_value(self, model, name):
@@ -1175,6 +1702,26 @@ class BaseModelView(BaseView, ActionsMixin):
         """
         return rec_getattr(model, name)
 
+    def get_export_columns(self):
+        """
+            Return list of `(name, label)` tuples of the exported columns.
+        """
+        if self.export_columns is None:
+            return self._list_columns
+
+        return [(c, self.get_column_name(c)) for c in self.export_columns]
+
+    def get_export_value(self, model, name):
+        """
+            Return value of the column for the export.
+
+            :param model:
+                Model instance
+            :param name:
+                Column name
+        """
+        return self._get_field_value(model, name)
+
     @contextfunction
     def get_list_value(self, context, model, name):
         """
@@ -1189,9 +1736,11 @@ class BaseModelView(BaseView, ActionsMixin):
         """
         column_fmt = self.column_formatters.get(name)
         if column_fmt is not None:
-            value = column_fmt(self, context, model, name)
+            with profiler.stage('formatter:%s' % name):
+                value = column_fmt(self, context, model, name)
         else:
-            value = self._get_field_value(model, name)
+            with profiler.stage('column:%s' % name):
+                value = self._get_field_value(model, name)
 
         choices_map = self._column_choices_map.get(name, {})
         if choices_map:
@@ -1235,21 +1784,13 @@ class BaseModelView(BaseView, ActionsMixin):
             List view
         """
         # Grab parameters from URL
-        view_args = self._get_list_extra_args()
-
-        # Map column index to column name
-        sort_column = self._get_column_by_idx(view_args.sort)
-        if sort_column is not None:
-            sort_column = sort_column[0]
+        with profiler.timed(self, 'args'):
+            view_args = self._get_list_extra_args()
 
-        # Get count and data
-        count, data = self.get_list(view_args.page, sort_column, view_args.sort_desc,
-                                    view_args.search, view_args.filters)
-
-        # Calculate number of pages
-        num_pages = count // self.page_size
-        if count % self.page_size != 0:
-            num_pages += 1
+            # Map column index to column name
+            sort_column = self._get_column_by_idx(view_args.sort)
+            if sort_column is not None:
+                sort_column = sort_column[0]
 
         # Various URL generation helpers
         def pager_url(p):
@@ -1257,7 +1798,7 @@ class BaseModelView(BaseView, ActionsMixin):
             if p == 0:
                 p = None
 
-            return self._get_list_url(view_args.clone(page=p))
+            return self._get_list_url(view_args.clone(page=p, cursor=None))
 
         def sort_url(column, invert=False):
             desc = None
@@ -1265,16 +1806,85 @@ class BaseModelView(BaseView, ActionsMixin):
             if invert and not view_args.sort_desc:
                 desc = 1
 
-            return self._get_list_url(view_args.clone(sort=column, sort_desc=desc))
+            return self._get_list_url(view_args.clone(sort=column, sort_desc=desc, cursor=None))
+
+        prev_page_url = next_page_url = None
+
+        # Get count and data
+        if self.keyset_pagination:
+            with profiler.timed(self, 'get_list'):
+                count, data, prev_cursor, next_cursor = self.get_keyset_list(view_args.cursor,
+                                                                             sort_column,
+                                                                             view_args.sort_desc,
+                                                                             view_args.search,
+                                                                             view_args.filters)
+
+            if prev_cursor is not None:
+                prev_page_url = self._get_list_url(view_args.clone(page=None, cursor=prev_cursor))
+
+            if next_cursor is not None:
+                next_page_url = self._get_list_url(view_args.clone(page=None, cursor=next_cursor))
+
+            # Page numbers are meaningless in keyset mode
+            num_pages = None
+        else:
+            with profiler.timed(self, 'get_list'):
+                count, data = self.get_list(view_args.page, sort_column, view_args.sort_desc,
+                                            view_args.search, view_args.filters)
+
+            if count is not None:
+                # Calculate number of pages
+                num_pages = count // self.page_size
+                if count % self.page_size != 0:
+                    num_pages += 1
+            else:
+                data = list(data)
+                num_pages = None
+
+                page = view_args.page or 0
+
+                if self.simple_list_pager:
+                    # get_list returned one extra row if there is next page
+                    has_next = len(data) > self.page_size
+                    data = data[:self.page_size]
+                else:
+                    # Rows were not counted, assume there is next page if current one is full
+                    has_next = len(data) >= self.page_size
+
+                if page > 0:
+                    prev_page_url = pager_url(page - 1)
+
+                if has_next:
+                    next_page_url = pager_url(page + 1)
+                else:
+                    # Last page, so number of rows is known
+                    count = page * self.page_size + len(data)
+
+        profiler.report_list(self, data)
 
         # Actions
-        actions, actions_confirmation = self.get_actions_list()
+        with profiler.timed(self, 'actions'):
+            actions, actions_confirmation = self.get_actions_list()
+
+        with profiler.timed(self, 'urls'):
+            clear_search_url = self._get_list_url(view_args.clone(page=0,
+                                                                  sort=view_args.sort,
+                                                                  sort_desc=view_args.sort_desc,
+                                                                  search=None,
+                                                                  filters=None,
+                                                                  cursor=None))
+            return_url = self._get_list_url(view_args)
+
+            action_url = self._get_list_url(view_args.clone(page=None, cursor=None),
+                                            '.action_view')
 
-        clear_search_url = self._get_list_url(view_args.clone(page=0,
-                                                              sort=view_args.sort,
-                                                              sort_desc=view_args.sort_desc,
-                                                              search=None,
-                                                              filters=None))
+            export_urls = []
+
+            if self.can_export:
+                for export_type in self.export_types:
+                    url = self._get_list_url(view_args.clone(page=None, cursor=None),
+                                             '.export_view', export_type=export_type)
+                    export_urls.append((export_type, url))
 
         return self.render(self.list_template,
                                data=data,
@@ -1285,12 +1895,15 @@ class BaseModelView(BaseView, ActionsMixin):
                                enumerate=enumerate,
                                get_pk_value=self.get_pk_value,
                                get_value=self.get_list_value,
-                               return_url=self._get_list_url(view_args),
+                               return_url=return_url,
                                # Pagination
                                count=count,
+                               count_exact=not isinstance(count, ApproximateCount),
                                pager_url=pager_url,
                                num_pages=num_pages,
                                page=view_args.page,
+                               prev_page_url=prev_page_url,
+                               next_page_url=next_page_url,
                                # Sorting
                                sort_column=view_args.sort,
                                sort_desc=view_args.sort_desc,
@@ -1306,7 +1919,90 @@ class BaseModelView(BaseView, ActionsMixin):
 
                                # Actions
                                actions=actions,
-                               actions_confirmation=actions_confirmation)
+                               actions_confirmation=actions_confirmation,
+                               action_url=action_url,
+                               # Export
+                               export_urls=export_urls)
+
+    def _export_csv(self, models, columns):
+        """
+            Generate CSV lines for the models.
+        """
+        if PY2:
+            output = BytesIO()
+        else:
+            output = StringIO()
+
+        writer = csv.writer(output)
+
+        def line(values):
+            if PY2:
+                values = [v.encode('utf-8') for v in values]
+
+            writer.writerow(values)
+
+            value = output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+            return value
+
+        yield line([as_unicode(label) for name, label in columns])
+
+        for model in models:
+            values = []
+
+            for name, label in columns:
+                value = self.get_export_value(model, name)
+                values.append(u'' if value is None else as_unicode(value))
+
+            yield line(values)
+
+    def _export_jsonl(self, models, columns):
+        """
+            Generate JSON Lines for the models.
+        """
+        for model in models:
+            row = dict((name, self.get_export_value(model, name)) for name, label in columns)
+            yield json.dumps(row, default=as_unicode) + '\n'
+
+    @expose('/export/<export_type>/')
+    def export_view(self, export_type):
+        """
+            Export all models matching current search and filters.
+        """
+        return_url = get_redirect_target() or self.get_url('.index_view')
+
+        if not self.can_export:
+            return redirect(return_url)
+
+        if export_type not in self.export_types:
+            abort(404)
+
+        view_args = self._get_list_extra_args()
+
+        sort_column = self._get_column_by_idx(view_args.sort)
+        if sort_column is not None:
+            sort_column = sort_column[0]
+
+        with profiler.timed(self, 'get_export_list'):
+            models = self.get_export_list(sort_column, view_args.sort_desc,
+                                          view_args.search, view_args.filters)
+
+        columns = self.get_export_columns()
+
+        if export_type == 'csv':
+            gen = self._export_csv(models, columns)
+            mimetype = 'text/csv'
+        else:
+            gen = self._export_jsonl(models, columns)
+            mimetype = 'application/x-ndjson'
+
+        filename = '%s.%s' % (self.endpoint, export_type)
+
+        return Response(stream_with_context(gen),
+                        mimetype=mimetype,
+                        headers={'Content-Disposition': 'attachment; filename=%s' % filename})
 
     @expose('/new/', methods=('GET', 'POST'))
     def create_view(self):
@@ -1318,10 +2014,17 @@ class BaseModelView(BaseView, ActionsMixin):
         if not self.can_create:
             return redirect(return_url)
 
-        form = self.create_form()
+        with profiler.timed(self, 'form'):
+            form = self.create_form()
+
+        with profiler.timed(self, 'validate'):
+            valid = self.validate_form(form)
 
-        if self.validate_form(form):
-            if self.create_model(form):
+        if valid:
+            with profiler.timed(self, 'create_model'):
+                created = self.create_model(form)
+
+            if created:
                 if '_add_another' in request.form:
                     flash(gettext('Model was successfully created.'))
                     return redirect(request.url)
@@ -1350,15 +2053,23 @@ class BaseModelView(BaseView, ActionsMixin):
         if id is None:
             return redirect(return_url)
 
-        model = self.get_one(id)
+        with profiler.timed(self, 'get_one'):
+            model = self.get_one(id)
 
         if model is None:
             return redirect(return_url)
 
-        form = self.edit_form(obj=model)
+        with profiler.timed(self, 'form'):
+            form = self.edit_form(obj=model)
+
+        with profiler.timed(self, 'validate'):
+            valid = self.validate_form(form)
+
+        if valid:
+            with profiler.timed(self, 'update_model'):
+                updated = self.update_model(form, model)
 
-        if self.validate_form(form):
-            if self.update_model(form, model):
+            if updated:
                 if '_continue_editing' in request.form:
                     flash(gettext('Model was successfully saved.'))
                     return redirect(request.url)
@@ -1392,10 +2103,12 @@ class BaseModelView(BaseView, ActionsMixin):
         if id is None:
             return redirect(return_url)
 
-        model = self.get_one(id)
+        with profiler.timed(self, 'get_one'):
+            model = self.get_one(id)
 
         if model:
-            self.delete_model(model)
+            with profiler.timed(self, 'delete_model'):
+                self.delete_model(model)
 
         return redirect(return_url)
 
@@ -1404,7 +2117,275 @@ class BaseModelView(BaseView, ActionsMixin):
         """
             Mass-model action view.
         """
-        return self.handle_action()
+        with profiler.timed(self, 'action'):
+            return self.handle_action()
+
+    def apply_action_to_matching(self, name, handler):
+        """
+            Apply action to all models matching search and filters from the
+            request arguments.
+
+            If the view has `<handler name>_matching` method, for example
+            `action_delete_matching`, it is called with search and filters
+            and can process all models with a single statement or return a
+            response. It should return `NotImplemented` to fall back to the
+            default behavior.
+
+            By default, primary keys of matching models are loaded with
+            :meth:`get_matching_pk_batches` and handler is called for every
+            batch of `export_batch_size` keys as soon as it is loaded.
+            Handler should check :func:`~flask.ext.admin.actions.is_matching_batch`
+            and return number of processed records instead of flashing a
+            success message, as a summary is flashed for all batches.
+
+            :param name:
+                Action name
+            :param handler:
+                Action handler
+        """
+        view_args = self._get_list_extra_args()
+
+        bulk = getattr(self, '%s_matching' % handler.__name__, None)
+
+        if bulk is not None:
+            result = bulk(view_args.search, view_args.filters)
+
+            if result is not NotImplemented:
+                return result
+
+        count = 0
+        done = 0
+
+        batches = self.get_matching_pk_batches(view_args.search,
+                                               view_args.filters,
+                                               self.export_batch_size)
+
+        g._admin_matching_batch = True
+
+        try:
+            for ids in batches:
+                result = handler(ids)
+
+                # Handlers which are not aware of batches return nothing
+                if isinstance(result, int) and not isinstance(result, bool):
+                    count += result
+                else:
+                    count += len(ids)
+
+                done += len(ids)
+
+                # Total is not known, handlers report progress of the batch
+                job = jobs.get_current_job()
+
+                if job is not None:
+                    job.done = done
+                    job.total = None
+        finally:
+            g._admin_matching_batch = False
+
+        flash(ngettext('Action was applied to %(count)s record.',
+                       'Action was applied to %(count)s records.',
+                       count,
+                       count=count))
+
+    def get_matching_pk_batches(self, search, filters, batch_size):
+        """
+            Yield lists of primary keys of models matching search and
+            filters, `batch_size` keys at a time.
+
+            Default implementation loads models with `get_export_list`,
+            model backends override it to load primary keys only.
+
+            :param search:
+                Search query
+            :param filters:
+                List of filter tuples
+            :param batch_size:
+                Number of keys in a batch
+        """
+        batch = []
+
+        for model in self.get_export_list(None, False, search, filters):
+            batch.append(as_unicode(self.get_pk_value(model)))
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def is_background_action(self, name):
+        # Update form is shown immediately, update itself runs in the background
+        # if `bulk_update` is in `action_job_list`
+        if name == 'bulk_update':
+            return False
+
+        return super(BaseModelView, self).is_background_action(name)
+
+    # Bulk update
+    def bulk_update_form(self, formdata=None, fields=None):
+        """
+            Instantiate bulk update form with `column_bulk_update_list`
+            fields of the edit form.
+
+            :param formdata:
+                Form data
+            :param fields:
+                Names of the fields to keep. All fields from
+                `column_bulk_update_list` are kept if not provided.
+        """
+        if fields is None:
+            fields = self.column_bulk_update_list
+
+        form = self._edit_form_class(formdata)
+
+        for name in list(form._fields):
+            if name not in fields and name != 'csrf_token':
+                del form[name]
+
+        return form
+
+    def get_bulk_update_fields(self):
+        """
+            Return names of the bulk update form fields which have `Apply`
+            checkbox checked in the request.
+        """
+        return [name for name in request.form.getlist('bulk_apply')
+                if name in self.column_bulk_update_list]
+
+    @action('bulk_update', lazy_gettext('Update'))
+    def action_bulk_update(self, ids):
+        return self._render_bulk_update(ids)
+
+    def action_bulk_update_matching(self, search, filters):
+        return self._render_bulk_update(None, select_all=True)
+
+    def _render_bulk_update(self, ids, select_all=False, form=None, applied=()):
+        view_args = self._get_list_extra_args().clone(page=None, cursor=None)
+
+        if form is None:
+            form = self.bulk_update_form()
+
+        form_opts = FormOpts(widget_args=self.form_widget_args)
+
+        return self.render(self.bulk_update_template,
+                           form=form,
+                           form_opts=form_opts,
+                           ids=ids,
+                           select_all=select_all,
+                           applied=applied,
+                           action_url=self._get_list_url(view_args, '.bulk_update_view'),
+                           return_url=self._get_list_url(view_args))
+
+    def apply_bulk_update(self, form, ids, select_all=False):
+        """
+            Update selected or all matching models with the bulk update
+            form data.
+
+            :param form:
+                Validated bulk update form with fields which should be
+                applied
+            :param ids:
+                List of model ids
+            :param select_all:
+                Update all models matching search and filters from the
+                request arguments instead
+        """
+        view_args = self._get_list_extra_args()
+
+        try:
+            if self.bulk_update_fire_events:
+                batch_size = self.export_batch_size
+
+                if select_all:
+                    batches = self.get_matching_pk_batches(view_args.search,
+                                                           view_args.filters,
+                                                           batch_size)
+                    total = None
+                else:
+                    batches = (ids[offset:offset + batch_size]
+                               for offset in range(0, len(ids), batch_size))
+                    total = len(ids)
+
+                count = 0
+                done = 0
+
+                for batch in batches:
+                    for model in self.get_models_by_ids(batch):
+                        if self.update_model(form, model):
+                            count += 1
+
+                    done += len(batch)
+                    jobs.report_progress(done, total)
+            else:
+                values = dict((name, form[name].data) for name in form._fields
+                              if name in self.column_bulk_update_list)
+
+                if select_all:
+                    count = self.update_matching_models(view_args.search, view_args.filters, values)
+                else:
+                    count = self.update_models(ids, values)
+
+            flash(ngettext('Model was successfully updated.',
+                           '%(count)s models were successfully updated.',
+                           count,
+                           count=count))
+        except Exception as ex:
+            if not self.handle_view_exception(ex):
+                raise
+
+            flash(gettext('Failed to update models. %(error)s', error=str(ex)), 'error')
+
+    @expose('/action/bulk-update/', methods=('POST',))
+    def bulk_update_view(self):
+        """
+            Bulk update view.
+        """
+        return_url = self._get_list_url(self._get_list_extra_args().clone(page=None, cursor=None))
+
+        if not self.is_action_allowed('bulk_update'):
+            return redirect(return_url)
+
+        ids = request.form.getlist('rowid')
+        select_all = bool(self.action_select_all and request.form.get('select_all'))
+
+        fields = self.get_bulk_update_fields()
+
+        if not fields:
+            flash(gettext('Please select fields to update.'), 'error')
+            return self._render_bulk_update(ids, select_all,
+                                            self.bulk_update_form(get_form_data()))
+
+        # Unchecked fields are neither validated nor written
+        form = self.bulk_update_form(get_form_data(), fields)
+
+        if not self.validate_form(form):
+            return self._render_bulk_update(ids, select_all, form, fields)
+
+        if super(BaseModelView, self).is_background_action('bulk_update'):
+            job = self.action_job_runner.submit(self.endpoint, 'bulk_update',
+                                                self.apply_bulk_update, form, ids, select_all)
+            return redirect(self.get_url('.action_job_view', job_id=job.id, url=return_url))
+
+        with profiler.timed(self, 'bulk_update'):
+            self.apply_bulk_update(form, ids, select_all)
+
+        return redirect(return_url)
+
+    @expose('/action/job/<job_id>/')
+    def action_job_view(self, job_id):
+        """
+            Background action progress view.
+        """
+        return self.handle_action_job(job_id)
+
+    @expose('/action/job/<job_id>/status/')
+    def action_job_status_view(self, job_id):
+        """
+            Background action status view.
+        """
+        return self.handle_action_job_status(job_id)
 
     @expose('/ajax/lookup/')
     def ajax_lookup(self):
@@ -1412,11 +2393,21 @@ class BaseModelView(BaseView, ActionsMixin):
         query = request.args.get('query')
         offset = request.args.get('offset', type=int)
         limit = request.args.get('limit', 10, type=int)
+        after = request.args.get('after')
 
         loader = self._form_ajax_refs.get(name)
 
         if not loader:
             abort(404)
 
-        data = [loader.format(m) for m in loader.get_list(query, offset, limit)]
+        if len(query or '') < loader.minimum_input_length:
+            return Response(json.dumps([]), mimetype='application/json')
+
+        with profiler.timed(self, 'ajax_lookup'):
+            if after and loader.supports_keyset:
+                models = loader.get_keyset_list(query, after, limit)
+            else:
+                models = loader.get_list(query, offset, limit)
+
+            data = [loader.format(m) for m in models]
         return Response(json.dumps(data), mimetype='application/json')
\ No newline at end of file
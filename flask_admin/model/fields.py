@@ -183,16 +183,12 @@ class AjaxSelectMultipleField(AjaxSelectField):
     def _get_data(self):
         formdata = self._formdata
         if formdata:
-            data = []
+            pks = [item for item in formdata if item]
 
-            # TODO: Optimize?
-            for item in formdata:
-                model = self.loader.get_one(item) if item else None
+            data = self.loader.get_many(pks)
 
-                if model:
-                    data.append(model)
-                else:
-                    self._invalid_formdata = True
+            if len(data) != len(formdata):
+                self._invalid_formdata = True
 
             self._set_data(data)
 
@@ -205,11 +201,12 @@ class AjaxSelectMultipleField(AjaxSelectField):
     data = property(_get_data, _set_data)
 
     def process_formdata(self, valuelist):
-        self._formdata = set()
+        self._formdata = []
 
         for field in valuelist:
             for n in field.split(self.separator):
-                self._formdata.add(n)
+                if n not in self._formdata:
+                    self._formdata.append(n)
 
     def pre_validate(self, form):
         if self._invalid_formdata:
@@ -0,0 +1,29 @@
+class BaseSearch(object):
+    """
+        Base search engine class.
+
+        Search engine turns search string entered in the list view into
+        model backend query criteria.
+    """
+    def init(self, view):
+        """
+            Validate configuration against the view. Called by the `init_search`
+            method of the view.
+
+            :param view:
+                Associated administrative view
+        """
+        pass
+
+    def apply(self, query, search, view):
+        """
+            Apply search criteria to the query and return the query.
+
+            :param query:
+                Query
+            :param search:
+                Search string
+            :param view:
+                Associated administrative view
+        """
+        raise NotImplementedError()
@@ -29,6 +29,12 @@ class AjaxSelect2Widget(object):
         kwargs['data-role'] = u'select2-ajax'
         kwargs['data-url'] = get_url('.ajax_lookup', name=field.loader.name)
 
+        if field.loader.minimum_input_length:
+            kwargs['data-minimum-input-length'] = field.loader.minimum_input_length
+
+        if field.loader.supports_keyset:
+            kwargs['data-keyset'] = u'1'
+
         allow_blank = getattr(field, 'allow_blank', False)
         if allow_blank and not self.multiple:
             kwargs['data-allow-blank'] = u'1'
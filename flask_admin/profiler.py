@@ -0,0 +1,626 @@
+"""
+    Query profiler for the administrative views.
+
+    Set ``FLASK_ADMIN_PROFILER`` application configuration option to ``True``
+    to display panel with all queries executed while serving the page, with
+    their duration, row count and stage of the view which issued them. Set
+    ``FLASK_ADMIN_PROFILER_EXPLAIN`` to ``True`` to include query plans of
+    the list view count and data queries.
+"""
+import re
+import time
+import logging
+from contextlib import contextmanager
+
+from flask import g, request, has_app_context, has_request_context
+
+from flask.ext.admin import signals
+from flask.ext.admin._compat import iteritems
+
+
+# Set up logger
+log = logging.getLogger("flask-admin.profiler")
+
+# Stages which issue list view count and data queries
+EXPLAIN_STAGES = ('count', 'get_list')
+
+# Stages checked for slow queries
+SLOW_QUERY_STAGES = ('count', 'get_list', 'get_one')
+
+# Stages which use list view arguments
+LIST_STAGES = ('count', 'get_list')
+
+# Slow query logger
+slow_log = logging.getLogger("flask-admin.slow_query")
+
+
+class RepeatedQueryError(Exception):
+    """
+        Raised when the same query is executed more times than allowed
+        by the view `repeated_query_threshold`.
+    """
+    pass
+
+
+class QueryRecord(object):
+    """
+        Query executed while serving the request.
+    """
+    def __init__(self, statement, params, duration, stage, rowcount=None):
+        """
+            Constructor.
+
+            :param statement:
+                Statement text or Mongo command document
+            :param params:
+                Statement parameters
+            :param duration:
+                Duration in seconds
+            :param stage:
+                Name of the view stage which issued the query
+            :param rowcount:
+                Number of returned or affected rows, if known
+        """
+        self.statement = statement
+        self.params = params
+        self.duration = duration
+        self.stage = stage
+        self.rowcount = rowcount
+
+    @property
+    def normalized(self):
+        return normalize_statement(self.statement)
+
+
+class Profiler(object):
+    """
+        Collects queries executed while serving a single request.
+    """
+    def __init__(self):
+        self.queries = []
+        self.stages = []
+
+    @property
+    def stage(self):
+        """
+            Name of the current stage or `None`.
+        """
+        if self.stages:
+            return self.stages[-1]
+
+        return None
+
+    def record(self, statement, params, duration, rowcount=None):
+        """
+            Record executed query.
+        """
+        self.queries.append(QueryRecord(statement, params, duration, self.stage, rowcount))
+
+    def get_repeated_queries(self, threshold):
+        """
+            Return list of `(normalized statement, records)` tuples for the
+            statements executed more than `threshold` times.
+
+            :param threshold:
+                Allowed number of repetitions
+        """
+        groups = {}
+        order = []
+
+        for query in self.queries:
+            key = query.normalized
+
+            if key not in groups:
+                groups[key] = []
+                order.append(key)
+
+            groups[key].append(query)
+
+        return [(key, groups[key]) for key in order if len(groups[key]) > threshold]
+
+
+def start_profiler():
+    """
+        Start collecting queries for the current request.
+    """
+    profiler = Profiler()
+    g._admin_profiler = profiler
+    return profiler
+
+
+def stop_profiler():
+    """
+        Stop collecting queries and return the profiler.
+    """
+    profiler = getattr(g, '_admin_profiler', None)
+    g._admin_profiler = None
+    return profiler
+
+
+def get_profiler():
+    """
+        Return active profiler or `None`.
+    """
+    if not has_app_context():
+        return None
+
+    return getattr(g, '_admin_profiler', None)
+
+
+@contextmanager
+def profile():
+    """
+        Collect queries executed inside the block. Active profiler is
+        reused if there is one.
+    """
+    profiler = get_profiler()
+
+    if profiler is not None:
+        yield profiler
+        return
+
+    profiler = start_profiler()
+
+    try:
+        yield profiler
+    finally:
+        stop_profiler()
+
+
+@contextmanager
+def paused():
+    """
+        Do not collect queries executed inside the block.
+    """
+    profiler = get_profiler()
+
+    if profiler is None:
+        yield
+        return
+
+    g._admin_profiler = None
+
+    try:
+        yield
+    finally:
+        g._admin_profiler = profiler
+
+
+@contextmanager
+def stage(name):
+    """
+        Attribute queries executed inside the block to the stage.
+
+        :param name:
+            Stage name
+    """
+    profiler = get_profiler()
+
+    if profiler is None:
+        yield
+        return
+
+    profiler.stages.append(name)
+
+    try:
+        yield
+    finally:
+        profiler.stages.pop()
+
+
+def check_repeated_queries(profiler, threshold, action='warn', name=None):
+    """
+        Log a warning or raise `RepeatedQueryError` if the same statement
+        was executed more than `threshold` times.
+
+        :param profiler:
+            Profiler
+        :param threshold:
+            Allowed number of repetitions
+        :param action:
+            `'warn'` or `'raise'`
+        :param name:
+            View name to include in the report
+    """
+    for statement, records in profiler.get_repeated_queries(threshold):
+        stages = []
+
+        for record in records:
+            if record.stage not in stages:
+                stages.append(record.stage)
+
+        message = ('Query was executed %d times while serving %s, issued by %s: %s' %
+                   (len(records), name, ', '.join(str(s) for s in stages), statement))
+
+        if action == 'raise':
+            raise RepeatedQueryError(message)
+
+        log.warning(message)
+
+
+def check_slow_queries(profiler, threshold, name=None, get_context=None):
+    """
+        Log queries issued by the `count`, `get_list` and `get_one` stages
+        which took longer than `threshold` seconds.
+
+        Structured record is passed in the `slow_query` attribute of the
+        log record.
+
+        :param profiler:
+            Profiler
+        :param threshold:
+            Duration threshold in seconds
+        :param name:
+            View name to include in the record
+        :param get_context:
+            Callable which returns dictionary with list view arguments
+            (sort, search and filters) to include in the record
+    """
+    context = None
+
+    for query in profiler.queries:
+        if query.stage not in SLOW_QUERY_STAGES or query.duration <= threshold:
+            continue
+
+        record = dict(view=name,
+                      stage=query.stage,
+                      statement=query.statement,
+                      params=query.params,
+                      duration=query.duration)
+
+        if query.stage in LIST_STAGES and get_context is not None:
+            if context is None:
+                context = get_context()
+
+            record.update(context)
+
+        slow_log.warning('Slow query in %s (%s, %.3f s): %s',
+                         name, query.stage, query.duration, query.statement,
+                         extra=dict(slow_query=record))
+
+
+# Timing
+class BaseTimer(object):
+    """
+        Receives timings of the administrative views. Register timer with
+        :meth:`~flask.ext.admin.base.Admin.add_timer`.
+
+        For example::
+
+            class StatsdTimer(BaseTimer):
+                def stage_finished(self, view, endpoint, stage, elapsed):
+                    statsd.timing('admin.%s.%s' % (endpoint, stage), elapsed * 1000)
+
+            admin.add_timer(StatsdTimer())
+    """
+    def stage_finished(self, view, endpoint, stage, elapsed):
+        """
+            Called when a stage of the view is finished.
+
+            :param view:
+                Administrative view
+            :param endpoint:
+                Request endpoint, for example `user.index_view`
+            :param stage:
+                Stage name
+            :param elapsed:
+                Elapsed time in seconds
+        """
+        pass
+
+    def view_finished(self, view, endpoint, elapsed):
+        """
+            Called when view function returns.
+
+            :param view:
+                Administrative view
+            :param endpoint:
+                Request endpoint
+            :param elapsed:
+                Elapsed time in seconds
+        """
+        pass
+
+    def list_loaded(self, view, endpoint, rows):
+        """
+            Called when list view loaded the page of models.
+
+            :param view:
+                Administrative view
+            :param endpoint:
+                Request endpoint
+            :param rows:
+                Number of loaded models
+        """
+        pass
+
+
+def _get_timers(view):
+    admin = getattr(view, 'admin', None)
+
+    if admin is None:
+        return ()
+
+    return admin._timers
+
+
+def _get_endpoint():
+    if has_request_context():
+        return request.endpoint
+
+    return None
+
+
+@contextmanager
+def timed(view, name):
+    """
+        Measure stage of the view, report it to the timers and signal
+        receivers and attribute queries executed inside the block to it.
+
+        :param view:
+            Administrative view
+        :param name:
+            Stage name
+    """
+    start = time.time()
+
+    with stage(name):
+        yield
+
+    elapsed = time.time() - start
+    endpoint = _get_endpoint()
+
+    for timer in _get_timers(view):
+        timer.stage_finished(view, endpoint, name, elapsed)
+
+    signals.view_stage_finished.send(view, endpoint=endpoint, stage=name, elapsed=elapsed)
+
+
+def report_view(view, elapsed):
+    """
+        Report time spent in the view function.
+
+        :param view:
+            Administrative view
+        :param elapsed:
+            Elapsed time in seconds
+    """
+    endpoint = _get_endpoint()
+
+    for timer in _get_timers(view):
+        timer.view_finished(view, endpoint, elapsed)
+
+    signals.view_finished.send(view, endpoint=endpoint, elapsed=elapsed)
+
+
+def report_list(view, data):
+    """
+        Report number of models loaded by the list view.
+
+        :param view:
+            Administrative view
+        :param data:
+            Loaded models
+    """
+    try:
+        rows = len(data)
+    except TypeError:
+        return
+
+    endpoint = _get_endpoint()
+
+    for timer in _get_timers(view):
+        timer.list_loaded(view, endpoint, rows)
+
+    signals.list_loaded.send(view, endpoint=endpoint, rows=rows)
+
+
+# Statement normalization
+_normalize_res = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize_statement(statement):
+    """
+        Replace literals and parameters with placeholders, so the same
+        statement executed with different values can be grouped.
+
+        :param statement:
+            SQL statement or Mongo document
+    """
+    if isinstance(statement, dict):
+        return repr(sorted((k, v if k in ('command', 'collection') else _normalize_document(v))
+                           for k, v in iteritems(statement)))
+
+    for regex, replacement in _normalize_res:
+        statement = regex.sub(replacement, statement)
+
+    return statement.strip()
+
+
+def _normalize_document(value):
+    if isinstance(value, dict):
+        return sorted((k, _normalize_document(v)) for k, v in iteritems(value))
+
+    if isinstance(value, (list, tuple)):
+        return [_normalize_document(v) for v in value[:1]]
+
+    return '?'
+
+
+# SQLAlchemy
+_sqlalchemy_installed = False
+
+
+def install_sqlalchemy():
+    """
+        Listen to SQLAlchemy engine events. Queries are recorded only when
+        profiler is active, so it is safe to call it multiple times.
+    """
+    global _sqlalchemy_installed
+
+    if _sqlalchemy_installed:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if get_profiler() is not None:
+            conn.info.setdefault('_admin_query_start', []).append(time.time())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profiler = get_profiler()
+
+        if profiler is not None:
+            stack = conn.info.get('_admin_query_start')
+
+            if stack:
+                profiler.record(statement, parameters, time.time() - stack.pop(),
+                                cursor.rowcount)
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    _sqlalchemy_installed = True
+
+
+# Peewee
+def install_peewee(database):
+    """
+        Wrap `execute_sql` method of the peewee database.
+
+        :param database:
+            Peewee database instance
+    """
+    execute_sql = database.execute_sql
+
+    if getattr(execute_sql, '_admin_profiled', False):
+        return
+
+    def profiled_execute_sql(sql, params=None, *args, **kwargs):
+        profiler = get_profiler()
+
+        if profiler is None:
+            return execute_sql(sql, params, *args, **kwargs)
+
+        start = time.time()
+        cursor = execute_sql(sql, params, *args, **kwargs)
+        profiler.record(sql, params, time.time() - start,
+                        getattr(cursor, 'rowcount', None))
+
+        return cursor
+
+    profiled_execute_sql._admin_profiled = True
+
+    database.execute_sql = profiled_execute_sql
+
+
+# PyMongo
+_pymongo_listener = None
+_pymongo_installed = False
+_pymongo_warned = False
+
+
+def get_pymongo_listener():
+    """
+        Return PyMongo command listener which reports executed commands to
+        the profiler or `None` if PyMongo does not support command
+        monitoring (PyMongo < 3.1). Pass it to the client::
+
+            client = MongoClient(event_listeners=[get_pymongo_listener()])
+    """
+    global _pymongo_listener
+
+    if _pymongo_listener is not None:
+        return _pymongo_listener
+
+    try:
+        from pymongo import monitoring
+    except ImportError:
+        return None
+
+    class CommandListener(monitoring.CommandListener):
+        def __init__(self):
+            self.commands = {}
+
+        def started(self, event):
+            if get_profiler() is not None:
+                self.commands[event.request_id] = (event.command_name,
+                                                   event.command,
+                                                   time.time())
+
+        def _finish(self, event):
+            command = self.commands.pop(event.request_id, None)
+            profiler = get_profiler()
+
+            if command is not None and profiler is not None:
+                name, document, start = command
+
+                statement = dict((k, v) for k, v in iteritems(document)
+                                 if k != name and not k.startswith('$') and k != 'lsid')
+                statement['command'] = name
+                statement['collection'] = document.get(name)
+
+                profiler.record(statement, document, time.time() - start)
+
+        def succeeded(self, event):
+            self._finish(event)
+
+        def failed(self, event):
+            self._finish(event)
+
+    _pymongo_listener = CommandListener()
+
+    return _pymongo_listener
+
+
+def install_pymongo():
+    """
+        Register PyMongo command listener globally. Returns `False` if
+        PyMongo does not support command monitoring.
+
+        PyMongo applies global listeners only to the clients created after
+        registration, so it has to be called during application setup,
+        before connecting to the database. Otherwise pass the listener
+        returned by :func:`get_pymongo_listener` to the client.
+    """
+    global _pymongo_installed
+
+    if _pymongo_installed:
+        return True
+
+    listener = get_pymongo_listener()
+
+    if listener is None:
+        log.warning('PyMongo does not support command monitoring, '
+                    'queries will not be profiled')
+        return False
+
+    from pymongo import monitoring
+
+    monitoring.register(listener)
+
+    _pymongo_installed = True
+
+    return True
+
+
+def check_pymongo():
+    """
+        Log a warning once if PyMongo command listener was not set up with
+        :func:`install_pymongo` or :func:`get_pymongo_listener`, as queries
+        of the MongoDB views can not be profiled then.
+    """
+    global _pymongo_warned
+
+    if _pymongo_listener is None and not _pymongo_warned:
+        log.warning('PyMongo command listener is not installed, queries will not be '
+                    'profiled. Call flask.ext.admin.profiler.install_pymongo() before '
+                    'creating the client.')
+        _pymongo_warned = True
@@ -0,0 +1,22 @@
+"""
+    Signals sent by the administrative views.
+
+    Signals require `blinker` library. If it is not installed, signals
+    are silently ignored.
+"""
+from flask.signals import Namespace
+
+
+_signals = Namespace()
+
+#: Sent when a stage of the view is finished. Sender is the view and
+#: arguments are `endpoint`, `stage` and `elapsed` time in seconds.
+view_stage_finished = _signals.signal('view-stage-finished')
+
+#: Sent when view function returns. Sender is the view and arguments
+#: are `endpoint` and `elapsed` time in seconds.
+view_finished = _signals.signal('view-finished')
+
+#: Sent when list view loaded the page of models. Sender is the view and
+#: arguments are `endpoint` and number of loaded `rows`.
+list_loaded = _signals.signal('list-loaded')
@@ -2,8 +2,9 @@ var AdminModelActions = function(actionErrorMessage, actionConfirmations) {
     // Actions helpers. TODO: Move to separate file
     this.execute = function(name) {
         var selected = $('input.action-checkbox:checked').size();
+        var selectAll = $('#select_all').val() === '1';
 
-        if (selected === 0) {
+        if (selected === 0 && !selectAll) {
             alert(actionErrorMessage);
             return false;
         }
@@ -31,6 +32,26 @@ var AdminModelActions = function(actionErrorMessage, actionConfirmations) {
     $(function() {
         $('.action-rowtoggle').change(function() {
             $('input.action-checkbox').prop('checked', this.checked);
+
+            // Offer to apply action to all matching records
+            $('.action-select-all-notice').toggle(this.checked);
+            $('.action-select-all').show();
+            $('.action-select-all-selected').hide();
+            $('#select_all').val('');
+        });
+
+        $('.action-select-all').click(function() {
+            $('#select_all').val('1');
+            $(this).hide();
+            $('.action-select-all-selected').show();
+        });
+
+        $('input.action-checkbox').change(function() {
+            if (!this.checked) {
+                $('.action-rowtoggle').prop('checked', false);
+                $('.action-select-all-notice').hide();
+                $('#select_all').val('');
+            }
         });
     });
 };
@@ -8,19 +8,28 @@
       */
       function processAjaxWidget($el, name) {
         var multiple = $el.attr('data-multiple') == '1';
+        var keyset = $el.attr('data-keyset') == '1';
+        var lastId = null;
 
         var opts = {
           width: 'resolve',
-          minimumInputLength: 1,
+          minimumInputLength: parseInt($el.attr('data-minimum-input-length') || 1, 10),
           placeholder: 'data-placeholder',
           ajax: {
             url: $el.attr('data-url'),
             data: function(term, page) {
-              return {
+              var params = {
                 query: term,
-                offset: (page - 1) * 10,
                 limit: 10
               };
+
+              // Continue after the last loaded model instead of skipping rows
+              if (keyset && page > 1 && lastId !== null)
+                params['after'] = lastId;
+              else
+                params['offset'] = (page - 1) * 10;
+
+              return params;
             },
             results: function(data, page) {
               var results = [];
@@ -31,6 +40,9 @@
                 results.push({id: v[0], text: v[1]});
               }
 
+              if (results.length)
+                lastId = results[results.length - 1].id;
+
               return {
                 results: results,
                 more: results.length == 10
@@ -7,6 +7,7 @@ if not PY2:
     raise SkipTest('MongoEngine is not Python 3 compatible')
 
 from wtforms import fields
+from mongoengine.context_managers import query_counter
 
 from flask.ext.admin import form
 from flask.ext.admin.contrib.mongoengine import ModelView
@@ -136,6 +137,35 @@ def test_default_sort():
     eq_(data[2].test1, 'c')
 
 
+def test_update_models():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    for name in ('first', 'second', 'third', 'fourth'):
+        M1(test1=name, test2='x').save()
+
+    view = CustomModelView(M1, column_searchable_list=('test1',))
+    admin.add_view(view)
+
+    ids = [as_unicode(m.id) for m in M1.objects.filter(test1__in=['first', 'second'])]
+
+    # Selected documents are updated with a single query
+    with query_counter() as q:
+        eq_(view.update_models(ids, {'test2': 'updated'}), 2)
+        eq_(q, 1)
+
+    eq_(sorted(m.test1 for m in M1.objects.filter(test2='updated')),
+        ['first', 'second'])
+
+    # So are all documents matching search
+    with query_counter() as q:
+        eq_(view.update_matching_models('th', [], {'test2': 'matched'}), 2)
+        eq_(q, 1)
+
+    eq_(sorted(m.test1 for m in M1.objects.filter(test2='matched')),
+        ['fourth', 'third'])
+
+
 def test_extra_fields():
     app, db, admin = setup()
 
@@ -395,6 +425,10 @@ def test_ajax_fk():
     eq_(len(items), 1)
     eq_(items[0].test1, u'foo')
 
+    # Requested order is kept, missing ids are dropped
+    items = loader.get_many([as_unicode(model2.id), '0' * 24, as_unicode(model.id)])
+    eq_([m.test1 for m in items], [u'foo', u'first'])
+
     # Check form generation
     form = view.create_form()
     eq_(form.model1.__class__.__name__, u'AjaxSelectField')
@@ -150,6 +150,46 @@ def test_default_sort():
     eq_(data[2].test1, 'c')
 
 
+def test_update_models():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    for name in ('first', 'second', 'third', 'fourth'):
+        M1(name, 'x').save()
+
+    view = CustomModelView(M1, column_searchable_list=('test1',))
+    admin.add_view(view)
+
+    statements = []
+    execute_sql = db.execute_sql
+
+    def counting_execute_sql(sql, *args, **kwargs):
+        statements.append(sql)
+        return execute_sql(sql, *args, **kwargs)
+
+    db.execute_sql = counting_execute_sql
+
+    ids = [as_unicode(m.id) for m in M1.select().where(M1.test1 << ['first', 'second'])]
+
+    # Selected models are updated with a single statement
+    eq_(view.update_models(ids, {'test2': 'updated'}), 2)
+    eq_(len(statements), 1)
+    eq_(sorted(m.test1 for m in M1.select().where(M1.test2 == 'updated')),
+        ['first', 'second'])
+
+    # So are all models matching search
+    del statements[:]
+
+    eq_(view.update_matching_models('th', [], {'test2': 'matched'}), 2)
+    eq_(len(statements), 1)
+
+    # Without joins criteria are applied directly, MySQL does not allow
+    # subqueries on the updated table
+    ok_('SELECT' not in statements[0].upper())
+    eq_(sorted(m.test1 for m in M1.select().where(M1.test2 == 'matched')),
+        ['fourth', 'third'])
+
+
 def test_extra_fields():
     app, db, admin = setup()
 
@@ -247,6 +287,12 @@ def test_ajax_fk():
     eq_(len(items), 1)
     eq_(items[0].test1, u'foo')
 
+    # Requested order is kept, missing ids are dropped
+    items = loader.get_many([model2.id, 100, model.id])
+    eq_([m.test1 for m in items], [u'foo', u'first'])
+
+    eq_(loader.get_many([as_unicode(model.id)])[0].id, model.id)
+
     # Check form generation
     form = view.create_form()
     eq_(form.model1.__class__.__name__, u'AjaxSelectField')
@@ -79,3 +79,53 @@ def test_model():
     rv = client.post(url)
     eq_(rv.status_code, 302)
     eq_(db.test.count(), 0)
+
+
+class CountingCollection(object):
+    def __init__(self, coll):
+        self.coll = coll
+        self.updates = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.coll, name)
+
+        if name not in ('update', 'update_many'):
+            return attr
+
+        def update(*args, **kwargs):
+            self.updates += 1
+            return attr(*args, **kwargs)
+
+        return update
+
+
+def test_update_models():
+    app, db, admin = setup()
+
+    db.test.remove()
+
+    for name in ('first', 'second', 'third', 'fourth'):
+        db.test.insert({'test1': name, 'test2': 'x'})
+
+    class SearchView(TestView):
+        column_searchable_list = ('test1',)
+
+    view = SearchView(db.test, 'Test')
+    admin.add_view(view)
+
+    coll = CountingCollection(db.test)
+    view.coll = coll
+
+    ids = [str(doc['_id']) for doc in db.test.find({'test1': {'$in': ['first', 'second']}})]
+
+    # Selected documents are updated with a single query
+    eq_(view.update_models(ids, {'test2': 'updated'}), 2)
+    eq_(coll.updates, 1)
+    eq_(sorted(doc['test1'] for doc in db.test.find({'test2': 'updated'})),
+        ['first', 'second'])
+
+    # So are all documents matching search
+    eq_(view.update_matching_models('th', [], {'test2': 'matched'}), 2)
+    eq_(coll.updates, 2)
+    eq_(sorted(doc['test1'] for doc in db.test.find({'test2': 'matched'})),
+        ['fourth', 'third'])
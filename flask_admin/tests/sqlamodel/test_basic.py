@@ -1,11 +1,19 @@
+import logging
+
 from nose.tools import eq_, ok_, raises
 
 from wtforms import fields
+from sqlalchemy import event
+
+from flask import json
 
-from flask.ext.admin import form
+from flask.ext.admin import form, jobs, profiler, signals, metrics
+from flask.ext.admin.actions import action
 from flask.ext.admin._compat import as_unicode
 from flask.ext.admin._compat import iteritems
-from flask.ext.admin.contrib.sqla import ModelView
+from flask.ext.admin.contrib.sqla import ModelView, tools, search
+from flask.ext.admin.contrib.sqla.ajax import QueryAjaxModelLoader
+from flask.ext.admin.model import base
 
 from . import setup
 
@@ -255,6 +263,147 @@ def test_complex_searchable_list():
     ok_('model3' not in data)
 
 
+def test_search_engine():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    db.session.execute('CREATE VIRTUAL TABLE model1_fts USING fts5(test1)')
+
+    for name in ('apple pie', 'banana split', 'cherry pie'):
+        m = Model1(name)
+        db.session.add(m)
+        db.session.flush()
+
+        db.session.execute('INSERT INTO model1_fts (rowid, test1) VALUES (:id, :test1)',
+                           {'id': m.id, 'test1': name})
+
+    db.session.commit()
+
+    view = CustomModelView(Model1, db.session,
+                           search_engine=search.SQLiteFTSSearch('model1_fts'))
+    admin.add_view(view)
+
+    eq_(view._search_supported, True)
+
+    count, data = view.get_list(0, None, None, 'pi', None)
+    eq_(count, 2)
+    eq_(sorted(m.test1 for m in data), ['apple pie', 'cherry pie'])
+
+    count, data = view.get_list(0, None, None, 'pie "cherry', None)
+    eq_(count, 1)
+
+    # Expressions for other databases
+    from sqlalchemy.dialects import postgresql, mysql
+
+    engine = search.PostgresFullTextSearch(columns=[Model1.test1, Model1.test2])
+    query = engine.apply(db.session.query(Model1), 'apple pie', view)
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    ok_('to_tsvector' in sql)
+    ok_('@@ plainto_tsquery' in sql)
+
+    engine = search.MySQLFullTextSearch([Model1.test1, Model1.test2])
+    query = engine.apply(db.session.query(Model1), 'apple pie', view)
+    sql = str(query.statement.compile(dialect=mysql.dialect()))
+    ok_('MATCH (model1.test1, model1.test2) AGAINST (%s IN BOOLEAN MODE)' in sql)
+
+
+def test_exists_for_related():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    m1 = Model1('first')
+    db.session.add_all([m1, Model2('x1', model1=m1), Model2('x2', model1=m1)])
+    m2 = Model1('second')
+    db.session.add_all([m2, Model2('y1', model1=m2)])
+    db.session.commit()
+
+    view = CustomModelView(Model1, db.session,
+                           use_exists_for_related=True,
+                           column_filters=['model2.string_field'],
+                           column_searchable_list=['test1', 'model2.string_field'])
+    admin.add_view(view)
+
+    eq_(view._search_relation_paths[Model2.__table__.c.string_field], [[Model1.model2]])
+
+    # Paths are not repeated when search is initialized again
+    view.init_search()
+    eq_(view._search_relation_paths[Model2.__table__.c.string_field], [[Model1.model2]])
+
+    # One-to-many relation does not multiply rows
+    count, data = view.get_list(0, None, None, 'x', None)
+    eq_(count, 1)
+    eq_(len(data), 1)
+
+    count, data = view.get_list(0, None, None, 'second', None)
+    eq_(count, 1)
+
+    idx = [f['index'] for f in view._filter_groups[u'Model2 / String Field']
+           if f['operation'] == u'contains'][0]
+
+    count, data = view.get_list(0, None, None, None, [(idx, None, 'x')])
+    eq_(count, 1)
+    eq_(data[0].test1, 'first')
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model1/?flt0_%d=y' % idx)
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('second' in data)
+    ok_('first' not in data)
+
+
+def test_exists_for_related_same_table():
+    app, db, admin = setup()
+
+    class Person(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+    class Article(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        title = db.Column(db.String(20))
+        author_id = db.Column(db.Integer, db.ForeignKey(Person.id))
+        author = db.relationship(Person, foreign_keys=[author_id])
+        editor_id = db.Column(db.Integer, db.ForeignKey(Person.id))
+        editor = db.relationship(Person, foreign_keys=[editor_id])
+
+    db.create_all()
+
+    alice, bob, carol = Person(name='alice'), Person(name='bob'), Person(name='carol')
+    db.session.add_all([
+        Article(title='first', author=alice, editor=bob),
+        Article(title='second', author=bob, editor=carol),
+    ])
+    db.session.commit()
+
+    view = CustomModelView(Article, db.session,
+                           use_exists_for_related=True,
+                           column_labels={'author.name': 'Author', 'editor.name': 'Editor'},
+                           column_filters=['author.name', 'editor.name'],
+                           column_searchable_list=['author.name', 'editor.name'])
+    admin.add_view(view)
+
+    def get_titles(search=None, filters=None):
+        count, data = view.get_list(0, None, None, search, filters)
+        return sorted(a.title for a in data)
+
+    def get_index(name):
+        return [f['index'] for f in view._filter_groups[name]
+                if f['operation'] == u'equals'][0]
+
+    # Every filter uses its own relation
+    eq_(get_titles(filters=[(get_index(u'Author'), None, 'bob')]), ['second'])
+    eq_(get_titles(filters=[(get_index(u'Editor'), None, 'bob')]), ['first'])
+
+    # Search matches through any of the relations
+    eq_(get_titles('alice'), ['first'])
+    eq_(get_titles('carol'), ['second'])
+    eq_(get_titles('bob'), ['first', 'second'])
+
+
 def test_complex_searchable_list_missing_children():
     app, db, admin = setup()
 
@@ -883,205 +1032,1415 @@ def test_default_complex_sort():
     eq_(data[0].model1.test1, 'a')
     eq_(data[1].model1.test1, 'b')
 
-def test_extra_fields():
+
+def test_keyset_pagination():
     app, db, admin = setup()
+    M1, _ = create_models(db)
 
-    Model1, _ = create_models(db)
+    # Duplicate values check primary key tiebreaker
+    db.session.add_all([M1('%02d' % (i // 2)) for i in range(25)])
+    db.session.commit()
 
-    view = CustomModelView(
-        Model1, db.session,
-        form_extra_fields={
-            'extra_field': fields.StringField('Extra Field')
-        }
-    )
+    view = CustomModelView(M1, db.session, page_size=10, keyset_pagination=True,
+                           column_list=('test1',))
     admin.add_view(view)
 
+    count, data, prev_cursor, next_cursor = view.get_keyset_list(None, 'test1', False, None, None)
+    eq_(count, 25)
+    eq_([m.id for m in data], list(range(1, 11)))
+    eq_(prev_cursor, None)
+    ok_(next_cursor)
+
+    count, data, prev_cursor, next_cursor = view.get_keyset_list(next_cursor, 'test1', False, None, None)
+    eq_([m.id for m in data], list(range(11, 21)))
+    ok_(prev_cursor)
+    ok_(next_cursor)
+
+    _, data, last_prev_cursor, last_next_cursor = view.get_keyset_list(next_cursor, 'test1', False, None, None)
+    eq_([m.id for m in data], list(range(21, 26)))
+    eq_(last_next_cursor, None)
+
+    _, data, first_prev_cursor, _ = view.get_keyset_list(prev_cursor, 'test1', False, None, None)
+    eq_([m.id for m in data], list(range(1, 11)))
+    eq_(first_prev_cursor, None)
+
+    # Descending order
+    _, data, _, next_cursor = view.get_keyset_list(None, 'test1', True, None, None)
+    eq_([m.id for m in data], list(range(25, 15, -1)))
+
+    _, data, _, _ = view.get_keyset_list(next_cursor, 'test1', True, None, None)
+    eq_([m.id for m in data], list(range(15, 5, -1)))
+
+    # Pager links
     client = app.test_client()
 
-    rv = client.get('/admin/model1/new/')
+    rv = client.get('/admin/model1/?sort=0')
     eq_(rv.status_code, 200)
+    ok_('cursor=next' in rv.data.decode('utf-8'))
 
-    # Check presence and order
-    data = rv.data.decode('utf-8')
-    ok_('Extra Field' in data)
-    pos1 = data.find('Extra Field')
-    pos2 = data.find('Test1')
-    ok_(pos2 < pos1)
 
+def test_keyset_pagination_nulls():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    db.session.add_all([M1(None), M1('b'), M1(None), M1('a'), M1('c')])
+    db.session.commit()
 
-def test_extra_field_order():
+    view = CustomModelView(M1, db.session, page_size=2, keyset_pagination=True,
+                           column_list=('test1',))
+    admin.add_view(view)
+
+    def walk(sort_desc):
+        result = []
+        cursor = None
+
+        while True:
+            _, data, _, cursor = view.get_keyset_list(cursor, 'test1', sort_desc, None, None)
+            result.extend(m.id for m in data)
+
+            if cursor is None:
+                return result
+
+    # NULL values are sorted last
+    eq_(walk(False), [4, 2, 5, 1, 3])
+    eq_(walk(True), [3, 1, 5, 2, 4])
+
+    # Backward paging through NULL values
+    _, data, _, next_cursor = view.get_keyset_list(None, 'test1', False, None, None)
+    _, data, _, next_cursor = view.get_keyset_list(next_cursor, 'test1', False, None, None)
+    _, data, prev_cursor, _ = view.get_keyset_list(next_cursor, 'test1', False, None, None)
+    eq_([m.id for m in data], [3])
+
+    _, data, _, _ = view.get_keyset_list(prev_cursor, 'test1', False, None, None)
+    eq_([m.id for m in data], [5, 1])
+
+
+def test_list_count_mode():
     app, db, admin = setup()
+    M1, _ = create_models(db)
 
-    Model1, _ = create_models(db)
+    db.session.add_all([M1('a'), M1('b')])
+    db.session.commit()
 
-    view = CustomModelView(
-        Model1, db.session,
-        form_columns=('extra_field', 'test1'),
-        form_extra_fields={
-            'extra_field': fields.StringField('Extra Field')
-        }
-    )
+    view = CustomModelView(M1, db.session, list_count_mode='cache')
     admin.add_view(view)
 
+    count, _ = view.get_list(0, None, None, None, None)
+    eq_(count, 2)
+
+    db.session.add(M1('c'))
+    db.session.commit()
+
+    # Cached value is returned as approximate count
+    count, _ = view.get_list(0, None, None, None, None)
+    eq_(count, 2)
+    ok_(isinstance(count, base.ApproximateCount))
+
     client = app.test_client()
 
-    rv = client.get('/admin/model1/new/')
+    rv = client.get('/admin/model1/')
     eq_(rv.status_code, 200)
+    ok_('(~2)' in rv.data.decode('utf-8'))
+
+    # Different search is counted separately
+    count, _ = view.get_list(0, None, None, 'c', None)
+    eq_(count, 3)
+
+    # Expired values are not used
+    view.list_count_cache_timeout = 0
+    view.get_list(0, None, None, 'd', None)
+    count, _ = view.get_list(0, None, None, 'd', None)
+    eq_(count, 3)
+    ok_(not isinstance(count, base.ApproximateCount))
+
+    # Estimate falls back to the exact count for SQLite
+    view.list_count_mode = 'estimate'
+    count, _ = view.get_list(0, None, None, None, None)
+    eq_(count, 3)
+    ok_(not isinstance(count, base.ApproximateCount))
+
+    # Disabled count
+    view.list_count_mode = None
+    view.page_size = 2
+
+    count, data = view.get_list(0, None, None, None, None)
+    eq_(count, None)
+    eq_(len(data), 2)
 
-    # Check presence and order
+    rv = client.get('/admin/model1/')
+    eq_(rv.status_code, 200)
     data = rv.data.decode('utf-8')
-    pos1 = data.find('Extra Field')
-    pos2 = data.find('Test1')
-    ok_(pos2 > pos1)
+    ok_('(many)' in data)
+    ok_('page=1' in data)
 
 
-# TODO: Babel tests
-def test_custom_form_base():
+def test_relation_loaders():
     app, db, admin = setup()
+    M1, M2 = create_models(db)
 
-    class TestForm(form.BaseForm):
-        pass
+    for name in ('a', 'b', 'c'):
+        m1 = M1(name)
+        db.session.add_all([m1, M2(name + '1', model1=m1), M2(name + '2', model1=m1)])
 
-    Model1, _ = create_models(db)
+    db.session.commit()
 
-    view = CustomModelView(
-        Model1, db.session,
-        form_base_class=TestForm
-    )
-    admin.add_view(view)
+    statements = []
 
-    ok_(hasattr(view._create_form_class, 'test1'))
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
 
-    create_form = view.create_form()
-    ok_(isinstance(create_form, TestForm))
+    from sqlalchemy import event
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
 
+    def get_list(view):
+        db.session.expunge_all()
+        del statements[:]
 
-def test_ajax_fk():
-    app, db, admin = setup()
+        count, data = view.get_list(0, None, None, None, None)
 
-    Model1, Model2 = create_models(db)
+        for m in data:
+            view.get_list_value(None, m, view._list_columns[-1][0])
 
-    view = CustomModelView(
-        Model2, db.session,
-        url='view',
-        form_ajax_refs={
-            'model1': {
-                'fields': ('test1', 'test2')
-            }
-        }
-    )
-    admin.add_view(view)
+        return len(statements)
 
-    ok_(u'model1' in view._form_ajax_refs)
+    # To-many relation is loaded with one additional query
+    view = CustomModelView(M1, db.session, column_list=('test1', 'model2'),
+                           endpoint='view1')
+    eq_(get_list(view), 3)
 
-    model = Model1(u'first')
-    model2 = Model1(u'foo', u'bar')
-    db.session.add_all([model, model2])
-    db.session.commit()
+    # Many-to-one relation is joined
+    view = CustomModelView(M2, db.session, column_list=('string_field', 'model1'),
+                           endpoint='view2')
+    eq_(get_list(view), 2)
 
-    # Check loader
-    loader = view._form_ajax_refs[u'model1']
-    mdl = loader.get_one(model.id)
-    eq_(mdl.test1, model.test1)
+    # Explicit strategy
+    view = CustomModelView(M2, db.session, column_list=('string_field', 'model1'),
+                           column_auto_select_related=dict(model1='select'),
+                           endpoint='view3')
+    eq_(get_list(view), 5)
 
-    items = loader.get_list(u'fir')
-    eq_(len(items), 1)
-    eq_(items[0].id, model.id)
+    view = CustomModelView(M2, db.session, column_list=('string_field', 'model1'),
+                           column_select_related_list=[('model1', 'subquery')],
+                           endpoint='view4')
+    eq_(get_list(view), 3)
 
-    items = loader.get_list(u'bar')
-    eq_(len(items), 1)
-    eq_(items[0].test1, u'foo')
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
 
-    # Check form generation
-    form = view.create_form()
-    eq_(form.model1.__class__.__name__, u'AjaxSelectField')
 
-    with app.test_request_context('/admin/view/'):
-        ok_(u'value=""' not in form.model1())
+def test_relation_summary():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
 
-        form.model1.data = model
-        ok_(u'data-json="[%s, &quot;first&quot;]"' % model.id in form.model1())
-        ok_(u'value="1"' in form.model1())
+    m1 = M1('first')
+    db.session.add_all([m1, M2('a1', model1=m1), M2('a2', model1=m1), M2('a3', model1=m1)])
+    db.session.add(M1('second'))
+    db.session.commit()
 
-    # Check querying
-    client = app.test_client()
+    view = CustomModelView(M1, db.session, column_list=('test1', 'model2'),
+                           column_relation_summary=dict(model2=2))
+    admin.add_view(view)
 
-    req = client.get(u'/admin/view/ajax/lookup/?name=model1&query=foo')
-    eq_(req.data.decode('utf-8'), u'[[%s, "foo"]]' % model2.id)
+    eq_(view._auto_joins, [])
 
-    # Check submitting
-    req = client.post('/admin/view/new/', data={u'model1': as_unicode(model.id)})
-    mdl = db.session.query(Model2).first()
+    db.session.expunge_all()
 
-    ok_(mdl is not None)
-    ok_(mdl.model1 is not None)
-    eq_(mdl.model1.id, model.id)
-    eq_(mdl.model1.test1, u'first')
+    count, data = view.get_list(0, None, None, None, None)
+    eq_(count, 2)
 
+    summary = view._get_field_value(data[0], 'model2')
+    eq_(summary.count, 3)
+    eq_([m.string_field for m in summary.items], ['a1', 'a2'])
 
-def test_ajax_fk_multi():
-    app, db, admin = setup()
+    summary = view._get_field_value(data[1], 'model2')
+    eq_(summary.count, 0)
+    eq_(summary.items, [])
 
-    class Model1(db.Model):
-        __tablename__ = 'model1'
+    # Collections were not loaded
+    ok_('model2' not in data[0].__dict__)
 
-        id = db.Column(db.Integer, primary_key=True)
-        name = db.Column(db.String(20))
+    # Count only
+    view.column_relation_summary = dict(model2=0)
 
-        def __str__(self):
-            return self.name
+    client = app.test_client()
 
-    table = db.Table('m2m', db.Model.metadata,
-                     db.Column('model1_id', db.Integer, db.ForeignKey('model1.id')),
-                     db.Column('model2_id', db.Integer, db.ForeignKey('model2.id'))
-                     )
+    rv = client.get('/admin/model1/')
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('<td>3</td>' in data)
+    ok_('<td>0</td>' in data)
 
-    class Model2(db.Model):
-        __tablename__ = 'model2'
 
-        id = db.Column(db.Integer, primary_key=True)
-        name = db.Column(db.String(20))
+def test_repeated_queries():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
 
-        model1_id = db.Column(db.Integer(), db.ForeignKey(Model1.id))
-        model1 = db.relationship(Model1, backref='models2', secondary=table)
+    for name in ('a', 'b', 'c'):
+        db.session.add(M2(name, model1=M1(name)))
 
-    db.create_all()
+    db.session.commit()
 
-    view = CustomModelView(
-        Model2, db.session,
-        url='view',
-        form_ajax_refs={
-            'model1': {
-                'fields': ['name']
-            }
-        }
-    )
+    view = CustomModelView(M2, db.session, column_list=('string_field', 'model1'),
+                           column_auto_select_related=False,
+                           repeated_query_threshold=2,
+                           repeated_query_action='raise')
     admin.add_view(view)
 
-    ok_(u'model1' in view._form_ajax_refs)
+    app.testing = True
+    client = app.test_client()
 
-    model = Model1(name=u'first')
-    db.session.add_all([model, Model1(name=u'foo')])
-    db.session.commit()
+    try:
+        client.get('/admin/model2/')
+        ok_(False, 'RepeatedQueryError was not raised')
+    except profiler.RepeatedQueryError as ex:
+        ok_('3 times' in str(ex))
+        ok_('column:model1' in str(ex))
 
-    # Check form generation
-    form = view.create_form()
-    eq_(form.model1.__class__.__name__, u'AjaxSelectMultipleField')
+    # Eager loading fixes it
+    view._auto_joins = view.get_relation_loaders(['model1'])
 
-    with app.test_request_context('/admin/view/'):
-        ok_(u'data-json="[]"' in form.model1())
+    rv = client.get('/admin/model2/')
+    eq_(rv.status_code, 200)
 
-        form.model1.data = [model]
-        ok_(u'data-json="[[1, &quot;first&quot;]]"' in form.model1())
 
-    # Check submitting
+def test_profiler_panel():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add(M1('first'))
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session)
+    admin.add_view(view)
+
     client = app.test_client()
-    client.post('/admin/view/new/', data={u'model1': as_unicode(model.id)})
-    mdl = db.session.query(Model2).first()
 
-    ok_(mdl is not None)
-    ok_(mdl.model1 is not None)
-    eq_(len(mdl.model1), 1)
+    rv = client.get('/admin/model1/')
+    ok_('admin-profiler' not in rv.data.decode('utf-8'))
+
+    app.config['FLASK_ADMIN_PROFILER'] = True
+    app.config['FLASK_ADMIN_PROFILER_EXPLAIN'] = True
+
+    rv = client.get('/admin/model1/')
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('admin-profiler' in data)
+    ok_('Queries: 2' in data)
+    ok_('<td>count</td>' in data)
+    ok_('<td>get_list</td>' in data)
+    ok_('SCAN' in data)
+    ok_(data.index('admin-profiler') < data.index('</body>'))
+
+
+def test_stage_timers():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add(M1('first'))
+    db.session.commit()
+
+    class Timer(profiler.BaseTimer):
+        def __init__(self):
+            self.stages = []
+            self.views = []
+
+        def stage_finished(self, view, endpoint, stage, elapsed):
+            self.stages.append((endpoint, stage))
+
+        def view_finished(self, view, endpoint, elapsed):
+            self.views.append(endpoint)
+
+    timer = Timer()
+    admin.add_timer(timer)
+
+    view = CustomModelView(M1, db.session)
+    admin.add_view(view)
+
+    received = []
+
+    def receiver(sender, endpoint, stage, elapsed):
+        received.append((sender, stage))
+
+    signals.view_stage_finished.connect(receiver)
+
+    try:
+        client = app.test_client()
+
+        rv = client.get('/admin/model1/')
+        eq_(rv.status_code, 200)
+    finally:
+        signals.view_stage_finished.disconnect(receiver)
+
+    eq_([s for e, s in timer.stages],
+        ['args', 'count', 'get_list', 'actions', 'urls', 'render'])
+    ok_(all(e == 'model1.index_view' for e, s in timer.stages))
+    eq_(timer.views, ['model1.index_view'])
+    eq_(received, [(view, s) for e, s in timer.stages])
+
+    timer.stages = []
+
+    rv = client.post('/admin/model1/new/', data=dict(test1='second'))
+    eq_(rv.status_code, 302)
+    eq_([s for e, s in timer.stages], ['form', 'validate', 'create_model'])
+
+
+def test_metrics():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add_all([M1('first'), M1('second')])
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session)
+    admin.add_view(view)
+
+    metrics_view = metrics.MetricsView()
+    admin.add_view(metrics_view)
+    ok_(metrics_view.registry in admin._timers)
+
+    client = app.test_client()
+
+    client.get('/admin/model1/')
+    client.get('/admin/model1/')
+
+    rv = client.get('/admin/metrics/')
+    eq_(rv.status_code, 200)
+    ok_(rv.content_type.startswith('text/plain'))
+
+    data = rv.data.decode('utf-8')
+    ok_('flask_admin_requests_total{endpoint="model1.index_view"} 2' in data)
+    ok_('flask_admin_request_duration_seconds_count{endpoint="model1.index_view"} 2' in data)
+    ok_('flask_admin_stage_duration_seconds_count{endpoint="model1.index_view",stage="count"} 2' in data)
+    ok_('flask_admin_list_rows_bucket{endpoint="model1.index_view",le="1"} 0' in data)
+    ok_('flask_admin_list_rows_bucket{endpoint="model1.index_view",le="5"} 2' in data)
+    ok_('flask_admin_list_rows_sum{endpoint="model1.index_view"} 4' in data)
+
+
+def test_slow_queries():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add_all([M1('first'), M1('second')])
+    db.session.commit()
+
+    # Negative threshold logs every query
+    view = CustomModelView(M1, db.session, slow_query_threshold=-1,
+                           column_filters=('test1',),
+                           column_searchable_list=('test1',))
+    admin.add_view(view)
+
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record.slow_query)
+
+    handler = Handler()
+    profiler.slow_log.addHandler(handler)
+
+    try:
+        client = app.test_client()
+
+        rv = client.get('/admin/model1/?sort=0&search=fir&flt0_0=first')
+        eq_(rv.status_code, 200)
+
+        eq_([r['stage'] for r in records], ['count', 'get_list'])
+
+        record = records[1]
+        eq_(record['view'], 'model1.index_view')
+        ok_('FROM model1' in record['statement'])
+        ok_(record['params'])
+        ok_(record['duration'] >= 0)
+        eq_(record['sort'], 'test1')
+        eq_(record['search'], 'fir')
+        eq_(record['filters'], [('Test1', 'first')])
+
+        records[:] = []
+
+        rv = client.get('/admin/model1/edit/?id=1')
+        eq_(rv.status_code, 200)
+        eq_([r['stage'] for r in records], ['get_one'])
+        ok_('filters' not in records[0])
+    finally:
+        profiler.slow_log.removeHandler(handler)
+
+
+def test_index_check():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    view = CustomModelView(M1, db.session, index_check='suggest',
+                           column_sortable_list=('test1', 'test2'),
+                           column_searchable_list=('test1',),
+                           column_filters=('test1',))
+    admin.add_view(view)
+
+    report = view.check_indexes()
+    eq_(set((op, name) for op, name, suggestion in report),
+        set([('sort', 'model1.test1'), ('sort', 'model1.test2'),
+             ('search', 'model1.test1'), ('filter', 'model1.test1')]))
+
+    suggestions = dict(((op, name), suggestion) for op, name, suggestion in report)
+    eq_(suggestions[('sort', 'model1.test2')],
+        'CREATE INDEX ix_model1_test2 ON model1 (test2)')
+    eq_(suggestions[('search', 'model1.test1')], None)
+
+    db.engine.execute('CREATE INDEX ix_model1_test2 ON model1 (test2)')
+
+    report = view.check_indexes()
+    ok_(('sort', 'model1.test2') not in [(op, name) for op, name, suggestion in report])
+
+
+def test_export():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add_all([M1('first', 'a, b'), M1('second', 'c'), M1('third', None)])
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session, column_filters=('test1',),
+                           export_columns=('test1', 'test2'),
+                           export_batch_size=2)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    # Export is disabled by default
+    rv = client.get('/admin/model1/export/csv/')
+    eq_(rv.status_code, 302)
+
+    rv = client.get('/admin/model1/')
+    ok_('/admin/model1/export/csv/' not in rv.data.decode('utf-8'))
+
+    view.can_export = True
+
+    rv = client.get('/admin/model1/export/xml/')
+    eq_(rv.status_code, 404)
+
+    rv = client.get('/admin/model1/?sort=0&desc=1')
+    data = rv.data.decode('utf-8')
+    ok_('/admin/model1/export/csv/?' in data)
+    ok_('/admin/model1/export/jsonl/?' in data)
+
+    rv = client.get('/admin/model1/export/csv/?sort=0&desc=1')
+    eq_(rv.status_code, 200)
+    ok_(rv.content_type.startswith('text/csv'))
+    ok_('model1.csv' in rv.headers['Content-Disposition'])
+    eq_(rv.data.decode('utf-8').splitlines(),
+        ['Test1,Test2', 'third,', 'second,c', 'first,"a, b"'])
+
+    rv = client.get('/admin/model1/export/jsonl/?flt0_0=first')
+    eq_(rv.status_code, 200)
+    eq_([json.loads(line) for line in rv.data.decode('utf-8').splitlines()],
+        [{'test1': 'first', 'test2': 'a, b'}])
+
+
+def test_background_action():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add_all([M1('first'), M1('second'), M1('third')])
+    db.session.commit()
+
+    class Executor(object):
+        def submit(self, fn, *args):
+            fn(*args)
+
+    runner = jobs.JobRunner(Executor())
+
+    class View(CustomModelView):
+        @action('download', 'Download')
+        def action_download(self, ids):
+            return 'ids: %s' % ','.join(ids)
+
+    view = View(M1, db.session, action_job_runner=runner)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    # Only listed actions run in the background
+    rv = client.post('/admin/model1/action/', data=dict(action='download', rowid=['1']))
+    eq_(rv.status_code, 200)
+    eq_(rv.data.decode('utf-8'), 'ids: 1')
+
+    view.action_job_list = ('delete', 'download')
+
+    rv = client.post('/admin/model1/action/', data=dict(action='delete', rowid=['1', '2']))
+    eq_(rv.status_code, 302)
+    ok_('/admin/model1/action/job/' in rv.headers['Location'])
+
+    eq_(M1.query.count(), 1)
+
+    job_id = rv.headers['Location'].split('/action/job/')[1].split('/')[0]
+    job = runner.get_job(job_id)
+    eq_(job.status, jobs.Job.FINISHED)
+    eq_((job.done, job.total), (2, 2))
+
+    # Job does not share session with the request which started it
+    ok_('successfully deleted' not in client.get('/admin/model1/').data.decode('utf-8'))
+
+    rv = client.get('/admin/model1/action/job/%s/' % job_id)
+    eq_(rv.status_code, 200)
+    ok_('/admin/model1/action/job/%s/status/' % job_id in rv.data.decode('utf-8'))
+
+    rv = client.get('/admin/model1/action/job/%s/status/' % job_id)
+    eq_(rv.status_code, 200)
+    data = json.loads(rv.data.decode('utf-8'))
+    eq_(data['status'], 'finished')
+    eq_(data['done'], 2)
+
+    # Flashed messages are delivered once the job is finished
+    rv = client.get('/admin/model1/')
+    ok_('2 models were successfully deleted' in rv.data.decode('utf-8'))
+
+    rv = client.get('/admin/model1/action/job/unknown/status/')
+    eq_(rv.status_code, 404)
+
+    # Response can not be delivered from the background, so the job fails
+    rv = client.post('/admin/model1/action/', data=dict(action='download', rowid=['3']))
+    eq_(rv.status_code, 302)
+
+    job_id = rv.headers['Location'].split('/action/job/')[1].split('/')[0]
+    job = runner.get_job(job_id)
+    eq_(job.status, jobs.Job.FAILED)
+    ok_('response' in job.error)
+
+
+def test_action_select_all():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    db.session.add_all([M1('first'), M1('second'), M1('third'), M1('fourth')])
+    db.session.add(M2('related', model1=M1('fifth')))
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session, action_select_all=True,
+                           column_searchable_list=('test1',),
+                           export_batch_size=1)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model1/?search=f')
+    data = rv.data.decode('utf-8')
+    ok_('action-select-all' in data)
+    ok_('/admin/model1/action/?search=f' in data)
+
+    # Batches
+    rv = client.post('/admin/model1/action/?search=f',
+                     data=dict(action='delete', select_all='1'))
+    eq_(rv.status_code, 302)
+    eq_(sorted(m.test1 for m in M1.query), ['second', 'third'])
+
+    rv = client.get('/admin/model1/')
+    data = rv.data.decode('utf-8')
+    ok_('Action was applied to 3 records' in data)
+    ok_('successfully deleted' not in data)
+
+    # Without select_all only selected ids are used
+    rv = client.post('/admin/model1/action/?search=t',
+                     data=dict(action='delete', rowid=['3']))
+    eq_(sorted(m.test1 for m in M1.query), ['second'])
+
+    # Single statement
+    db.session.add_all([M1('a1'), M1('a2')])
+    db.session.commit()
+
+    view.fast_mass_delete = True
+
+    rv = client.post('/admin/model1/action/?search=a',
+                     data=dict(action='delete', select_all='1'))
+    eq_(rv.status_code, 302)
+    eq_(sorted(m.test1 for m in M1.query), ['second'])
+
+    rv = client.get('/admin/model1/')
+    ok_('2 models were successfully deleted' in rv.data.decode('utf-8'))
+
+
+def test_action_select_all_results():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    db.session.add_all([M1('m%d' % i) for i in range(5)])
+    db.session.commit()
+
+    calls = []
+
+    class View(CustomModelView):
+        @action('touch', 'Touch')
+        def action_touch(self, ids):
+            calls.append(list(ids))
+
+            # Pretend the model from the second batch failed
+            if len(calls) == 2:
+                return 0
+
+            return len(ids)
+
+    view = View(M1, db.session, action_select_all=True, export_batch_size=2)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    rv = client.post('/admin/model1/action/',
+                     data=dict(action='touch', select_all='1'))
+    eq_(rv.status_code, 302)
+
+    # Handler gets primary keys batch by batch
+    eq_([len(ids) for ids in calls], [2, 2, 1])
+    eq_(sorted(int(pk) for ids in calls for pk in ids),
+        [m.id for m in M1.query.order_by(M1.id)])
+
+    rv = client.get('/admin/model1/')
+    ok_('Action was applied to 3 records' in rv.data.decode('utf-8'))
+
+
+def test_batched_mass_delete():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    db.session.add_all([M1('m%d' % i) for i in range(5)])
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session, mass_delete_batch_size=2)
+    admin.add_view(view)
+
+    deleted = []
+
+    def on_model_delete(model):
+        if model.test1 == 'm3':
+            raise Exception('Protected')
+
+        deleted.append(model.test1)
+
+    view.on_model_delete = on_model_delete
+
+    client = app.test_client()
+
+    rv = client.post('/admin/model1/action/',
+                     data=dict(action='delete', rowid=['1', '2', '3', '4', '5']))
+    eq_(rv.status_code, 302)
+
+    # Batch with the failed model is rolled back, next batches are skipped
+    eq_(sorted(deleted), ['m0', 'm1', 'm2'])
+    eq_(sorted(m.test1 for m in M1.query), ['m2', 'm3', 'm4'])
+
+    data = client.get('/admin/model1/').data.decode('utf-8')
+    ok_('Failed to delete models. Protected' in data)
+    ok_('Deleted 2 of 5 models before an error.' in data)
+    ok_('successfully deleted' not in data)
+
+    # Failed batches are not counted when applied to all matching models
+    view.action_select_all = True
+    view.export_batch_size = 2
+
+    rv = client.post('/admin/model1/action/',
+                     data=dict(action='delete', select_all='1'))
+    eq_(rv.status_code, 302)
+    eq_(sorted(m.test1 for m in M1.query), ['m2', 'm3'])
+
+    data = client.get('/admin/model1/').data.decode('utf-8')
+    ok_('Action was applied to 1 record.' in data)
+
+
+def test_bulk_update():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    db.session.add_all([M1(name, 'old', bool_field=True)
+                        for name in ('first', 'second', 'third', 'fourth')])
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session, action_select_all=True,
+                           column_searchable_list=('test1',),
+                           column_bulk_update_list=('test2', 'test3', 'bool_field'),
+                           export_batch_size=1)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    # Form with selected ids
+    rv = client.post('/admin/model1/action/',
+                     data=dict(action='bulk_update', rowid=['1', '2']))
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('/admin/model1/action/bulk-update/' in data)
+    ok_('name="test2"' in data)
+    ok_('name="test4"' not in data)
+    ok_('name="bulk_apply" value="bool_field"' in data)
+    ok_('value="2"' in data)
+
+    # Nothing to apply
+    rv = client.post('/admin/model1/action/bulk-update/',
+                     data=dict(rowid=['1', '2'], test2='updated'))
+    eq_(rv.status_code, 200)
+    ok_('Please select fields to update.' in rv.data.decode('utf-8'))
+    eq_(M1.query.filter_by(test2='updated').count(), 0)
+
+    # Single statement, only applied fields are written
+    rv = client.post('/admin/model1/action/bulk-update/',
+                     data=dict(rowid=['1', '2'], test2='updated', test3='',
+                               bulk_apply='test2'))
+    eq_(rv.status_code, 302)
+    eq_(sorted(m.test1 for m in M1.query.filter_by(test2='updated')),
+        ['first', 'second'])
+    eq_(M1.query.filter_by(bool_field=True).count(), 4)
+
+    # Unchecked checkbox is written as False when applied
+    rv = client.post('/admin/model1/action/bulk-update/',
+                     data=dict(rowid=['1'], bulk_apply='bool_field'))
+    eq_(rv.status_code, 302)
+    eq_([m.test1 for m in M1.query.filter_by(bool_field=False)], ['first'])
+    eq_(M1.query.get(1).test2, 'updated')
+
+    rv = client.get('/admin/model1/')
+    ok_('2 models were successfully updated' in rv.data.decode('utf-8'))
+
+    # All matching models
+    rv = client.post('/admin/model1/action/?search=th',
+                     data=dict(action='bulk_update', select_all='1'))
+    eq_(rv.status_code, 200)
+    ok_('name="select_all"' in rv.data.decode('utf-8'))
+
+    rv = client.post('/admin/model1/action/bulk-update/?search=th',
+                     data=dict(select_all='1', test2='matched', bulk_apply='test2'))
+    eq_(rv.status_code, 302)
+    eq_(sorted(m.test1 for m in M1.query.filter_by(test2='matched')),
+        ['fourth', 'third'])
+
+    # Model events
+    changed = []
+
+    def on_model_change(form, model, is_created):
+        changed.append(model.test1)
+
+    def get_export_list(*args):
+        raise AssertionError('Matching models should be loaded in batches of keys')
+
+    view.on_model_change = on_model_change
+    view.get_export_list = get_export_list
+    view.bulk_update_fire_events = True
+
+    rv = client.post('/admin/model1/action/bulk-update/?search=f',
+                     data=dict(select_all='1', test2='events', bulk_apply='test2'))
+    eq_(rv.status_code, 302)
+    eq_(sorted(changed), ['first', 'fourth'])
+    eq_(sorted(m.test1 for m in M1.query.filter_by(test2='events')),
+        ['first', 'fourth'])
+
+    # Not allowed without editing
+    view.can_edit = False
+
+    rv = client.post('/admin/model1/action/bulk-update/',
+                     data=dict(rowid=['3'], test2='denied', bulk_apply='test2'))
+    eq_(rv.status_code, 302)
+    eq_(M1.query.filter_by(test2='denied').count(), 0)
+
+
+@raises(Exception)
+def test_bulk_update_relation():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    CustomModelView(M2, db.session, column_bulk_update_list=('model1',))
+
+
+def test_bulk_update_relation_events():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    m1 = M1('first')
+    db.session.add_all([m1, M2('a'), M2('b')])
+    db.session.commit()
+
+    m1_id = m1.id
+
+    # Relations are updated by update_model
+    view = CustomModelView(M2, db.session, column_bulk_update_list=('model1',),
+                           bulk_update_fire_events=True)
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    rv = client.post('/admin/model2/action/bulk-update/',
+                     data=dict(rowid=['1', '2'], model1=str(m1_id), bulk_apply='model1'))
+    eq_(rv.status_code, 302)
+    eq_([m.model1_id for m in M2.query.order_by(M2.id)], [m1_id, m1_id])
+
+
+def test_simple_list_pager():
+    app, db, admin = setup()
+    M1, _ = create_models(db)
+
+    db.session.add_all([M1('first'), M1('second'), M1('third')])
+    db.session.commit()
+
+    view = CustomModelView(M1, db.session, simple_list_pager=True, page_size=2)
+    admin.add_view(view)
+
+    # One extra row is fetched to detect next page
+    count, data = view.get_list(0, None, None, None, None)
+    eq_(count, None)
+    eq_(len(data), 3)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model1/')
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('(many)' in data)
+    ok_('page=1' in data)
+    ok_('first' in data)
+    ok_('second' in data)
+    ok_('third' not in data)
+
+    # Last page knows number of rows
+    rv = client.get('/admin/model1/?page=1')
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('(3)' in data)
+    ok_('page=2' not in data)
+    ok_('third' in data)
+
+
+def test_list_load_only():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    m1 = M1('first')
+    db.session.add(m1)
+    db.session.add(M2('second', 5, True, model1=m1))
+    db.session.commit()
+
+    view = CustomModelView(M2, db.session,
+                           column_list=('string_field', 'model1'),
+                           column_list_load_only=True,
+                           column_formatters=dict(string_field=lambda v, c, m, p: '%s-%s' % (m.string_field, m.int_field)),
+                           column_formatters_depends=dict(string_field=('int_field',)))
+    admin.add_view(view)
+
+    eq_(sorted(view._get_load_only_columns()),
+        ['id', 'int_field', 'model1_id', 'string_field'])
+
+    db.session.expunge_all()
+
+    count, data = view.get_list(0, None, None, None, None)
+    eq_(count, 1)
+
+    loaded = data[0].__dict__
+    ok_('string_field' in loaded)
+    ok_('int_field' in loaded)
+    ok_('bool_field' not in loaded)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model2/')
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('second-5' in data)
+    ok_('first' in data)
+
+
+def test_list_load_rows():
+    app, db, admin = setup()
+    M1, M2 = create_models(db)
+
+    m1 = M1('first')
+    db.session.add(m1)
+    db.session.add(M2('second', 5, model1=m1))
+    db.session.add(M2('third', 6))
+    db.session.commit()
+
+    view = CustomModelView(M2, db.session,
+                           list_load_rows=True,
+                           column_list=('string_field', 'model1.test1'),
+                           column_sortable_list=('string_field', ('model1', 'model1.test1')),
+                           column_formatters=dict(string_field=lambda v, c, m, p: '%s-%s' % (m.string_field, m.int_field)),
+                           column_formatters_depends=dict(string_field=('int_field',)))
+    admin.add_view(view)
+
+    count, data = view.get_list(0, None, None, None, None)
+    eq_(count, 2)
+    eq_(len(data), 2)
+    ok_(isinstance(data[0], tools.ListRow))
+    eq_(data[0].string_field, 'second')
+    eq_(data[0].model1.test1, 'first')
+    eq_(data[1].model1.test1, None)
+    eq_(view.get_pk_value(data[1]), data[1].id)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model2/?sort=1&desc=1')
+    eq_(rv.status_code, 200)
+    data = rv.data.decode('utf-8')
+    ok_('second-5' in data)
+    ok_('third-6' in data)
+    ok_('first' in data)
+    ok_(data.index('second-5') < data.index('third-6'))
+
+
+def test_extra_fields():
+    app, db, admin = setup()
+
+    Model1, _ = create_models(db)
+
+    view = CustomModelView(
+        Model1, db.session,
+        form_extra_fields={
+            'extra_field': fields.StringField('Extra Field')
+        }
+    )
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model1/new/')
+    eq_(rv.status_code, 200)
+
+    # Check presence and order
+    data = rv.data.decode('utf-8')
+    ok_('Extra Field' in data)
+    pos1 = data.find('Extra Field')
+    pos2 = data.find('Test1')
+    ok_(pos2 < pos1)
+
+
+def test_extra_field_order():
+    app, db, admin = setup()
+
+    Model1, _ = create_models(db)
+
+    view = CustomModelView(
+        Model1, db.session,
+        form_columns=('extra_field', 'test1'),
+        form_extra_fields={
+            'extra_field': fields.StringField('Extra Field')
+        }
+    )
+    admin.add_view(view)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model1/new/')
+    eq_(rv.status_code, 200)
+
+    # Check presence and order
+    data = rv.data.decode('utf-8')
+    pos1 = data.find('Extra Field')
+    pos2 = data.find('Test1')
+    ok_(pos2 > pos1)
+
+
+# TODO: Babel tests
+def test_custom_form_base():
+    app, db, admin = setup()
+
+    class TestForm(form.BaseForm):
+        pass
+
+    Model1, _ = create_models(db)
+
+    view = CustomModelView(
+        Model1, db.session,
+        form_base_class=TestForm
+    )
+    admin.add_view(view)
+
+    ok_(hasattr(view._create_form_class, 'test1'))
+
+    create_form = view.create_form()
+    ok_(isinstance(create_form, TestForm))
+
+
+def test_ajax_fk():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    view = CustomModelView(
+        Model2, db.session,
+        url='view',
+        form_ajax_refs={
+            'model1': {
+                'fields': ('test1', 'test2')
+            }
+        }
+    )
+    admin.add_view(view)
+
+    ok_(u'model1' in view._form_ajax_refs)
+
+    model = Model1(u'first')
+    model2 = Model1(u'foo', u'bar')
+    db.session.add_all([model, model2])
+    db.session.commit()
+
+    # Check loader
+    loader = view._form_ajax_refs[u'model1']
+    mdl = loader.get_one(model.id)
+    eq_(mdl.test1, model.test1)
+
+    items = loader.get_list(u'fir')
+    eq_(len(items), 1)
+    eq_(items[0].id, model.id)
+
+    items = loader.get_list(u'bar')
+    eq_(len(items), 1)
+    eq_(items[0].test1, u'foo')
+
+    # Check form generation
+    form = view.create_form()
+    eq_(form.model1.__class__.__name__, u'AjaxSelectField')
+
+    with app.test_request_context('/admin/view/'):
+        ok_(u'value=""' not in form.model1())
+
+        form.model1.data = model
+        ok_(u'data-json="[%s, &quot;first&quot;]"' % model.id in form.model1())
+        ok_(u'value="1"' in form.model1())
+
+    # Check querying
+    client = app.test_client()
+
+    req = client.get(u'/admin/view/ajax/lookup/?name=model1&query=foo')
+    eq_(req.data.decode('utf-8'), u'[[%s, "foo"]]' % model2.id)
+
+    # Check submitting
+    req = client.post('/admin/view/new/', data={u'model1': as_unicode(model.id)})
+    mdl = db.session.query(Model2).first()
+
+    ok_(mdl is not None)
+    ok_(mdl.model1 is not None)
+    eq_(mdl.model1.id, model.id)
+    eq_(mdl.model1.test1, u'first')
+
+
+def test_ajax_lookup_options():
+    app, db, admin = setup()
+
+    Model1, Model2 = create_models(db)
+
+    view = CustomModelView(
+        Model2, db.session,
+        url='view',
+        form_ajax_refs={
+            'model1': {
+                'fields': ('test1',),
+                'match': 'prefix',
+                'order_by': 'test1',
+                'minimum_input_length': 2
+            }
+        }
+    )
+    admin.add_view(view)
+
+    db.session.add_all([Model1(u'ab-3'), Model1(u'ab-1'), Model1(u'xab'),
+                        Model1(u'ab-2'), Model1(u'ab-4')])
+    db.session.commit()
+
+    client = app.test_client()
+
+    def lookup(url):
+        rv = client.get(url)
+        return [v[1] for v in json.loads(rv.data.decode('utf-8'))]
+
+    # Prefix match, sorted by the order field
+    eq_(lookup(u'/admin/view/ajax/lookup/?name=model1&query=ab'),
+        [u'ab-1', u'ab-2', u'ab-3', u'ab-4'])
+
+    # Short terms are not searched
+    eq_(lookup(u'/admin/view/ajax/lookup/?name=model1&query=a'), [])
+
+    # Keyset continuation after the last loaded model
+    eq_(lookup(u'/admin/view/ajax/lookup/?name=model1&query=ab&limit=2'),
+        [u'ab-1', u'ab-2'])
+    eq_(lookup(u'/admin/view/ajax/lookup/?name=model1&query=ab&limit=2&after=4'),
+        [u'ab-3', u'ab-4'])
+
+    # NULL order values are sorted last and can be paged through
+    db.session.query(Model1).filter(Model1.id.in_([1, 5])).update({'test2': u'x'},
+                                                                   synchronize_session=False)
+    db.session.commit()
+
+    loader = QueryAjaxModelLoader('test', db.session, Model1, fields=['test1'],
+                                  match='prefix', order_by='test2')
+
+    eq_([m.test1 for m in loader.get_list(u'ab', 0, 2)], [u'ab-3', u'ab-4'])
+    eq_([m.test1 for m in loader.get_keyset_list(u'ab', '5', 2)], [u'ab-1', u'ab-2'])
+
+    # Widget passes options to the client
+    form = view.create_form()
+
+    with app.test_request_context('/admin/view/'):
+        html = form.model1()
+        ok_(u'data-minimum-input-length="2"' in html)
+        ok_(u'data-keyset="1"' in html)
+
+
+def test_ajax_fk_multi():
+    app, db, admin = setup()
+
+    class Model1(db.Model):
+        __tablename__ = 'model1'
+
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+        def __str__(self):
+            return self.name
+
+    table = db.Table('m2m', db.Model.metadata,
+                     db.Column('model1_id', db.Integer, db.ForeignKey('model1.id')),
+                     db.Column('model2_id', db.Integer, db.ForeignKey('model2.id'))
+                     )
+
+    class Model2(db.Model):
+        __tablename__ = 'model2'
+
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(20))
+
+        model1_id = db.Column(db.Integer(), db.ForeignKey(Model1.id))
+        model1 = db.relationship(Model1, backref='models2', secondary=table)
+
+    db.create_all()
+
+    view = CustomModelView(
+        Model2, db.session,
+        url='view',
+        form_ajax_refs={
+            'model1': {
+                'fields': ['name']
+            }
+        }
+    )
+    admin.add_view(view)
+
+    ok_(u'model1' in view._form_ajax_refs)
+
+    model = Model1(name=u'first')
+    db.session.add_all([model, Model1(name=u'foo')])
+    db.session.commit()
+
+    # Check form generation
+    form = view.create_form()
+    eq_(form.model1.__class__.__name__, u'AjaxSelectMultipleField')
+
+    with app.test_request_context('/admin/view/'):
+        ok_(u'data-json="[]"' in form.model1())
+
+        form.model1.data = [model]
+        ok_(u'data-json="[[1, &quot;first&quot;]]"' in form.model1())
+
+    # Check submitting
+    client = app.test_client()
+    client.post('/admin/view/new/', data={u'model1': as_unicode(model.id)})
+    mdl = db.session.query(Model2).first()
+
+    ok_(mdl is not None)
+    ok_(mdl.model1 is not None)
+    eq_(len(mdl.model1), 1)
+
+    # Models are loaded with one query in the submitted order
+    loader = view._form_ajax_refs[u'model1']
+    eq_([m.name for m in loader.get_many(['2', '100', '1'])], [u'foo', u'first'])
+
+    with app.test_request_context('/admin/view/', method='POST',
+                                  data={u'model1': '2,1,2'}):
+        form = view.create_form()
+        eq_([m.name for m in form.model1.data], [u'foo', u'first'])
+        ok_(form.validate())
+
+    with app.test_request_context('/admin/view/', method='POST',
+                                  data={u'model1': '2,100'}):
+        form = view.create_form()
+        eq_([m.name for m in form.model1.data], [u'foo'])
+        ok_(not form.validate())
+
+
+def test_query_select_lazy_lookup():
+    app, db, admin = setup()
+    Model1, Model2 = create_models(db)
+
+    db.session.add_all([Model1(u'first'), Model1(u'second'), Model1(u'third')])
+    db.session.commit()
+
+    view = CustomModelView(Model2, db.session, form_columns=('string_field', 'model1'))
+    admin.add_view(view)
+
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        if 'FROM model1' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+
+    client = app.test_client()
+
+    # All choices are loaded by default
+    try:
+        rv = client.post('/admin/model2/new/', data=dict(string_field='z', model1='2'))
+        eq_(rv.status_code, 302)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+    eq_(len(statements), 1)
+    ok_(' IN ' not in statements[0])
+    eq_(db.session.query(Model2).one().model1.test1, u'second')
+
+    db.session.query(Model2).delete()
+    db.session.commit()
+
+    view = CustomModelView(Model2, db.session, form_columns=('string_field', 'model1'),
+                           form_lazy_lookup=('model1',), endpoint='lazy')
+    admin.add_view(view)
+
+    del statements[:]
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+
+    try:
+        rv = client.post('/admin/lazy/new/', data=dict(string_field='a', model1='2'))
+        eq_(rv.status_code, 302)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+    # Submitted key is resolved without loading all choices
+    eq_(len(statements), 1)
+    ok_(' IN ' in statements[0])
+    eq_(db.session.query(Model2).one().model1.test1, u'second')
+
+    # Unknown key is not resolved
+    rv = client.post('/admin/lazy/new/', data=dict(string_field='b', model1='100'))
+    eq_(rv.status_code, 302)
+    eq_(db.session.query(Model2).filter_by(string_field='b').one().model1, None)
+
+    # Choices are loaded for rendering
+    rv = client.get('/admin/lazy/new/')
+    data = rv.data.decode('utf-8')
+    ok_(u'second' in data)
+    ok_(u'third' in data)
+
+
+def test_form_choices_cache():
+    app, db, admin = setup()
+    Model1, Model2 = create_models(db)
+
+    db.session.add_all([Model1(u'first'), Model1(u'second')])
+    db.session.commit()
+
+    view1 = CustomModelView(Model1, db.session)
+    admin.add_view(view1)
+
+    view2 = CustomModelView(Model2, db.session, form_columns=('string_field', 'model1'),
+                            form_choices_cache={'model1': 60})
+    admin.add_view(view2)
+
+    client = app.test_client()
+
+    rv = client.get('/admin/model2/new/')
+    ok_(u'second' in rv.data.decode('utf-8'))
+
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        if 'FROM model1' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+
+    try:
+        # Cached choices are rendered without querying the table
+        rv = client.get('/admin/model2/new/')
+        ok_(u'second' in rv.data.decode('utf-8'))
+        eq_(statements, [])
+
+        # Selected choice is still marked
+        client.post('/admin/model2/new/', data=dict(string_field='a', model1='2'))
+        rv = client.get('/admin/model2/edit/?id=1')
+        ok_(u'<option selected value="2">second</option>' in rv.data.decode('utf-8'))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+    # Changes through the related model view invalidate the cache
+    rv = client.post('/admin/model1/new/', data=dict(test1='third'))
+    eq_(rv.status_code, 302)
+
+    rv = client.get('/admin/model2/new/')
+    ok_(u'third' in rv.data.decode('utf-8'))
+
+
+def test_form_ajax_threshold():
+    app, db, admin = setup()
+    Model1, Model2 = create_models(db)
+
+    db.session.add_all([Model1(u'first'), Model1(u'second'), Model1(u'third')])
+    db.session.commit()
+
+    view = CustomModelView(Model2, db.session, form_ajax_threshold=2,
+                           form_ajax_threshold_fields={'model1': ('test1',)})
+    admin.add_view(view)
+
+    form = view.create_form()
+    eq_(form.model1.__class__.__name__, u'AjaxSelectField')
+    ok_(u'model1' in view._form_ajax_refs)
+
+    client = app.test_client()
+
+    # Only listed fields are searched, by prefix
+    rv = client.get(u'/admin/model2/ajax/lookup/?name=model1&query=sec')
+    eq_(json.loads(rv.data.decode('utf-8')), [[2, u'second']])
+
+    rv = client.get(u'/admin/model2/ajax/lookup/?name=model1&query=econd')
+    eq_(json.loads(rv.data.decode('utf-8')), [])
+
+    # Small tables keep the select field
+    view = CustomModelView(Model2, db.session, form_ajax_threshold=3,
+                           form_ajax_threshold_fields={'model1': ('test1',)},
+                           endpoint='small')
+    admin.add_view(view)
+
+    form = view.create_form()
+    eq_(form.model1.__class__.__name__, u'QuerySelectField')
+
+    # Relations without search fields keep the select field
+    view = CustomModelView(Model2, db.session, form_ajax_threshold=2,
+                           endpoint='nofields')
+    admin.add_view(view)
+
+    form = view.create_form()
+    eq_(form.model1.__class__.__name__, u'QuerySelectField')
+
+    # Rows are counted with a bounded query on a separate connection
+    statements = []
+
+    def before_execute(conn, clauseelement, multiparams, params):
+        statements.append(str(clauseelement))
+
+    event.listen(db.engine, 'before_execute', before_execute)
+
+    view = CustomModelView(Model2, db.session, form_ajax_threshold=1,
+                           form_ajax_threshold_fields={'model1': ('test1',)},
+                           endpoint='bounded')
+
+    event.remove(db.engine, 'before_execute', before_execute)
+
+    eq_(len(statements), 1)
+    ok_('LIMIT' in statements[0])
+
+    # View can be created when table can not be counted, pending changes
+    # of the session are kept
+    Model1.__table__.drop(db.engine)
+
+    pending = Model2(u'pending')
+    db.session.add(pending)
+
+    view = CustomModelView(Model2, db.session, form_ajax_threshold=2,
+                           form_ajax_threshold_fields={'model1': ('test1',)},
+                           endpoint='notable')
+
+    form = view.create_form()
+    eq_(form.model1.__class__.__name__, u'QuerySelectField')
+    ok_(pending in db.session.new)
 
 
 def test_safe_redirect():
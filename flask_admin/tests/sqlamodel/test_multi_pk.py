@@ -4,6 +4,8 @@ from . import setup
 from .test_basic import CustomModelView
 
 from flask.ext.sqlalchemy import Model
+from flask.ext.admin.contrib.sqla import tools
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declarative_base
 
 
@@ -45,6 +47,48 @@ def test_multiple_pk():
     eq_(rv.status_code, 302)
 
 
+def test_query_for_ids():
+    app, db, admin = setup()
+
+    class Model(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        id2 = db.Column(db.String(20), primary_key=True)
+        test = db.Column(db.String)
+
+    db.create_all()
+
+    db.session.add_all([Model(id=1, id2='a', test='first'),
+                        Model(id=1, id2='b', test='second'),
+                        Model(id=2, id2='a', test='third')])
+    db.session.commit()
+
+    ids = ['1,a', '2,a']
+
+    eq_(sorted(m.test for m in tools.get_query_for_ids(Model.query, Model, ids)),
+        ['first', 'third'])
+
+    # Capability is checked once, building the query executes nothing
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+
+    try:
+        query = tools.get_query_for_ids(Model.query, Model, ids)
+        eq_(statements, [])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+    # Fallback to OR of ANDs
+    tools._engine_capabilities[db.engine]['tuple_in'] = False
+
+    query = tools.get_query_for_ids(Model.query, Model, ids)
+    ok_(' OR ' in str(query))
+    eq_(sorted(m.test for m in query), ['first', 'third'])
+
+
 def test_joined_inheritance():
     # Test multiple primary keys - mix int and string together
     app, db, admin = setup()